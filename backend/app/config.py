@@ -52,6 +52,10 @@ class Settings(BaseSettings):
 	# MongoDB设置
 	mongodb_url: str = os.getenv("MONGODB_URL", "")
 	mongodb_db_name: str = os.getenv("MONGODB_DB_NAME", "")
+	mongodb_max_pool_size: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))  # 连接池最大连接数
+	mongodb_min_pool_size: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))  # 连接池保持的最小连接数
+	mongodb_max_idle_time_ms: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))  # 空闲连接回收时间（毫秒）
+	mongodb_server_selection_timeout_ms: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))  # 选择服务器超时（毫秒）
 	
 	# Redis设置
 	redis_host: str = os.getenv("REDIS_HOST", "localhost")
@@ -66,6 +70,10 @@ class Settings(BaseSettings):
 	minio_access_key: str = os.getenv("MINIO_ACCESS_KEY", "")
 	minio_secret_key: str = os.getenv("MINIO_SECRET_KEY", "")
 	minio_bucket_name: str = os.getenv("MINIO_BUCKET_NAME", "fish-eternal")
+	minio_use_aioboto3: bool = os.getenv("MINIO_USE_AIOBOTO3", "false").lower() == "true"  # 安装了 aioboto3 时使用原生异步 S3 客户端
+
+	# 知识库批量解析设置
+	kb_batch_parse_concurrency: int = int(os.getenv("KB_BATCH_PARSE_CONCURRENCY", "16"))  # 批量解析时同时提交的文档数
 
 	# TTS设置
 	tts_app_id: str = os.getenv("TTS_APP_ID", "")
@@ -6,8 +6,14 @@ import logging
 # 配置日志
 logger = logging.getLogger(__name__)
 
-# MongoDB连接
-client = AsyncIOMotorClient(settings.mongodb_url)
+# MongoDB连接（全进程共享一个客户端，请求之间复用连接池）
+client = AsyncIOMotorClient(
+    settings.mongodb_url,
+    maxPoolSize=settings.mongodb_max_pool_size,
+    minPoolSize=settings.mongodb_min_pool_size,
+    maxIdleTimeMS=settings.mongodb_max_idle_time_ms,
+    serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+)
 db = client[settings.mongodb_db_name]
 
 # 数据库集合
@@ -20,7 +26,7 @@ shared_knowledge_bases_collection = db.shared_knowledge_bases  # 共享知识库
 pulled_knowledge_bases_collection = db.pulled_knowledge_bases  # 用户拉取的知识库
 
 async def get_database() -> AsyncIOMotorClient:
-    """获取数据库连接"""
+    """获取数据库连接（返回共享客户端，不会为每个请求新建连接）"""
     return client
 
 async def _check_index_exists(collection, index_name: str) -> bool:
@@ -75,6 +81,13 @@ async def init_indexes():
                 'options': {'sparse': True},  # 允许 null 值（有些用户可能没邮箱）
                 'description': 'email索引（用于邮箱登录查询优化）'
             },
+            {
+                'collection': db.users,
+                'collection_name': 'users',
+                'spec': "full_name",
+                'options': {},
+                'description': 'full_name索引（用户搜索前缀匹配优化）'
+            },
             
             # 聊天会话集合索引
             {
@@ -138,6 +151,13 @@ async def init_indexes():
                 'options': {},
                 'description': 'created_at索引（排序优化）'
             },
+            {
+                'collection': db.knowledge_bases,
+                'collection_name': 'knowledge_bases',
+                'spec': [("user_id", 1), ("created_at", -1), ("_id", -1)],
+                'options': {},
+                'description': 'user_id+created_at+_id复合索引（知识库列表游标分页）'
+            },
             
             # 知识库文档集合索引
             {
@@ -154,6 +174,13 @@ async def init_indexes():
                 'options': {},
                 'description': 'status索引（查询优化）'
             },
+            {
+                'collection': db.kb_documents,
+                'collection_name': 'kb_documents',
+                'spec': [("kb_id", 1), ("status", 1), ("_id", 1)],
+                'options': {'name': 'kb_status_id'},
+                'description': 'kb_id+status+_id复合索引（批量解析全部未解析文档）'
+            },
             {
                 'collection': db.kb_documents,
                 'collection_name': 'kb_documents',
@@ -161,6 +188,40 @@ async def init_indexes():
                 'options': {},
                 'description': 'created_at索引（排序优化）'
             },
+
+            # 群聊集合索引
+            {
+                'collection': db.group_chats,
+                'collection_name': 'group_chats',
+                'spec': "group_id",
+                'options': {'unique': True},  # group_id 为 uuid4，每个群聊唯一
+                'description': 'group_id唯一索引（群聊查询/更新/解散优化）'
+            },
+
+            # 群聊成员集合索引
+            {
+                'collection': db.group_members,
+                'collection_name': 'group_members',
+                'spec': [("group_id", 1), ("member_id", 1)],
+                'options': {},
+                'description': 'group_id+member_id复合索引（成员查询优化）'
+            },
+            {
+                'collection': db.group_members,
+                'collection_name': 'group_members',
+                'spec': [("group_id", 1), ("member_type", 1)],
+                'options': {},
+                'description': 'group_id+member_type复合索引（AI成员查询优化）'
+            },
+
+            # 群聊消息集合索引
+            {
+                'collection': db.group_messages,
+                'collection_name': 'group_messages',
+                'spec': [("group_id", 1), ("timestamp", -1)],
+                'options': {},
+                'description': 'group_id+timestamp复合索引（消息分页查询优化；前缀同时覆盖按group_id清空/解散时的delete_many）'
+            },
         ]
 
         for cfg in index_configs:
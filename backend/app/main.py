@@ -344,6 +344,14 @@ async def shutdown_event():
     except Exception as e:
         print(f"⚠️ 关闭 MCP 工具系统失败: {e}")
     
+    # 关闭全局 HTTP 客户端
+    try:
+        from .utils.http_client import close_http_client
+        await close_http_client()
+        print("✅ HTTP 客户端已关闭")
+    except Exception as e:
+        print(f"⚠️ 关闭 HTTP 客户端失败: {e}")
+    
     # 关闭 Redis 连接
     try:
         from .redis_client import close_redis
@@ -169,7 +169,8 @@ class InProcessMCPClient:
                 logger.info(f"🔍 开始查询用户图片生成配置: user_id={user_id} (ObjectId: {user_object_id}), db_name={db_name}")
 
                 user_data = await self.db[db_name].users.find_one(
-                    {"_id": user_object_id}
+                    {"_id": user_object_id},
+                    {"image_generation_configs": 1, "default_image_generation_provider": 1}
                 )
                 logger.info(f"🔍 查询结果: user_data存在={user_data is not None}")
 
@@ -287,7 +288,8 @@ class InProcessMCPClient:
                 from bson import ObjectId
                 user_object_id = ObjectId(user_id)
                 user_data = await self.db[db_name].users.find_one(
-                    {"_id": user_object_id}
+                    {"_id": user_object_id},
+                    {"image_generation_configs": 1, "default_image_generation_provider": 1}
                 )
                 if user_data:
                     all_configs = user_data.get("image_generation_configs", {})
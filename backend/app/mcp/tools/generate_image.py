@@ -43,9 +43,10 @@ async def get_user_image_generation_providers(db, user_id: str) -> Dict[str, Dic
         user_object_id = ObjectId(user_id)
         logger.info(f"🔍 [get_user_image_generation_providers] 转换后 ObjectId: {user_object_id}")
 
-        user_doc = await db[settings.mongodb_db_name].users.find_one({
-            "_id": user_object_id
-        })
+        user_doc = await db[settings.mongodb_db_name].users.find_one(
+            {"_id": user_object_id},
+            {"image_generation_configs": 1}
+        )
         logger.info(f"🔍 [get_user_image_generation_providers] 查询结果: user_doc存在={user_doc is not None}")
 
         if not user_doc or not user_doc.get("image_generation_configs"):
@@ -321,7 +322,10 @@ class GenerateImageTool(BaseTool):
             # 如果没有指定provider，使用用户的默认服务商
             if not provider_id:
                 user_object_id = ObjectId(user_id)
-                user_doc = await db[settings.mongodb_db_name].users.find_one({"_id": user_object_id})
+                user_doc = await db[settings.mongodb_db_name].users.find_one(
+                    {"_id": user_object_id},
+                    {"default_image_generation_provider": 1}
+                )
                 provider_id = user_doc.get("default_image_generation_provider") if user_doc else None
 
                 # 如果没有设置默认，使用第一个启用的服务商
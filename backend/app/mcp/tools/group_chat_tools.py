@@ -49,9 +49,9 @@ class AIGoOnlineTool(BaseTool):
             }, ensure_ascii=False)
         
         try:
-            from ...services.group_chat import GroupChatService
+            from ...services.group_chat import get_group_chat_service
             
-            service = GroupChatService(context.db)
+            service = get_group_chat_service(context.db)
             await service.ai_go_online(group_id, ai_member_id)
             
             logger.info(
@@ -112,9 +112,9 @@ class AIGoOfflineTool(BaseTool):
             }, ensure_ascii=False)
         
         try:
-            from ...services.group_chat import GroupChatService
+            from ...services.group_chat import get_group_chat_service
             
-            service = GroupChatService(context.db)
+            service = get_group_chat_service(context.db)
             await service.ai_go_offline(group_id, ai_member_id)
             
             logger.info(
@@ -170,10 +170,10 @@ class CheckOnlineStatusTool(BaseTool):
             }, ensure_ascii=False)
         
         try:
-            from ...services.group_chat import GroupChatService
+            from ...services.group_chat import get_group_chat_service
             from ...models.group_chat import MemberStatus
             
-            service = GroupChatService(context.db)
+            service = get_group_chat_service(context.db)
             member = await service.group_manager.get_member(group_id, ai_member_id)
             
             if not member:
@@ -228,9 +228,9 @@ class GetGroupInfoTool(BaseTool):
             }, ensure_ascii=False)
         
         try:
-            from ...services.group_chat import GroupChatService
+            from ...services.group_chat import get_group_chat_service
             
-            service = GroupChatService(context.db)
+            service = get_group_chat_service(context.db)
             
             # 获取群组基本信息
             group = await service.get_group_info(group_id)
@@ -347,9 +347,9 @@ class KnowledgeRetrievalTool(BaseTool):
     async def _build_vectorstore(self, kb_settings: dict):
         """构建向量存储（使用全局单例管理器）"""
         # 延迟导入避免启动时加载
-        from ...routers.kb import _get_kb_components
+        from ...routers.kb import _get_kb_vectorstore
         
-        _, vectorstore, _ = _get_kb_components(kb_settings)
+        vectorstore, _ = _get_kb_vectorstore(kb_settings)
         return vectorstore
     
     async def _create_retriever(self, vectorstore, kb_settings: dict, top_k: int):
@@ -4,11 +4,10 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from pydantic import BaseModel, EmailStr
-from motor.motor_asyncio import AsyncIOMotorClient
 from ..config import settings
+from ..database import client
 
-# 数据库连接
-client = AsyncIOMotorClient(settings.mongodb_url)
+# 数据库连接（复用全局客户端的连接池）
 db = client[settings.mongodb_db_name]
 verification_codes_collection = db.verification_codes
 
@@ -99,6 +99,17 @@ async def get_redis() -> Redis:
     return await RedisClient.get_instance()
 
 
+def get_redis_if_available() -> Optional[Redis]:
+    """
+    获取已初始化的Redis客户端，未初始化时返回 None（不触发连接重试）
+    
+    适用于缓存等可降级场景：Redis 不可用时直接回退，避免每次调用都等待重连。
+    """
+    if RedisClient._initialized:
+        return RedisClient._instance
+    return None
+
+
 async def close_redis():
     """关闭Redis连接"""
     await RedisClient.close()
@@ -104,7 +104,7 @@ async def save_user_asr_provider_config(
             {
                 "$set": {
                     f"asr_configs.{provider_id}": config.dict(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
@@ -270,7 +270,7 @@ async def set_default_asr_provider(
             {
                 "$set": {
                     "default_asr_provider": provider_id,
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
@@ -311,8 +311,8 @@ async def _build_vectorstore_for_session(session_id: str, db: AsyncIOMotorClient
 		logger.info("💡 kb_prompt_template 未包含 {knowledge}，跳过传统引用检索")
 		return None, None
 	
-	from .kb import _get_kb_components
-	_, vectorstore, _ = _get_kb_components(kb_settings)
+	from .kb import _get_kb_vectorstore
+	vectorstore, _ = _get_kb_vectorstore(kb_settings)
 	return kb_settings, vectorstore
 
 async def _build_vectorstore_for_history(session_id: str, db: AsyncIOMotorClient):
@@ -326,8 +326,8 @@ async def _build_vectorstore_for_history(session_id: str, db: AsyncIOMotorClient
 	if not kb_settings or not kb_settings.get("enabled"):
 		return None, None
 	
-	from .kb import _get_kb_components
-	_, vectorstore, _ = _get_kb_components(kb_settings)
+	from .kb import _get_kb_vectorstore
+	vectorstore, _ = _get_kb_vectorstore(kb_settings)
 	return kb_settings, vectorstore
 
 async def _retrieve_references(user_message: str, kb_settings: dict, vectorstore, db: AsyncIOMotorClient = None) -> Dict[str, List[Dict[str, Any]]]:
@@ -2200,7 +2200,7 @@ async def retrieve_knowledge_for_session(user_message: str, session_id: str, db:
         # 判断单库还是多库检索
         if len(kb_ids) == 1:
             # 单知识库检索
-            from .kb import _get_kb_components
+            from .kb import _get_kb_vectorstore
             from ..utils.embedding.pipeline import Retriever
             from ..services.knowledge_base_service import KnowledgeBaseService
             
@@ -2212,7 +2212,7 @@ async def retrieve_knowledge_for_session(user_message: str, session_id: str, db:
                 return _build_prompt_with_knowledge_text("None")
             
             # 使用知识库的配置构建vectorstore
-            _, vectorstore, _ = _get_kb_components(kb.kb_settings)
+            vectorstore, _ = _get_kb_vectorstore(kb.kb_settings)
             
             # ✅ 保存知识库真实配置，后续检索时使用
             actual_kb_settings = kb.kb_settings
@@ -118,7 +118,7 @@ async def save_user_embedding_provider_config(
             {
                 "$set": {
                     f"embedding_configs.{provider_id}": config.dict(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
@@ -296,7 +296,7 @@ async def set_default_embedding(
             {
                 "$set": {
                     "default_embedding_provider": provider_id,
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
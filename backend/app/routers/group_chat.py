@@ -4,11 +4,13 @@
 提供群聊管理的RESTful接口
 """
 import logging
-import io
 import asyncio
+import re
+import functools
+import time
 import traceback
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File
+from typing import List, Optional, Dict, Any, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from ..database import get_database
@@ -20,7 +22,11 @@ from ..models.group_chat import (
     AIBehaviorConfig, GroupChatWithMembers, GroupMemberResponse,
     GroupStrategyConfig, UpdateGroupStrategyRequest
 )
-from ..services.group_chat import GroupChatService
+from ..services.group_chat import GroupChatService, get_group_chat_service
+from ..services.group_chat.group_cache import (
+    invalidate_group_cache, get_cached_ai_session_ids, set_cached_ai_session_ids
+)
+from ..services.group_chat.message_dispatcher import _prepare_ws_payload
 from ..utils.minio_client import minio_client
 from ..config import settings
 import uuid
@@ -31,6 +37,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/group-chat", tags=["群聊"])
 
+# 心跳响应是常量，预先编码好直接 send_text
+_PONG_PAYLOAD = '{"type":"pong"}'
+
 
 def convert_minio_url_to_http(minio_url: str) -> str:
     """
@@ -89,7 +98,6 @@ async def convert_member_to_response(
     # 🔥 动态获取AI会话的最新名称（确保与消息中的名称一致）
     if member.member_type == "ai" and member.session_id and db:
         try:
-            from ..config import settings
             # 查询 chat_sessions
             session_doc = await db[settings.mongodb_db_name].chat_sessions.find_one(
                 {"_id": member.session_id}
@@ -103,9 +111,6 @@ async def convert_member_to_response(
     # 🔥 真人成员：从 users 集合实时获取头像（避免使用过时头像）
     if member.member_type == "human" and db:
         try:
-            from bson import ObjectId
-            from ..config import settings
-            
             # 将字符串格式的 member_id 转换为 ObjectId
             user_doc = await db[settings.mongodb_db_name].users.find_one(
                 {"_id": ObjectId(member.member_id)}
@@ -141,13 +146,57 @@ async def convert_member_to_response(
     )
 
 
+async def convert_members_to_response(
+    members: List[GroupMember],
+    owner_id: str,
+    db: AsyncIOMotorClient = None
+) -> List[GroupMemberResponse]:
+    """
+    批量转换成员格式
+
+    多个成员时使用 asyncio.gather 并行处理；零个或一个成员时直接转换，省去 gather 的调度开销。
+    """
+    if len(members) <= 1:
+        return [await convert_member_to_response(member, owner_id, db) for member in members]
+    return list(await asyncio.gather(
+        *(convert_member_to_response(member, owner_id, db) for member in members)
+    ))
+
+
+# 成员数超过该阈值时，将 GroupChatWithMembers 的校验放到线程池执行，避免阻塞事件循环
+_MEMBERS_VALIDATION_OFFLOAD_THRESHOLD = 50
+
+# list_my_groups 中并行组装群聊的最大并发数
+_LIST_GROUPS_CONCURRENCY = 16
+
+
+async def _construct_with_members(**kwargs) -> GroupChatWithMembers:
+    """
+    构造 GroupChatWithMembers
+
+    大群的 Pydantic 校验会同步占用事件循环，成员较多时放到默认线程池中执行。
+    """
+    if len(kwargs.get("members") or []) > _MEMBERS_VALIDATION_OFFLOAD_THRESHOLD:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(GroupChatWithMembers, **kwargs))
+    return GroupChatWithMembers(**kwargs)
+
+
 # ============ 群组管理接口 ============
 
+async def get_group_chat_service_dependency(
+    db: AsyncIOMotorClient = Depends(get_database)
+) -> GroupChatService:
+    """FastAPI 依赖：注入进程级群聊服务单例"""
+    return get_group_chat_service(db)
+
+
 @router.post("/groups", response_model=GroupChatWithMembers)
 async def create_group(
     request: CreateGroupRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     创建群聊
@@ -157,20 +206,16 @@ async def create_group(
     - **initial_ai_sessions**: 初始AI成员的会话ID列表
     """
     try:
-        service = GroupChatService(db)
         group = await service.create_group(str(current_user.id), request)
         
         # 获取成员列表
         members = await service.get_group_members(group.group_id)
         
-        # 转换成员格式（使用 asyncio.gather 并行处理）
-        members_response = await asyncio.gather(*[
-            convert_member_to_response(member, group.owner_id, db)
-            for member in members
-        ])
+        # 转换成员格式
+        members_response = await convert_members_to_response(members, group.owner_id, db)
         
         # 构造包含成员的响应
-        return GroupChatWithMembers(
+        return await _construct_with_members(
             group_id=group.group_id,
             name=group.name,
             description=group.description,
@@ -189,55 +234,62 @@ async def create_group(
 @router.get("/groups", response_model=List[GroupChatWithMembers])
 async def list_my_groups(
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     获取我的群聊列表
     """
     try:
-        # 查询我创建的或我加入的群聊
-        from ..config import settings
-        service = GroupChatService(db)
+        current_user_id = str(current_user.id)
         
+        # 查询我创建的或我加入的群聊
         cursor = db[settings.mongodb_db_name].group_chats.find({
             "$or": [
-                {"owner_id": str(current_user.id)},
-                {"member_ids": str(current_user.id)}
+                {"owner_id": current_user_id},
+                {"member_ids": current_user_id}
             ],
             "is_active": True
         }).sort("created_at", -1)
         
-        groups_with_members = []
-        async for doc in cursor:
+        docs = await cursor.to_list(length=None)
+        groups = []
+        for doc in docs:
             doc.pop("_id", None)
-            group = GroupChat(**doc)
-            
-            # 获取成员列表
-            members = await service.get_group_members(group.group_id)
-            
-            # 转换成员格式（使用 asyncio.gather 并行处理）
-            members_response = await asyncio.gather(*[
-                convert_member_to_response(member, group.owner_id, db)
-                for member in members
-            ])
-            
-            # 转换头像 URL
-            avatar_url = convert_minio_url_to_http(group.avatar) if group.avatar else None
-            
-            # 构造包含成员的响应
-            groups_with_members.append(GroupChatWithMembers(
-                group_id=group.group_id,
-                name=group.name,
-                description=group.description,
-                avatar=avatar_url,
-                owner_id=group.owner_id,
-                members=members_response,
-                created_at=group.created_at,
-                updated_at=group.updated_at,
-                is_active=group.is_active
-            ))
-        
-        return groups_with_members
+            groups.append(GroupChat(**doc))
+        
+        # 一次查询获取所有群聊的成员列表
+        members_by_group = await service.get_members_for_groups(groups)
+        
+        # 各群聊的成员组装互不依赖，限制并发数后并行处理
+        semaphore = asyncio.Semaphore(_LIST_GROUPS_CONCURRENCY)
+        
+        async def build(group: GroupChat) -> GroupChatWithMembers:
+            async with semaphore:
+                members = members_by_group.get(group.group_id, [])
+                
+                # 转换成员格式
+                members_response = await convert_members_to_response(members, group.owner_id, db)
+                
+                # 转换头像 URL
+                avatar_url = convert_minio_url_to_http(group.avatar) if group.avatar else None
+                
+                # 构造包含成员的响应
+                return await _construct_with_members(
+                    group_id=group.group_id,
+                    name=group.name,
+                    description=group.description,
+                    avatar=avatar_url,
+                    owner_id=group.owner_id,
+                    members=members_response,
+                    created_at=group.created_at,
+                    updated_at=group.updated_at,
+                    is_active=group.is_active
+                )
+        
+        groups_with_members = await asyncio.gather(*[build(group) for group in groups])
+        
+        return list(groups_with_members)
     except Exception as e:
         logger.error(f"获取群聊列表失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -247,11 +299,11 @@ async def list_my_groups(
 async def get_group(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """获取群聊详情"""
     try:
-        service = GroupChatService(db)
         group = await service.get_group_info(group_id)
         
         if not group:
@@ -264,14 +316,11 @@ async def get_group(
         # 获取成员列表
         members = await service.get_group_members(group.group_id)
         
-        # 转换成员格式（使用 asyncio.gather 并行处理）
-        members_response = await asyncio.gather(*[
-            convert_member_to_response(member, group.owner_id, db)
-            for member in members
-        ])
+        # 转换成员格式
+        members_response = await convert_members_to_response(members, group.owner_id, db)
         
         # 构造包含成员的响应
-        return GroupChatWithMembers(
+        return await _construct_with_members(
             group_id=group.group_id,
             name=group.name,
             description=group.description,
@@ -294,11 +343,11 @@ async def update_group(
     group_id: str,
     updates: dict,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """更新群组基本信息（名称、简介、头像）"""
     try:
-        service = GroupChatService(db)
         group = await service.get_group_info(group_id)
         
         if not group:
@@ -338,8 +387,6 @@ async def update_group(
                 raise HTTPException(status_code=400, detail="群组简介不能超过 200 个字符")
         
         # 更新数据库
-        from ..config import settings
-        from datetime import datetime
         update_data['updated_at'] = datetime.utcnow()
         
         result = await db[settings.mongodb_db_name].group_chats.update_one(
@@ -350,6 +397,8 @@ async def update_group(
         if result.modified_count == 0 and result.matched_count == 0:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
+        await invalidate_group_cache(group_id)
+        
         logger.info(f"群组信息更新成功: {group_id}, 更新字段: {list(update_data.keys())}")
         
         return {"success": True, "message": "群组信息更新成功"}
@@ -376,16 +425,6 @@ async def update_group_system_prompt(
     3. 动态群聊信息（成员列表等，自动生成）
     """
     try:
-        service = GroupChatService(db)
-        group = await service.get_group_info(group_id)
-        
-        if not group:
-            raise HTTPException(status_code=404, detail="群聊不存在")
-        
-        # 权限检查：仅群主可修改
-        if str(current_user.id) != group.owner_id:
-            raise HTTPException(status_code=403, detail="仅群主可修改群聊系统提示词")
-        
         # 获取系统提示词
         system_prompt = request.get("system_prompt", "")
         
@@ -393,9 +432,11 @@ async def update_group_system_prompt(
         if system_prompt and len(system_prompt) > 2000:
             raise HTTPException(status_code=400, detail="系统提示词不能超过 2000 个字符")
         
-        # 更新数据库
-        result = await db[settings.mongodb_db_name].group_chats.update_one(
-            {"group_id": group_id},
+        collection_groups = db[settings.mongodb_db_name].group_chats
+        
+        # 更新数据库（权限检查编码在过滤条件中：仅群主可修改）
+        result = await collection_groups.update_one(
+            {"group_id": group_id, "owner_id": str(current_user.id)},
             {
                 "$set": {
                     "group_system_prompt": system_prompt,
@@ -405,7 +446,13 @@ async def update_group_system_prompt(
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="群聊不存在")
+            # 未命中时再区分群聊不存在与无权限
+            exists = await collection_groups.count_documents({"group_id": group_id}, limit=1)
+            if not exists:
+                raise HTTPException(status_code=404, detail="群聊不存在")
+            raise HTTPException(status_code=403, detail="仅群主可修改群聊系统提示词")
+        
+        await invalidate_group_cache(group_id)
         
         logger.info(f"✅ 群聊系统提示词已更新: {group_id}")
         
@@ -426,11 +473,11 @@ async def update_group_system_prompt(
 async def get_group_system_prompt(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """获取群聊的自定义系统提示词"""
     try:
-        service = GroupChatService(db)
         group = await service.get_group_info(group_id)
         
         if not group:
@@ -480,6 +527,8 @@ async def upload_group_avatar(
         raise HTTPException(status_code=400, detail="缺少avatar_data参数")
     
     try:
+        current_user_id = str(current_user.id)
+        
         # 验证群聊是否存在且用户是群主
         group = await db[settings.mongodb_db_name].group_chats.find_one({"group_id": group_id})
         if not group:
@@ -487,7 +536,7 @@ async def upload_group_avatar(
         
         logger.info(f"🔍 群聊信息: group_id={group_id}, group={group}")
         
-        if group.get("owner_id") != current_user.id:
+        if group.get("owner_id") != current_user_id:
             raise HTTPException(status_code=403, detail="只有群主可以修改群聊头像")
         
         # 删除旧头像（如果存在）
@@ -495,7 +544,7 @@ async def upload_group_avatar(
         logger.info(f"🔍 检查旧头像: old_avatar={old_avatar}, type={type(old_avatar)}")
         if old_avatar and old_avatar.startswith("minio://"):
             try:
-                minio_client.delete_image(old_avatar)
+                await minio_client.async_delete_image(old_avatar)
                 logger.info(f"✅ 已删除旧头像: {old_avatar}")
             except Exception as e:
                 logger.warning(f"❌ 删除旧头像失败: {e}")
@@ -503,9 +552,6 @@ async def upload_group_avatar(
             logger.info(f"ℹ️ 无需删除旧头像（不存在或格式不对）")
         
         # 解析 Base64 数据并上传
-        import base64
-        import uuid
-        
         # 处理 Base64 数据
         if "," in avatar_data_str:
             # 格式: data:image/png;base64,xxxxx
@@ -529,17 +575,13 @@ async def upload_group_avatar(
         # 这样前端转换规则才能匹配: group-chats/{groupId}/{filename}
         object_name = f"group-chats/{group_id}/{filename}"
         
-        minio_client.client.put_object(
-            settings.minio_bucket_name,
+        # 构造 minio:// URL
+        minio_url = await minio_client.async_put_object(
             object_name,
-            io.BytesIO(file_data),
-            len(file_data),
+            file_data,
             content_type=f"image/{file_ext}"
         )
         
-        # 构造 minio:// URL
-        minio_url = f"minio://{settings.minio_bucket_name}/{object_name}"
-        
         logger.info(f"✅ 群聊头像上传成功: {minio_url}")
         
         # 更新数据库（存储 minio:// 格式）
@@ -548,6 +590,8 @@ async def upload_group_avatar(
             {"$set": {"avatar": minio_url, "updated_at": datetime.utcnow()}}
         )
         
+        await invalidate_group_cache(group_id)
+        
         logger.info(f"群聊头像已更新到数据库: {group_id}, MinIO URL: {minio_url}")
         
         # 转换为 HTTP URL 返回给前端
@@ -570,7 +614,8 @@ async def add_member(
     group_id: str,
     request: AddMemberRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     添加成员到群聊（统一接口）
@@ -581,14 +626,14 @@ async def add_member(
     - **behavior_config**: AI行为配置（仅AI成员需要，可选）
     """
     try:
-        service = GroupChatService(db)
+        current_user_id = str(current_user.id)
         
         # 权限检查：是否是群主或成员
         group = await service.get_group_info(group_id)
         if not group:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
-        if str(current_user.id) not in group.member_ids:
+        if current_user_id not in group.member_ids:
             raise HTTPException(status_code=403, detail="无权操作")
         
         # 根据成员类型添加成员
@@ -596,13 +641,13 @@ async def add_member(
             member = await service.add_ai_to_group(
                 group_id,
                 request.member_id,  # session_id
-                str(current_user.id)
+                current_user_id
             )
         else:  # human
             member = await service.add_human_to_group(
                 group_id,
                 request.member_id,  # user_id
-                str(current_user.id)  # inviter_id
+                current_user_id  # inviter_id
             )
         
         return {"success": True, "member": member.model_dump(mode='json')}
@@ -618,7 +663,8 @@ async def remove_member(
     group_id: str,
     member_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     从群聊中移除成员
@@ -629,7 +675,6 @@ async def remove_member(
     权限：群主和管理员都可以移除普通成员，但只有群主可以移除管理员
     """
     try:
-        service = GroupChatService(db)
         
         # 获取群聊信息
         group = await service.get_group_info(group_id)
@@ -648,22 +693,24 @@ async def remove_member(
         current_user_id = str(current_user.id)
         collection_members = db[settings.mongodb_db_name].group_members
         
-        current_user_member = await collection_members.find_one({
-            "group_id": group_id,
-            "member_id": current_user_id
-        })
+        # 一次查询同时取回当前用户和被移除成员的角色
+        member_docs = await collection_members.find(
+            {
+                "group_id": group_id,
+                "member_id": {"$in": [current_user_id, member_id]}
+            },
+            {"member_id": 1, "role": 1}
+        ).to_list(length=2)
+        by_id = {d["member_id"]: d for d in member_docs}
         
+        current_user_member = by_id.get(current_user_id)
         if not current_user_member:
             raise HTTPException(status_code=403, detail="您不是群成员")
         
         current_role = current_user_member.get("role", "member")
         
         # 获取被移除成员的角色
-        target_member = await collection_members.find_one({
-            "group_id": group_id,
-            "member_id": member_id
-        })
-        
+        target_member = by_id.get(member_id)
         if not target_member:
             raise HTTPException(status_code=404, detail="成员不存在")
         
@@ -698,7 +745,8 @@ async def set_member_role(
     member_id: str,
     role: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     设置成员角色（设置/取消管理员）
@@ -710,7 +758,6 @@ async def set_member_role(
     权限：只有群主可以设置管理员
     """
     try:
-        service = GroupChatService(db)
         
         # 获取群聊信息
         group = await service.get_group_info(group_id)
@@ -755,7 +802,8 @@ async def add_ai_member(
     group_id: str,
     request: AddMemberRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     添加AI成员到群聊（兼容旧接口）
@@ -764,21 +812,21 @@ async def add_ai_member(
     - **behavior_config**: AI行为配置（可选）
     """
     try:
-        service = GroupChatService(db)
+        current_user_id = str(current_user.id)
         
         # 权限检查：是否是群主或成员
         group = await service.get_group_info(group_id)
         if not group:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
-        if str(current_user.id) not in group.member_ids:
+        if current_user_id not in group.member_ids:
             raise HTTPException(status_code=403, detail="无权操作")
         
         # 添加AI成员
         member = await service.add_ai_to_group(
             group_id,
             request.member_id,  # session_id
-            str(current_user.id)
+            current_user_id
         )
         
         return {"success": True, "member": member.model_dump(mode='json')}
@@ -793,11 +841,11 @@ async def add_ai_member(
 async def get_group_members(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """获取群聊成员列表"""
     try:
-        service = GroupChatService(db)
         
         # 权限检查
         group = await service.get_group_info(group_id)
@@ -821,7 +869,8 @@ async def update_ai_behavior(
     group_id: str,
     request: UpdateBehaviorRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     更新AI行为配置
@@ -829,7 +878,6 @@ async def update_ai_behavior(
     可以调整AI的回复概率、延迟、关键词等参数
     """
     try:
-        service = GroupChatService(db)
         
         # 权限检查
         group = await service.get_group_info(group_id)
@@ -853,7 +901,8 @@ async def update_ai_behavior(
 async def get_group_strategy(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     获取群聊策略配置
@@ -863,7 +912,6 @@ async def get_group_strategy(
     权限：群聊成员可查看
     """
     try:
-        service = GroupChatService(db)
         group = await service.get_group_info(group_id)
         
         if not group:
@@ -888,7 +936,8 @@ async def update_group_strategy(
     group_id: str,
     request: UpdateGroupStrategyRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     更新群聊策略配置
@@ -899,14 +948,14 @@ async def update_group_strategy(
     权限：只有群主可以修改策略配置
     """
     try:
-        service = GroupChatService(db)
+        current_user_id = str(current_user.id)
         group = await service.get_group_info(group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
         # 权限检查：仅群主可修改
-        if str(current_user.id) != group.owner_id:
+        if current_user_id != group.owner_id:
             raise HTTPException(status_code=403, detail="只有群主可以修改策略配置")
         
         # 更新策略配置
@@ -923,7 +972,10 @@ async def update_group_strategy(
         if result.modified_count == 0 and result.matched_count == 0:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
-        logger.info(f"✅ 群聊策略配置更新成功: group_id={group_id}, owner_id={current_user.id}")
+        await invalidate_group_cache(group_id)
+        service.invalidate_strategy_config_cache(group_id)
+        
+        logger.info(f"✅ 群聊策略配置更新成功: group_id={group_id}, owner_id={current_user_id}")
         
         return {
             "success": True,
@@ -942,7 +994,8 @@ async def update_group_strategy(
 async def reset_group_strategy(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     重置群聊策略配置为默认值
@@ -952,15 +1005,7 @@ async def reset_group_strategy(
     权限：只有群主可以重置策略配置
     """
     try:
-        service = GroupChatService(db)
-        group = await service.get_group_info(group_id)
-        
-        if not group:
-            raise HTTPException(status_code=404, detail="群聊不存在")
-        
-        # 权限检查：仅群主可重置
-        if str(current_user.id) != group.owner_id:
-            raise HTTPException(status_code=403, detail="只有群主可以重置策略配置")
+        collection_groups = db[settings.mongodb_db_name].group_chats
         
         # 重置为默认配置
         default_config = GroupStrategyConfig()
@@ -969,13 +1014,21 @@ async def reset_group_strategy(
             "updated_at": datetime.utcnow()
         }
         
-        result = await db[settings.mongodb_db_name].group_chats.update_one(
-            {"group_id": group_id},
+        # 更新数据库（权限检查编码在过滤条件中：仅群主可重置）
+        result = await collection_groups.update_one(
+            {"group_id": group_id, "owner_id": str(current_user.id)},
             {"$set": update_data}
         )
         
-        if result.modified_count == 0 and result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="群聊不存在")
+        if result.matched_count == 0:
+            # 未命中时再区分群聊不存在与无权限
+            exists = await collection_groups.count_documents({"group_id": group_id}, limit=1)
+            if not exists:
+                raise HTTPException(status_code=404, detail="群聊不存在")
+            raise HTTPException(status_code=403, detail="只有群主可以重置策略配置")
+        
+        await invalidate_group_cache(group_id)
+        service.invalidate_strategy_config_cache(group_id)
         
         logger.info(f"✅ 群聊策略配置已重置为默认值: group_id={group_id}")
         
@@ -997,7 +1050,8 @@ async def set_ai_online(
     group_id: str,
     ai_member_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     设置AI成员上线
@@ -1008,7 +1062,6 @@ async def set_ai_online(
     - **ai_member_id**: AI成员ID
     """
     try:
-        service = GroupChatService(db)
         
         # 验证用户是否是群成员
         group = await service.get_group_info(group_id)
@@ -1034,7 +1087,8 @@ async def set_ai_offline(
     group_id: str,
     ai_member_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     设置AI成员下线
@@ -1045,7 +1099,6 @@ async def set_ai_offline(
     - **ai_member_id**: AI成员ID
     """
     try:
-        service = GroupChatService(db)
         
         # 验证用户是否是群成员
         group = await service.get_group_info(group_id)
@@ -1070,7 +1123,8 @@ async def set_ai_offline(
 async def set_all_ai_online(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     批量设置所有AI成员上线
@@ -1080,7 +1134,6 @@ async def set_all_ai_online(
     - **group_id**: 群聊ID
     """
     try:
-        service = GroupChatService(db)
         
         # 验证用户是否是群成员
         group = await service.get_group_info(group_id)
@@ -1096,14 +1149,12 @@ async def set_all_ai_online(
         # 筛选AI成员
         ai_members = [m for m in members if m.member_type == "ai"]
         
-        # 批量设置上线
-        success_count = 0
-        for member in ai_members:
-            try:
-                await service.set_ai_status(group_id, member.member_id, "online")
-                success_count += 1
-            except Exception as e:
-                logger.warning(f"设置AI {member.member_id} 上线失败: {e}")
+        # 批量设置上线（单次数据库写入）
+        success_count = await service.set_ai_status_bulk(
+            group_id,
+            [m.member_id for m in ai_members],
+            "online"
+        )
         
         return {
             "success": True, 
@@ -1122,7 +1173,8 @@ async def set_all_ai_online(
 async def set_all_ai_offline(
     group_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     批量设置所有AI成员下线
@@ -1132,7 +1184,6 @@ async def set_all_ai_offline(
     - **group_id**: 群聊ID
     """
     try:
-        service = GroupChatService(db)
         
         # 验证用户是否是群成员
         group = await service.get_group_info(group_id)
@@ -1148,14 +1199,12 @@ async def set_all_ai_offline(
         # 筛选AI成员
         ai_members = [m for m in members if m.member_type == "ai"]
         
-        # 批量设置下线
-        success_count = 0
-        for member in ai_members:
-            try:
-                await service.set_ai_status(group_id, member.member_id, "offline")
-                success_count += 1
-            except Exception as e:
-                logger.warning(f"设置AI {member.member_id} 下线失败: {e}")
+        # 批量设置下线（单次数据库写入）
+        success_count = await service.set_ai_status_bulk(
+            group_id,
+            [m.member_id for m in ai_members],
+            "offline"
+        )
         
         return {
             "success": True, 
@@ -1170,78 +1219,124 @@ async def set_all_ai_offline(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _expand_group_history_references(messages: List[Dict[str, Any]], group_id: str, db: AsyncIOMotorClient) -> List[Dict[str, Any]]:
+async def _get_group_kb_settings(group_id: str, db: AsyncIOMotorClient) -> Optional[Dict[str, Any]]:
+    """
+    获取群聊AI成员启用的知识库配置（按成员顺序取第一个启用了知识库的会话）
+    
+    Returns:
+        启用的 kb_settings；群聊不存在或未启用知识库时返回 None
+    """
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    
+    service = get_group_chat_service(db)
+    group = await service.get_group_info(group_id)
+    if not group:
+        logger.warning(f"📝 群聊历史引用展开: 群聊 {group_id} 不存在")
+        return None
+    
+    # 检查群聊中是否有AI成员且启用了知识库
+    # 从group_members集合查询AI成员
+    kb_settings = None
+    if debug_enabled:
+        logger.debug("📝 群聊历史引用展开: 群组 %s 有 %s 个AI成员", group_id, len(group.ai_member_ids))
+    
+    # 查询AI成员的会话ID（优先读取缓存）
+    session_ids = await get_cached_ai_session_ids(group_id)
+    if session_ids is None:
+        ai_members_cursor = db[settings.mongodb_db_name].group_members.find(
+            {"group_id": group_id, "member_type": "ai"},
+            {"session_id": 1}
+        )
+        ai_members = await ai_members_cursor.to_list(length=None)
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 查询到 %s 个AI成员记录", len(ai_members))
+        session_ids = [m["session_id"] for m in ai_members if m.get("session_id")]
+        await set_cached_ai_session_ids(group_id, session_ids)
+    
+    # 一次查询取回所有AI成员会话的知识库配置（session_id -> kb_settings）
+    session_kb_settings = {}
+    if session_ids:
+        sessions_cursor = db[settings.mongodb_db_name].chat_sessions.find(
+            {"_id": {"$in": session_ids}},
+            {"kb_settings": 1}
+        )
+        async for session_doc in sessions_cursor:
+            session_kb_settings[session_doc["_id"]] = session_doc.get("kb_settings")
+    
+    # 按成员顺序取第一个启用了知识库的会话
+    for session_id in session_ids:
+        ks = session_kb_settings.get(session_id)
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 会话 %s 的 kb_settings=%s", session_id, '存在' if ks else '不存在')
+        if ks and ks.get("enabled"):
+            kb_settings = ks
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 从会话 %s 获取到知识库配置: %s", session_id, kb_settings)
+            break
+    
+    if kb_settings is None:
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 知识库未启用")
+        return None
+    
+    return kb_settings
+
+
+async def _expand_group_history_references(
+    messages: List[Dict[str, Any]],
+    group_id: str,
+    db: AsyncIOMotorClient,
+    kb_settings: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     将群聊历史消息中的精简引用（document_id, chunk_id, score）展开为富引用。
     完全复制普通会话的引用展开逻辑，确保100%一致性。
+    
+    kb_settings: 已预取的知识库配置；未提供时在此查询
     """
-    logger.info(f"📝 群聊历史引用展开: 开始处理，消息数={len(messages) if messages else 0}")
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug("📝 群聊历史引用展开: 开始处理，消息数=%s", len(messages) if messages else 0)
     if not messages:
-        logger.info("📝 群聊历史引用展开: 无消息需要处理")
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 无消息需要处理")
+        return messages
+    
+    # 没有任何消息带引用时直接返回，跳过知识库配置与向量库查询
+    if not any(msg.get("reference") for msg in messages):
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 消息中没有引用，跳过")
         return messages
     
     # 获取群聊信息，检查是否启用了知识库
     try:
-        service = GroupChatService(db)
-        group = await service.get_group_info(group_id)
-        if not group:
-            logger.warning(f"📝 群聊历史引用展开: 群聊 {group_id} 不存在")
-            return messages
-        
-        # 检查群聊中是否有AI成员且启用了知识库
-        # 从group_members集合查询AI成员
-        kb_settings = None
-        logger.info(f"📝 群聊历史引用展开: 群组 {group_id} 有 {len(group.ai_member_ids)} 个AI成员")
-        
-        # 查询AI成员信息
-        ai_members_cursor = db[settings.mongodb_db_name].group_members.find({
-            "group_id": group_id,
-            "member_type": "ai"
-        })
-        ai_members = await ai_members_cursor.to_list(length=None)
-        logger.info(f"📝 群聊历史引用展开: 查询到 {len(ai_members)} 个AI成员记录")
-        
-        for member_doc in ai_members:
-            session_id = member_doc.get("session_id")
-            logger.info(f"📝 群聊历史引用展开: 检查AI成员 {member_doc.get('member_id')}, session_id={session_id}")
-            if session_id:
-                # 查询chat_sessions
-                session_doc = await db[settings.mongodb_db_name].chat_sessions.find_one(
-                    {"_id": session_id}
-                )
-                logger.info(f"📝 群聊历史引用展开: 会话 {session_id} 的 session_doc={'存在' if session_doc else '不存在'}")
-                if session_doc:
-                    kb_enabled = session_doc.get("kb_settings", {}).get("enabled")
-                    logger.info(f"📝 群聊历史引用展开: 会话 {session_id} 的 kb_enabled={kb_enabled}")
-                if session_doc and session_doc.get("kb_settings", {}).get("enabled"):
-                    kb_settings = session_doc.get("kb_settings")
-                    logger.info(f"📝 群聊历史引用展开: 从会话 {session_id} 获取到知识库配置: {kb_settings}")
-                    break
-        
-        if not kb_settings or not kb_settings.get("enabled"):
-            logger.info(f"📝 群聊历史引用展开: 知识库未启用 (kb_settings={'存在' if kb_settings else '不存在'})")
+        if kb_settings is None:
+            kb_settings = await _get_group_kb_settings(group_id, db)
+        if not kb_settings:
             return messages
         
         # 收集所有 chunk_id
         chunk_to_ref = {}  # chunk_id -> 引用数据
         for i, msg in enumerate(messages):
-            msg_id = msg.get("message_id", "未知")
-            ref_field = msg.get("reference")
-            logger.info(f"📝 群聊历史引用展开: 消息#{i} (id={msg_id}), reference字段={ref_field}")
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 消息#%s (id=%s), reference字段=%s", i, msg.get("message_id", "未知"), msg.get("reference"))
             refs = msg.get("reference") or []
             if isinstance(refs, dict):
                 refs = [refs]
             for r in refs:
                 if r and r.get("chunk_id"):
                     chunk_to_ref[r["chunk_id"]] = r
-                    logger.info(f"📝 群聊历史引用展开: 收集到 chunk_id={r.get('chunk_id')}")
+                    if debug_enabled:
+                        logger.debug("📝 群聊历史引用展开: 收集到 chunk_id=%s", r.get('chunk_id'))
         
         chunk_ids = list(chunk_to_ref.keys())
-        logger.info(f"📝 群聊历史引用展开: 收集到 {len(chunk_ids)} 个唯一 chunk_id")
-        logger.info(f"📝 群聊历史引用展开: chunk_to_ref 示例: {list(chunk_to_ref.items())[:2]}")
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: 收集到 %s 个唯一 chunk_id", len(chunk_ids))
+            logger.debug("📝 群聊历史引用展开: chunk_to_ref 示例: %s", list(chunk_to_ref.items())[:2])
         
         if not chunk_ids:
-            logger.info("📝 群聊历史引用展开: 没有需要展开的引用")
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 没有需要展开的引用")
             return messages
         
         # 从多知识库检索
@@ -1252,15 +1347,16 @@ async def _expand_group_history_references(messages: List[Dict[str, Any]], group
         vectorstore_manager = get_vectorstore_manager()
         embedding_manager = get_embedding_manager()
         
-        kb_ids = kb_settings.get("kb_ids", [])
-        logger.info(f"📝 群聊历史引用展开: kb_settings={kb_settings}")
-        logger.info(f"📝 群聊历史引用展开: kb_ids={kb_ids}")
+        kb_ids = kb_settings.get("kb_ids") or []
+        if debug_enabled:
+            logger.debug("📝 群聊历史引用展开: kb_settings=%s", kb_settings)
+            logger.debug("📝 群聊历史引用展开: kb_ids=%s", kb_ids)
         if not kb_ids:
             logger.warning("📝 群聊历史引用展开: kb_settings中未配置kb_ids")
             return messages
         
         # 获取Embedding配置
-        emb_cfg = kb_settings.get("embeddings", {})
+        emb_cfg = kb_settings.get("embeddings") or {}
         provider = emb_cfg.get("provider", "local")
         model = emb_cfg.get("model", "all-MiniLM-L6-v2")
         base_url = emb_cfg.get("base_url")
@@ -1276,21 +1372,30 @@ async def _expand_group_history_references(messages: List[Dict[str, Any]], group
             local_model_path=local_model_path
         )
         
-        # 按document_id分组查询
-        docs_by_kb = {}
-        for kb_id in kb_ids:
-            logger.info(f"📝 群聊历史引用展开: 正在处理知识库 kb_id={kb_id}")
-            kb_doc = await db[settings.mongodb_db_name].knowledge_bases.find_one({"_id": ObjectId(kb_id)})
+        # 一次查询取回所有知识库文档
+        kb_object_ids = [ObjectId(kb_id) for kb_id in kb_ids]
+        kb_docs_cursor = db[settings.mongodb_db_name].knowledge_bases.find(
+            {"_id": {"$in": kb_object_ids}},
+            {"collection_name": 1}
+        )
+        kb_doc_map = {str(doc["_id"]): doc async for doc in kb_docs_cursor}
+        
+        async def _lookup_kb(kb_id: str) -> List[Any]:
+            """查询单个知识库中被引用的chunk"""
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 正在处理知识库 kb_id=%s", kb_id)
+            kb_doc = kb_doc_map.get(kb_id)
             if not kb_doc:
                 logger.warning(f"📝 群聊历史引用展开: 知识库 {kb_id} 不存在")
-                continue
+                return []
             
             collection_name_raw = kb_doc.get("collection_name")
             if not collection_name_raw:
                 logger.warning(f"📝 群聊历史引用展开: 知识库 {kb_id} 没有 collection_name")
-                continue
+                return []
             
-            logger.info(f"📝 群聊历史引用展开: 知识库 {kb_id} 的 collection_name={collection_name_raw}")
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 知识库 %s 的 collection_name=%s", kb_id, collection_name_raw)
             
             # 获取Chroma的collection_name和persist_dir
             collection_name = get_chroma_collection_name(collection_name_raw)
@@ -1304,39 +1409,48 @@ async def _expand_group_history_references(messages: List[Dict[str, Any]], group
                     embedding_function=embedding_function,
                     vector_db_type="chroma"
                 )
-                logger.info(f"📝 群聊历史引用展开: 获取到 VectorStore，类型={type(vs).__name__}, has_get_by_ids={hasattr(vs, 'get_by_ids')}")
+                if debug_enabled:
+                    logger.debug("📝 群聊历史引用展开: 获取到 VectorStore，类型=%s, has_get_by_ids=%s", type(vs).__name__, hasattr(vs, 'get_by_ids'))
                 
                 # 查询该库中的chunk（document_id可能是原始知识库名称或Chroma collection_name）
                 kb_chunks = [
                     cid for cid in chunk_ids 
                     if chunk_to_ref[cid].get("document_id") in [collection_name_raw, collection_name]
                 ]
-                logger.info(f"📝 群聊历史引用展开: 按 document_id 匹配到 {len(kb_chunks)} 个 chunk")
-                logger.info(f"📝 群聊历史引用展开: collection_name_raw={collection_name_raw}, collection_name={collection_name}")
-                if chunk_ids:
-                    logger.info(f"📝 群聊历史引用展开: 第一个引用的document_id={chunk_to_ref[chunk_ids[0]].get('document_id')}")
+                if debug_enabled:
+                    logger.debug("📝 群聊历史引用展开: 按 document_id 匹配到 %s 个 chunk", len(kb_chunks))
+                    logger.debug("📝 群聊历史引用展开: collection_name_raw=%s, collection_name=%s", collection_name_raw, collection_name)
+                if chunk_ids and debug_enabled:
+                    logger.debug("📝 群聊历史引用展开: 第一个引用的document_id=%s", chunk_to_ref[chunk_ids[0]].get('document_id'))
                 
                 if not kb_chunks:
                     # 如果没有按document_id匹配的，尝试查询所有chunk（回退机制）
                     kb_chunks = chunk_ids
-                    logger.info(f"📝 群聊历史引用展开: 未匹配到，使用所有 chunk_ids作为回退，共 {len(kb_chunks)} 个")
+                    if debug_enabled:
+                        logger.debug("📝 群聊历史引用展开: 未匹配到，使用所有 chunk_ids作为回退，共 %s 个", len(kb_chunks))
                 
                 if kb_chunks and hasattr(vs, "get_by_ids"):
-                    logger.info(f"📝 群聊历史引用展开: 准备调用 get_by_ids 查询 {len(kb_chunks)} 个文档")
+                    if debug_enabled:
+                        logger.debug("📝 群聊历史引用展开: 准备调用 get_by_ids 查询 %s 个文档", len(kb_chunks))
                     docs = await vs.get_by_ids(kb_chunks)
-                    logger.info(f"📝 群聊历史引用展开: get_by_ids 返回了 {len(docs)} 个文档")
-                    for doc in docs:
-                        cid = doc.metadata.get("chunk_id")
-                        if cid:
-                            docs_by_kb[cid] = doc
-                    logger.info(f"📝 群聊历史引用展开: 从知识库 {collection_name} 查询到 {len(docs)} 个文档")
-                else:
-                    logger.warning(f"📝 群聊历史引用展开: kb_chunks={len(kb_chunks) if kb_chunks else 0}, has_get_by_ids={hasattr(vs, 'get_by_ids')}")
+                    if debug_enabled:
+                        logger.debug("📝 群聊历史引用展开: 从知识库 %s 查询到 %s 个文档", collection_name, len(docs))
+                    return docs
+                logger.warning(f"📝 群聊历史引用展开: kb_chunks={len(kb_chunks) if kb_chunks else 0}, has_get_by_ids={hasattr(vs, 'get_by_ids')}")
             except Exception as e:
                 logger.error(f"📝 群聊历史引用展开: 查询知识库 {collection_name} 失败: {e}", exc_info=True)
-                continue
+            return []
         
-        logger.info(f"📝 群聊历史引用展开: 总共查询到 {len(docs_by_kb)} 个文档")
+        # 各知识库查询互不依赖，并行执行；按 kb_ids 顺序合并结果
+        kb_results = await asyncio.gather(*(_lookup_kb(kb_id) for kb_id in kb_ids))
+        docs_by_kb = {}
+        for docs in kb_results:
+            for doc in docs:
+                cid = doc.metadata.get("chunk_id")
+                if cid:
+                    docs_by_kb[cid] = doc
+        
+        logger.info("📝 群聊历史引用展开: 消息数=%d, 引用chunk数=%d, 查询到文档数=%d", len(messages), len(chunk_ids), len(docs_by_kb))
         
         # 展开引用
         for msg in messages:
@@ -1369,7 +1483,8 @@ async def _expand_group_history_references(messages: List[Dict[str, Any]], group
                     "filename": meta.get("filename") or r.get("filename"),
                 })
             
-            logger.info(f"📝 群聊历史引用展开: 消息展开了 {len(rich_refs)} 个引用")
+            if debug_enabled:
+                logger.debug("📝 群聊历史引用展开: 消息展开了 %s 个引用", len(rich_refs))
             msg["reference"] = rich_refs
         
         return messages
@@ -1379,15 +1494,31 @@ async def _expand_group_history_references(messages: List[Dict[str, Any]], group
         return messages
 
 
+# 群聊消息查询投影（只取 GroupMessage 模型字段，排除 _id）
+_GROUP_MESSAGE_PROJECTION = {"_id": 0, **{name: 1 for name in GroupMessage.model_fields}}
+
+
+def _group_message_doc_to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将数据库中的消息文档补齐 GroupMessage 的默认字段
+    
+    消息均由服务端写入，读取时跳过逐条 Pydantic 校验与 model_dump
+    """
+    for name, field in GroupMessage.model_fields.items():
+        if name not in doc and not field.is_required():
+            doc[name] = field.get_default(call_default_factory=True)
+    return doc
+
+
 async def _update_message_sender_names(
-    messages: List[GroupMessage],
+    messages: List[Union[GroupMessage, Dict[str, Any]]],
     db: AsyncIOMotorClient
 ) -> List[dict]:
     """
     动态更新消息的sender_name（从chat_sessions获取最新名称）
     
     Args:
-        messages: 消息列表
+        messages: 消息列表（GroupMessage 或已是字典的消息文档）
         db: 数据库连接
     
     Returns:
@@ -1396,28 +1527,37 @@ async def _update_message_sender_names(
     if not messages:
         return []
     
+    result = [
+        msg if isinstance(msg, dict) else msg.model_dump(mode='json')
+        for msg in messages
+    ]
+    
     # 收集所有需要查询的ID（真人用户ID和AI会话ID）
     user_ids = set()
     session_ids = set()
     
-    for msg in messages:
-        if msg.sender_id.startswith("ai_"):
+    for msg_dict in result:
+        sender_id = msg_dict["sender_id"]
+        if sender_id.startswith("ai_"):
             # AI消息：提取session_id
-            session_id = msg.sender_id.replace("ai_", "")
+            session_id = sender_id.replace("ai_", "")
             session_ids.add(session_id)
         else:
             # 真人消息：user_id
-            user_ids.add(msg.sender_id)
+            user_ids.add(sender_id)
     
-    # 批量查询真人用户信息
+    # 批量查询真人用户信息（users._id 为 ObjectId，需转换后才能命中 _id 索引）
     user_name_map = {}
-    if user_ids:
-        users_cursor = db[settings.mongodb_db_name].users.find(
-            {"_id": {"$in": list(user_ids)}}
-        )
-        async for user_doc in users_cursor:
-            user_id = str(user_doc["_id"])
-            user_name_map[user_id] = user_doc.get("username", "未知用户")
+    user_oids = [ObjectId(u) for u in user_ids if ObjectId.is_valid(u)]
+    if user_oids:
+        user_docs = await db[settings.mongodb_db_name].users.find(
+            {"_id": {"$in": user_oids}},
+            {"full_name": 1, "account": 1}
+        ).to_list(length=len(user_oids))
+        user_name_map = {
+            str(doc["_id"]): doc.get("full_name") or doc.get("account") or "未知用户"
+            for doc in user_docs
+        }
     
     # 批量查询AI会话信息（只查询chat_sessions）
     session_name_map = {}
@@ -1425,41 +1565,66 @@ async def _update_message_sender_names(
         session_list = list(session_ids)
         
         # 查询chat_sessions
-        chat_sessions_cursor = db[settings.mongodb_db_name].chat_sessions.find(
-            {"_id": {"$in": session_list}}
-        )
-        async for session_doc in chat_sessions_cursor:
-            session_id = str(session_doc["_id"])
-            session_name_map[session_id] = session_doc.get("name", "AI助手")
+        session_docs = await db[settings.mongodb_db_name].chat_sessions.find(
+            {"_id": {"$in": session_list}},
+            {"name": 1}
+        ).to_list(length=len(session_list))
+        session_name_map = {
+            str(doc["_id"]): doc.get("name", "AI助手")
+            for doc in session_docs
+        }
     
     # 更新消息的sender_name
-    result = []
-    for msg in messages:
-        msg_dict = msg.model_dump(mode='json')
-        
+    for msg_dict in result:
         # 动态获取最新的sender_name
-        if msg.sender_id.startswith("ai_"):
-            session_id = msg.sender_id.replace("ai_", "")
-            msg_dict["sender_name"] = session_name_map.get(session_id, msg.sender_name)
+        sender_id = msg_dict["sender_id"]
+        if sender_id.startswith("ai_"):
+            session_id = sender_id.replace("ai_", "")
+            msg_dict["sender_name"] = session_name_map.get(session_id, msg_dict["sender_name"])
         else:
-            msg_dict["sender_name"] = user_name_map.get(msg.sender_id, msg.sender_name)
+            msg_dict["sender_name"] = user_name_map.get(sender_id, msg_dict["sender_name"])
         
         # ✅ 确保 reference 字段存在且格式正确（与普通会话字段名一致）
         if not msg_dict.get("reference"):
             msg_dict["reference"] = []
-        
-        result.append(msg_dict)
     
     return result
 
 
+async def _enrich_messages(
+    messages: List[Union[GroupMessage, Dict[str, Any]]],
+    group_id: str,
+    db: AsyncIOMotorClient,
+    kb_settings: Optional[Dict[str, Any]] = None
+) -> List[dict]:
+    """
+    历史消息后处理：动态更新sender_name并展开知识库引用
+    
+    两步分别只写 sender_name 与 reference 字段，统一转换为字典后
+    并发执行，用户/会话查询与知识库查询不再串行等待
+    """
+    if not messages:
+        return []
+    
+    message_dicts = [
+        msg if isinstance(msg, dict) else msg.model_dump(mode='json')
+        for msg in messages
+    ]
+    await asyncio.gather(
+        _update_message_sender_names(message_dicts, db),
+        _expand_group_history_references(message_dicts, group_id, db, kb_settings=kb_settings)
+    )
+    return message_dicts
+
+
 @router.get("/groups/{group_id}/messages")
 async def get_group_messages(
     group_id: str,
     limit: Optional[int] = None,
     before_timestamp: Optional[float] = None,  # 使用时间戳游标代替offset
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     获取群聊消息历史（支持懒加载分页）
@@ -1473,7 +1638,6 @@ async def get_group_messages(
     - 如果指定limit，返回分页数据：{messages, total, has_more, oldest_timestamp}
     """
     try:
-        service = GroupChatService(db)
         
         # 权限检查
         group = await service.get_group_info(group_id)
@@ -1486,49 +1650,39 @@ async def get_group_messages(
         # 如果没有指定limit，返回所有消息（向后兼容）
         if limit is None:
             all_messages = await service.get_recent_messages(group_id, limit=1000)
-            # 🔥 动态更新sender_name
-            updated_messages = await _update_message_sender_names(all_messages, db)
-            # 🔥 展开知识库引用（与普通会话100%一致）
-            expanded_messages = await _expand_group_history_references(updated_messages, group_id, db)
+            # 🔥 动态更新sender_name + 展开知识库引用（与普通会话100%一致）
+            expanded_messages = await _enrich_messages(all_messages, group_id, db)
             logger.info(f"获取群聊消息（全部） - 群组ID: {group_id}, 消息数量: {len(expanded_messages)}")
             return expanded_messages
         
         # 懒加载模式：使用时间戳游标
-        # 获取总消息数（用于判断是否还有更多）
-        collection = db.group_messages
-        total_count = await collection.count_documents({"group_id": group_id})
+        collection = db[settings.mongodb_db_name].group_messages
         
         # 构建查询条件
         query = {"group_id": group_id}
         if before_timestamp is not None:
             query["timestamp"] = {"$lt": before_timestamp}
         
-        # 按时间倒序查询（最新的在前）
-        cursor = collection.find(query).sort("timestamp", -1).limit(limit)
+        # 按时间倒序查询（最新的在前），多取一条用于判断是否还有更多消息；
+        # 总消息数与分页查询并行执行
+        cursor = collection.find(query, _GROUP_MESSAGE_PROJECTION).sort("timestamp", -1).limit(limit + 1)
+        total_count, docs = await asyncio.gather(
+            collection.count_documents({"group_id": group_id}),
+            cursor.to_list(length=limit + 1)
+        )
         
-        message_objects = []
-        oldest_timestamp = None
-        async for doc in cursor:
-            doc.pop("_id", None)
-            message = GroupMessage(**doc)
-            message_objects.append(message)
-            # 记录最旧的时间戳
-            if oldest_timestamp is None or message.timestamp < oldest_timestamp:
-                oldest_timestamp = message.timestamp
+        # 判断是否还有更多消息
+        has_more = len(docs) > limit
+        if has_more:
+            docs = docs[:limit]
         
-        # 🔥 动态更新sender_name
-        updated_messages = await _update_message_sender_names(message_objects, db)
-        # 🔥 展开知识库引用（与普通会话100%一致）
-        expanded_messages = await _expand_group_history_references(updated_messages, group_id, db)
+        # 直接使用字典，跳过逐条 Pydantic 构造
+        message_docs = [_group_message_doc_to_dict(doc) for doc in docs]
+        # 结果按时间倒序，最后一条即最旧的时间戳
+        oldest_timestamp = message_docs[-1]["timestamp"] if message_docs else None
         
-        # 判断是否还有更多消息
-        has_more = False
-        if oldest_timestamp is not None:
-            older_count = await collection.count_documents({
-                "group_id": group_id,
-                "timestamp": {"$lt": oldest_timestamp}
-            })
-            has_more = older_count > 0
+        # 🔥 动态更新sender_name + 展开知识库引用（与普通会话100%一致）
+        expanded_messages = await _enrich_messages(message_docs, group_id, db)
         
         logger.info(f"获取群聊消息（懒加载） - 群组ID: {group_id}, 返回: {len(expanded_messages)}条, 总数: {total_count}, 还有更多: {has_more}")
         
@@ -1550,7 +1704,8 @@ async def send_message(
     group_id: str,
     request: SendMessageRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """
     发送群聊消息
@@ -1561,20 +1716,20 @@ async def send_message(
     - **content**: 消息内容
     """
     try:
-        service = GroupChatService(db)
+        current_user_id = str(current_user.id)
         
         # 验证用户是否是群成员
         group = await service.get_group_info(group_id)
         if not group:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
-        if str(current_user.id) not in group.member_ids:
+        if current_user_id not in group.member_ids:
             raise HTTPException(status_code=403, detail="无权在该群聊发送消息")
         
         # 发送消息
         message = await service.send_message(
             group_id=group_id,
-            sender_id=str(current_user.id),
+            sender_id=current_user_id,
             content=request.content
         )
         
@@ -1589,10 +1744,10 @@ async def send_message(
 @router.get("/stats")
 async def get_scheduler_stats(
     current_user: User = Depends(get_current_user),
-    db: AsyncIOMotorClient = Depends(get_database)
+    db: AsyncIOMotorClient = Depends(get_database),
+    service: GroupChatService = Depends(get_group_chat_service_dependency)
 ):
     """获取调度器统计信息（调试用）"""
-    service = GroupChatService(db)
     stats = await service.get_scheduler_stats()
     return stats
 
@@ -1609,7 +1764,7 @@ async def search_users(
     
     **参数：**
     
-    - **query**: 搜索关键词（匹配用户名或昵称）
+    - **query**: 搜索关键词（前缀匹配用户名或昵称）
     - **limit**: 返回结果数量限制（默认10）
     
     **返回：**
@@ -1626,13 +1781,14 @@ async def search_users(
     ```
     """
     try:
-        from ..config import settings
-        
-        # 构建搜索条件（模糊匹配账号或全名）
+        # 构建搜索条件（前缀匹配账号或全名）
+        # 锚定 ^ 的前缀正则可以走 account / full_name 索引，避免全表扫描；
+        # 用户输入经过 re.escape 转义，防止特殊字符被当作正则解析
+        prefix_pattern = "^" + re.escape(query)
         search_filter = {
             "$or": [
-                {"account": {"$regex": query, "$options": "i"}},  # 不区分大小写
-                {"full_name": {"$regex": query, "$options": "i"}}
+                {"account": {"$regex": prefix_pattern, "$options": "i"}},  # 不区分大小写
+                {"full_name": {"$regex": prefix_pattern, "$options": "i"}}
             ]
         }
         
@@ -1644,15 +1800,17 @@ async def search_users(
             search_filter,
             {"_id": 1, "account": 1, "full_name": 1, "avatar_url": 1}
         ).limit(limit)
+        user_docs = await cursor.to_list(length=limit)
         
-        users = []
-        async for user_doc in cursor:
-            users.append({
+        users = [
+            {
                 "user_id": str(user_doc["_id"]),  # 转换ObjectId为字符串
                 "username": user_doc.get("account", ""),  # 账号
                 "nickname": user_doc.get("full_name") or user_doc.get("account", "未命名用户"),  # 显示名称（优先全名，否则账号）
                 "avatar": user_doc.get("avatar_url")
-            })
+            }
+            for user_doc in user_docs
+        ]
         
         logger.info(f"🔍 搜索用户: 关键词={query} | 结果数={len(users)}")
         return users
@@ -1687,17 +1845,15 @@ async def websocket_group_chat(
     }
     ```
     """
-    import asyncio
-    from datetime import datetime, timedelta
-    
     await websocket.accept()
     logger.info(f"🔌 WebSocket连接请求: 群组={group_id}")
     
-    service = GroupChatService(db)
+    service = get_group_chat_service(db)
     user_id = None
     websocket_id = str(uuid.uuid4())
-    last_activity = datetime.now()
-    TIMEOUT_SECONDS = 90  # 90秒超时（前端30秒心跳，留足余量）
+    # 使用单调时钟记录最后活动时间（不受系统时间调整影响，且无需构造 datetime 对象）
+    last_activity = time.monotonic()
+    TIMEOUT_SECONDS = 90.0  # 90秒超时（前端30秒心跳，留足余量）
     
     async def check_timeout():
         """定期检查连接超时"""
@@ -1705,11 +1861,13 @@ async def websocket_group_chat(
         while True:
             await asyncio.sleep(30)  # 每30秒检查一次
             
-            if datetime.now() - last_activity > timedelta(seconds=TIMEOUT_SECONDS):
-                logger.warning(f"⏰ WebSocket超时: 群组={group_id} | 用户={user_id} | 最后活动={last_activity}")
+            idle_seconds = time.monotonic() - last_activity
+            if idle_seconds > TIMEOUT_SECONDS:
+                logger.warning(f"⏰ WebSocket超时: 群组={group_id} | 用户={user_id} | 空闲={idle_seconds:.0f}秒")
                 raise Exception("连接超时")
     
     timeout_task = asyncio.create_task(check_timeout())
+    history_task = None
     
     try:
         # 1. 等待认证消息（10秒超时）
@@ -1724,7 +1882,7 @@ async def websocket_group_chat(
             await websocket.close()
             return
         
-        last_activity = datetime.now()
+        last_activity = time.monotonic()
         
         if auth_data.get("type") != "auth":
             await websocket.send_json({
@@ -1774,45 +1932,59 @@ async def websocket_group_chat(
             await websocket.close()
             return
         
-        # 4. 连接成功
-        await service.human_connect(group_id, user_id, websocket_id, websocket)
-        logger.info(f"✅ WebSocket认证成功: 群组={group_id} | 用户={user_id} | WS_ID={websocket_id}")
-        
+        # 4. 连接成功（先通知客户端，使其可以立即渲染界面）
         await websocket.send_json({
             "type": "auth_success",
             "data": {"message": "认证成功"}
         })
         
-        # 5. 发送历史消息（懒加载优化：只发送最近20条）
-        INITIAL_LOAD_LIMIT = 20
-        all_messages = await service.get_recent_messages(group_id, limit=1000)  # 获取足够多的消息用于统计
-        total_messages = len(all_messages)
-        
-        # 只发送最近的消息
-        recent_messages = all_messages[-INITIAL_LOAD_LIMIT:] if len(all_messages) > INITIAL_LOAD_LIMIT else all_messages
-        has_more = len(all_messages) > INITIAL_LOAD_LIMIT
+        await service.human_connect(group_id, user_id, websocket_id, websocket)
+        logger.info(f"✅ WebSocket认证成功: 群组={group_id} | 用户={user_id} | WS_ID={websocket_id}")
         
-        # 🔥 动态更新sender_name
-        updated_recent_messages = await _update_message_sender_names(recent_messages, db)
-        # 🔥 展开知识库引用（与普通会话100%一致）
-        expanded_recent_messages = await _expand_group_history_references(updated_recent_messages, group_id, db)
+        # 5. 后台发送历史消息（懒加载优化：只发送最近20条），不阻塞消息循环
+        async def send_history():
+            try:
+                INITIAL_LOAD_LIMIT = 20
+                # 消息查询（多取一条用于判断是否还有更多）、总数统计与知识库配置预取并行执行
+                recent_messages, total_messages, kb_settings = await asyncio.gather(
+                    service.get_recent_messages(group_id, limit=INITIAL_LOAD_LIMIT + 1),
+                    db[settings.mongodb_db_name].group_messages.count_documents({"group_id": group_id}),
+                    _get_group_kb_settings(group_id, db)
+                )
+                
+                # 只发送最近的消息（get_recent_messages 按时间正序返回，多取的一条在最前面）
+                has_more = len(recent_messages) > INITIAL_LOAD_LIMIT
+                if has_more:
+                    recent_messages = recent_messages[-INITIAL_LOAD_LIMIT:]
+                
+                # 🔥 动态更新sender_name + 展开知识库引用（与普通会话100%一致）
+                if kb_settings:
+                    expanded_recent_messages = await _enrich_messages(
+                        recent_messages, group_id, db, kb_settings=kb_settings
+                    )
+                else:
+                    expanded_recent_messages = await _update_message_sender_names(recent_messages, db)
+                
+                logger.info(f"📤 发送历史消息（懒加载），显示最近{len(expanded_recent_messages)}条，总共{total_messages}条，还有更多: {has_more}")
+                
+                await websocket.send_json({
+                    "type": "history",
+                    "data": {
+                        "messages": expanded_recent_messages,
+                        "total": total_messages,
+                        "loaded": len(expanded_recent_messages),
+                        "has_more": has_more
+                    }
+                })
+            except Exception as e:
+                logger.error(f"❌ 发送历史消息失败: 群组={group_id} | 用户={user_id} | 错误={e}", exc_info=True)
         
-        logger.info(f"📤 发送历史消息（懒加载），显示最近{len(expanded_recent_messages)}条，总共{total_messages}条，还有更多: {has_more}")
-        
-        await websocket.send_json({
-            "type": "history",
-            "data": {
-                "messages": expanded_recent_messages,
-                "total": total_messages,
-                "loaded": len(expanded_recent_messages),
-                "has_more": has_more
-            }
-        })
+        history_task = asyncio.create_task(send_history())
         
         # 6. 消息循环
         while True:
             data = await websocket.receive_json()
-            last_activity = datetime.now()  # 更新活动时间
+            last_activity = time.monotonic()  # 更新活动时间
             msg_type = data.get("type")
             
             if msg_type == "message":
@@ -1829,18 +2001,19 @@ async def websocket_group_chat(
                     reply_to=reply_to
                 )
                 
-                message = await service.send_human_message(group_id, user_id, request)
+                _, message_data = await service.send_human_message_with_data(group_id, user_id, request)
                 
-                # 发送确认（需要序列化 datetime）
-                await websocket.send_json({
+                # 发送确认（复用广播时已序列化的消息数据）
+                await websocket.send_text(_prepare_ws_payload({
                     "type": "message_sent",
-                    "data": message.model_dump(mode='json')
-                })
+                    "data": message_data
+                }))
             
             elif msg_type == "ping":
                 # 心跳
-                logger.debug(f"💓 收到心跳ping: 群组={group_id} | 用户={user_id}")
-                await websocket.send_json({"type": "pong"})
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("💓 收到心跳ping: 群组=%s | 用户=%s", group_id, user_id)
+                await websocket.send_text(_PONG_PAYLOAD)
             
             else:
                 logger.warning(f"未知消息类型: {msg_type}")
@@ -1854,26 +2027,36 @@ async def websocket_group_chat(
     except Exception as e:
         logger.error(f"❌ WebSocket错误: {e} | 群组={group_id} | 用户={user_id}", exc_info=True)
         try:
-            await websocket.send_json({
-                "type": "error",
-                "data": {"message": str(e)}
-            })
-        except:
+            # 连接可能已失效，限时发送，避免卡在底层 TCP 超时上
+            await asyncio.wait_for(
+                websocket.send_text(_prepare_ws_payload({
+                    "type": "error",
+                    "data": {"message": str(e)}
+                })),
+                timeout=2.0
+            )
+        except Exception:
             pass
     
     finally:
-        # 取消超时检测任务
-        timeout_task.cancel()
-        try:
-            await timeout_task
-        except asyncio.CancelledError:
-            pass
+        # 取消未完成的历史消息发送任务
+        if history_task and not history_task.done():
+            history_task.cancel()
+        
+        # 取消超时检测任务（协程没有需要收尾的资源，取消后不必再 await）
+        if not timeout_task.done():
+            timeout_task.cancel()
+        elif not timeout_task.cancelled():
+            # 已因超时结束：取走异常，避免 "Task exception was never retrieved"
+            timeout_task.exception()
         
         # 清理连接
         if user_id:
             try:
-                await service.human_disconnect(group_id, user_id)
+                await asyncio.wait_for(service.human_disconnect(group_id, user_id), timeout=5.0)
                 logger.info(f"🧹 WebSocket资源清理完成: 群组={group_id} | 用户={user_id}")
+            except asyncio.TimeoutError:
+                logger.warning(f"⏰ 清理连接超时: 群组={group_id} | 用户={user_id}")
             except Exception as e:
                 logger.error(f"❌ 清理连接失败: {e}")
 
@@ -1894,57 +2077,48 @@ async def clear_all_messages(
     注意：不会删除群聊本身和成员信息
     """
     try:
+        current_user_id = str(current_user.id)
+        database = db[settings.mongodb_db_name]
+        
         # 验证群聊是否存在
-        group = await db[settings.mongodb_db_name].group_chats.find_one({"group_id": group_id})
+        group = await database.group_chats.find_one({"group_id": group_id}, {"owner_id": 1})
         if not group:
             raise HTTPException(status_code=404, detail="群聊不存在")
         
         # 验证是否是群主
-        if group.get("owner_id") != current_user.id:
+        if group.get("owner_id") != current_user_id:
             raise HTTPException(status_code=403, detail="只有群主可以清空历史消息")
         
-        logger.info(f"开始清空群聊历史消息: {group_id}, 群主: {current_user.id}")
-        
-        # 1. 删除 MinIO 中的所有消息文件（图片、语音等）
-        total_deleted_files = 0
-        try:
-            # 群聊消息文件存储在 group-chats/{group_id}/messages/ 路径下
-            folder_prefix = f"group-chats/{group_id}/messages/"
-            deleted_count = minio_client.delete_folder(folder_prefix)
-            total_deleted_files += deleted_count
-            logger.info(f"已删除MinIO消息文件夹: {folder_prefix}, 文件数: {deleted_count}")
-        except Exception as e:
-            logger.warning(f"删除MinIO消息文件夹失败: {e}")
-            # 继续执行，不因为MinIO删除失败而中断
+        logger.info(f"开始清空群聊历史消息: {group_id}, 群主: {current_user_id}")
         
-        # 2. 删除 MongoDB 中的所有群聊消息
-        messages_result = await db[settings.mongodb_db_name].group_messages.delete_many(
-            {"group_id": group_id}
+        # 1. 并行删除 MinIO 中的所有消息文件（图片、语音等）与 2. MongoDB 中的所有群聊消息
+        # 群聊消息文件存储在 group-chats/{group_id}/messages/ 路径下
+        folder_prefix = f"group-chats/{group_id}/messages/"
+        minio_result, messages_result = await asyncio.gather(
+            minio_client.async_delete_folder(folder_prefix),
+            database.group_messages.delete_many({"group_id": group_id}),
+            return_exceptions=True
         )
+        if isinstance(messages_result, Exception):
+            raise messages_result
         logger.info(f"已删除群聊消息: {messages_result.deleted_count} 条")
         
-        # 3. 通知所有在线成员消息已被清空（通过WebSocket）
+        total_deleted_files = 0
+        if isinstance(minio_result, Exception):
+            # 继续执行，不因为MinIO删除失败而中断
+            logger.warning(f"删除MinIO消息文件夹失败: {minio_result}")
+        else:
+            total_deleted_files = minio_result
+            logger.info(f"已删除MinIO消息文件夹: {folder_prefix}, 文件数: {minio_result}")
+        
+        # 3. 通知所有在线成员消息已被清空（通过WebSocket，并发发送）
         try:
-            service = GroupChatService.get_instance()
-            connections = service.get_group_connections(group_id)
-            
-            clear_notification = {
-                "type": "messages_cleared",
-                "data": {
-                    "group_id": group_id,
-                    "cleared_by": current_user.username,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            }
-            
-            logger.info(f"📢 通知 {len(connections)} 个在线连接: 历史消息已清空")
-            
-            for conn in connections:
-                try:
-                    await conn.send_json(clear_notification)
-                    logger.debug(f"✅ 已通知连接清空消息")
-                except Exception as e:
-                    logger.warning(f"发送清空通知失败: {e}")
+            service = get_group_chat_service(db)
+            await service.broadcast_group_event(group_id, "messages_cleared", {
+                "group_id": group_id,
+                "cleared_by": current_user.full_name or current_user.account,
+                "timestamp": datetime.utcnow().isoformat()
+            })
         except Exception as e:
             logger.warning(f"通知在线成员失败: {e}")
         
@@ -1965,9 +2139,31 @@ async def clear_all_messages(
         raise HTTPException(status_code=500, detail=f"清空历史消息失败: {str(e)}")
 
 
+async def _purge_group_minio_files(group_id: str):
+    """
+    后台清理已解散群聊在 MinIO 中的文件
+    
+    文件属于可回收的垃圾数据，失败只记录日志，不影响解散结果
+    """
+    minio_prefixes = [
+        (f"group-chats/{group_id}/", "群聊文件夹"),
+        (f"groups/{group_id}/", "背景图文件夹"),
+    ]
+    results = await asyncio.gather(
+        *(minio_client.async_delete_folder(prefix) for prefix, _ in minio_prefixes),
+        return_exceptions=True
+    )
+    for (prefix, label), result in zip(minio_prefixes, results):
+        if isinstance(result, Exception):
+            logger.warning(f"删除MinIO{label}失败: {prefix}, 错误: {result}")
+            continue
+        logger.info(f"已删除MinIO{label}: {prefix}, 文件数: {result}")
+
+
 @router.delete("/groups/{group_id}")
 async def delete_group(
     group_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorClient = Depends(get_database)
 ):
@@ -1985,80 +2181,62 @@ async def delete_group(
     注意：不会删除AI会话实例，因为它们是独立的会话
     """
     try:
-        # 验证群聊是否存在
-        group = await db[settings.mongodb_db_name].group_chats.find_one({"group_id": group_id})
-        if not group:
-            raise HTTPException(status_code=404, detail="群聊不存在")
-        
-        # 验证是否是群主
-        if group.get("owner_id") != current_user.id:
-            raise HTTPException(status_code=403, detail="只有群主可以解散群聊")
-        
-        logger.info(f"开始解散群聊: {group_id}, 群主: {current_user.id}")
+        current_user_id = str(current_user.id)
+        database = db[settings.mongodb_db_name]
         
-        # 1. 删除 MinIO 中的群聊文件夹及所有文件
-        total_deleted_files = 0
-        try:
-            folder_prefix = f"group-chats/{group_id}/"
-            deleted_count = minio_client.delete_folder(folder_prefix)
-            total_deleted_files += deleted_count
-            logger.info(f"已删除MinIO文件夹: {folder_prefix}, 文件数: {deleted_count}")
-        except Exception as e:
-            logger.warning(f"删除MinIO群聊文件夹失败: {e}")
-            # 继续执行，不因为MinIO删除失败而中断
+        # 1. 按 {group_id, owner_id} 条件删除群聊文档，存在性与群主校验合并为一次往返
+        group_result = await database.group_chats.delete_one(
+            {"group_id": group_id, "owner_id": current_user_id}
+        )
         
-        # 1.5. 删除 MinIO 中的群聊背景图（存储在 groups/{group_id}/ 路径下）
-        try:
-            background_prefix = f"groups/{group_id}/"
-            deleted_bg_count = minio_client.delete_folder(background_prefix)
-            total_deleted_files += deleted_bg_count
-            logger.info(f"已删除MinIO背景图文件夹: {background_prefix}, 文件数: {deleted_bg_count}")
-        except Exception as e:
-            logger.warning(f"删除MinIO背景图文件夹失败: {e}")
-            # 继续执行，不因为MinIO删除失败而中断
+        if group_result.deleted_count == 0:
+            # 未删除时再查一次群聊是否存在，区分 404 与 403
+            exists = await database.group_chats.count_documents({"group_id": group_id}, limit=1)
+            if not exists:
+                raise HTTPException(status_code=404, detail="群聊不存在")
+            raise HTTPException(status_code=403, detail="只有群主可以解散群聊")
         
-        # 2. 删除 MongoDB 中的群聊消息
-        messages_result = await db[settings.mongodb_db_name].group_messages.delete_many(
-            {"group_id": group_id}
-        )
-        logger.info(f"已删除群聊消息: {messages_result.deleted_count} 条")
+        logger.info(f"开始解散群聊: {group_id}, 群主: {current_user_id}")
         
-        # 3. 删除 MongoDB 中的群聊成员记录（如果有单独的集合）
-        # 注意：当前成员信息存储在 group_chats 文档中，所以这一步可能不需要
-        # 如果将来有独立的 group_members 集合，取消注释以下代码：
-        # members_result = await db[settings.mongodb_db_name].group_members.delete_many(
-        #     {"group_id": group_id}
-        # )
-        # logger.info(f"已删除群聊成员记录: {members_result.deleted_count} 条")
-        
-        # 4. 删除 MongoDB 中的群聊文档
-        group_result = await db[settings.mongodb_db_name].group_chats.delete_one(
-            {"group_id": group_id}
+        # 2. 并行清理 MongoDB 中的关联数据（彼此互不依赖）：
+        #    - 群聊消息
+        #    - groups 集合记录（存储背景图信息）
+        # 注意：当前成员信息存储在 group_chats 文档中，所以不单独删除 group_members
+        messages_result, groups_result = await asyncio.gather(
+            database.group_messages.delete_many({"group_id": group_id}),
+            database.groups.delete_one({"group_id": group_id}),
+            return_exceptions=True
         )
         
-        if group_result.deleted_count == 0:
-            raise HTTPException(status_code=500, detail="删除群聊失败")
+        if isinstance(messages_result, Exception):
+            # 群聊文档已删除，残留消息不再可访问，记录日志即可
+            logger.error(f"删除群聊消息失败: {messages_result}")
+            deleted_messages = 0
+        else:
+            deleted_messages = messages_result.deleted_count
+            logger.info(f"已删除群聊消息: {deleted_messages} 条")
         
-        # 5. 删除 MongoDB 中的 groups 集合记录（存储背景图信息）
-        try:
-            groups_result = await db[settings.mongodb_db_name].groups.delete_one(
-                {"group_id": group_id}
-            )
-            if groups_result.deleted_count > 0:
-                logger.info(f"已删除groups集合记录: {groups_result.deleted_count} 条")
-        except Exception as e:
-            logger.warning(f"删除groups集合记录失败: {e}")
+        if isinstance(groups_result, Exception):
             # 继续执行，不因为删除失败而中断
+            logger.warning(f"删除groups集合记录失败: {groups_result}")
+        elif groups_result.deleted_count > 0:
+            logger.info(f"已删除groups集合记录: {groups_result.deleted_count} 条")
         
-        logger.info(f"✅ 群聊解散成功: {group_id}")
+        await invalidate_group_cache(group_id)
+        
+        # 3. MinIO 文件（群聊文件夹 group-chats/{group_id}/ 与背景图 groups/{group_id}/）
+        #    在响应返回后后台清理，不阻塞解散请求
+        background_tasks.add_task(_purge_group_minio_files, group_id)
+        
+        logger.info(f"✅ 群聊解散成功: {group_id}（MinIO文件后台清理中）")
         
         return {
             "success": True,
             "message": "群聊已解散",
             "deleted": {
                 "group": 1,
-                "messages": messages_result.deleted_count,
-                "files": total_deleted_files
+                "messages": deleted_messages,
+                "files": "pending"
             }
         }
     except HTTPException:
@@ -8,14 +8,12 @@ import httpx
 import asyncio
 import time
 import base64
-import base64
-import base64
-import base64
 
 from ..models.user import User, get_current_active_user
 from ..database import get_database
 from ..config import settings
 from ..utils.image_generation.modelscope import ModelScopeImageGenerationService
+from ..utils.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -45,9 +43,11 @@ async def get_all_user_image_generation_configs(
 ):
     """获取用户所有图片生成配置"""
     try:
-        user_doc = await db[settings.mongodb_db_name].users.find_one({
-            "account": current_user.account
-        })
+        # 按 account 查询，命中 users.account 唯一索引（见 database.init_indexes）
+        user_doc = await db[settings.mongodb_db_name].users.find_one(
+            {"account": current_user.account},
+            {"image_generation_configs": 1, "_id": 0}
+        )
         
         result = {}
         if user_doc and user_doc.get("image_generation_configs"):
@@ -87,7 +87,7 @@ async def save_user_image_generation_provider_config(
             {
                 "$set": {
                     f"image_generation_configs.{provider_id}": config.dict(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             },
             upsert=True
@@ -106,6 +106,25 @@ async def save_user_image_generation_provider_config(
             detail="保存配置失败"
         )
 
+async def _download_as_base64(client: httpx.AsyncClient, url: str) -> str:
+    """
+    流式下载并增量编码为Base64
+    
+    按3字节对齐分块编码，避免同时持有完整原始数据与完整编码结果
+    """
+    b64encode = base64.b64encode  # 循环内按块调用，绑定为局部变量
+    encoded = bytearray()
+    remainder = b""
+    async with client.stream("GET", url, timeout=60) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            data = remainder + chunk
+            aligned = len(data) - len(data) % 3
+            encoded += b64encode(data[:aligned])
+            remainder = data[aligned:]
+    encoded += b64encode(remainder)
+    return encoded.decode("ascii")
+
 class TestImageGenerationPayload(BaseModel):
     config: ImageGenerationProviderConfig
     prompt: str
@@ -136,6 +155,7 @@ async def test_image_generation_provider_config(
 
             start_time = time.time()
             timeout = 180  # 3分钟超时
+            poll_delay = 0.5  # 轮询间隔从0.5秒开始指数退避，上限5秒
             while time.time() - start_time < timeout:
                 result = await service.get_task_result(task_id)
                 task_status = result.get("task_status")
@@ -147,13 +167,9 @@ async def test_image_generation_provider_config(
                         image_url = output_images[0]
 
                     if image_url:
-                        # 获取图片数据并转为Base64
-                        async with httpx.AsyncClient() as client:
-                            image_response = await client.get(image_url, timeout=60)
-                            image_response.raise_for_status()
-                            image_bytes = image_response.content
-                            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                            image_data_uri = f"data:image/png;base64,{base64_image}"
+                        # 流式下载图片并增量转为Base64（复用全局连接池）
+                        base64_image = await _download_as_base64(get_http_client(), image_url)
+                        image_data_uri = f"data:image/png;base64,{base64_image}"
                         return {"success": True, "message": "图片生成成功", "image_data": image_data_uri}
                     else:
                         raise HTTPException(status_code=500, detail=f"任务成功但未找到图片URL。完整响应: {result}")
@@ -163,7 +179,9 @@ async def test_image_generation_provider_config(
                     raise HTTPException(status_code=500, detail=f"任务失败: {error_message}")
                 
                 elif task_status in ["PENDING", "RUNNING", "PROCESSING"]:
-                    await asyncio.sleep(5)  # 任务进行中，等待5秒
+                    # 任务进行中：快任务尽早拿到结果，慢任务不过度轮询
+                    await asyncio.sleep(poll_delay)
+                    poll_delay = min(poll_delay * 1.5, 5.0)
                 else:
                     # 未知状态
                     raise HTTPException(status_code=500, detail=f"未知的任务状态: {task_status}。完整响应: {result}")
@@ -189,33 +207,38 @@ async def set_default_image_generation_provider(
 ):
     """设置默认图片生成服务商"""
     try:
-        user_doc = await db[settings.mongodb_db_name].users.find_one({
-            "account": current_user.account
-        })
-        
-        if not user_doc or not user_doc.get("image_generation_configs") or provider_id not in user_doc["image_generation_configs"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="该服务商未配置，无法设置为默认"
-            )
+        users = db[settings.mongodb_db_name].users
         
-        provider_config = user_doc["image_generation_configs"][provider_id]
-        if not provider_config.get("enabled"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="该服务商未启用，无法设置为默认"
-            )
-        
-        await db[settings.mongodb_db_name].users.update_one(
-            {"account": current_user.account},
+        # 条件更新：仅当该服务商已配置且启用时才设置为默认（一次往返完成校验与更新）
+        result = await users.update_one(
+            {
+                "account": current_user.account,
+                f"image_generation_configs.{provider_id}.enabled": True
+            },
             {
                 "$set": {
                     "default_image_generation_provider": provider_id,
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
         
+        if result.matched_count == 0:
+            # 未命中时再区分未配置与未启用
+            user_doc = await users.find_one(
+                {"account": current_user.account},
+                {f"image_generation_configs.{provider_id}": 1}
+            )
+            if not user_doc or provider_id not in (user_doc.get("image_generation_configs") or {}):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="该服务商未配置，无法设置为默认"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="该服务商未启用，无法设置为默认"
+            )
+        
         logger.info(f"用户 {current_user.id} 设置默认图片生成提供商为 {provider_id}")
         
         return {
@@ -240,9 +263,11 @@ async def get_default_image_generation_provider(
 ):
     """获取默认图片生成服务商"""
     try:
-        user_doc = await db[settings.mongodb_db_name].users.find_one({
-            "account": current_user.account
-        })
+        # 按 account 查询，命中 users.account 唯一索引（见 database.init_indexes）
+        user_doc = await db[settings.mongodb_db_name].users.find_one(
+            {"account": current_user.account},
+            {"default_image_generation_provider": 1, "_id": 0}
+        )
         
         default_provider = user_doc.get("default_image_generation_provider") if user_doc else None
         
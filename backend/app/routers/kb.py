@@ -1,5 +1,6 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Request
 from fastapi import Depends
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from typing import Optional
 import os
 import re
@@ -7,13 +8,23 @@ import uuid
 import hashlib
 import logging
 import asyncio
+import functools
+import json
+import mimetypes
 from pathlib import Path
 from datetime import datetime
+from types import SimpleNamespace
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 
+# 可选依赖：orjson（更快的 JSON 解析，未安装时回退到标准库 json）
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
 # ⚡ 延迟导入重量级模块，避免启动时加载：
 # - ChromaVectorStore（ChromaDB 导入耗时约10秒）
 # - ArkEmbeddings（volcengine SDK 导入耗时约20秒）
@@ -37,6 +48,9 @@ from ..services.document_upload_service import get_document_upload_service
 
 # 导入知识库服务和模型
 from ..services.knowledge_base_service import KnowledgeBaseService
+from ..services.document_processor import get_document_processor
+from ..services.async_task_processor import TaskPriority
+from ..utils.minio_client import minio_client
 from ..models.knowledge_base import (
     KnowledgeBaseCreate,
     KnowledgeBaseCreateRequest,
@@ -62,7 +76,8 @@ class KnowledgeRetrievalResponse(BaseModel):
 	results: List[Dict[str, Any]]
 	error: Optional[str] = None
 
-router = APIRouter()
+# 知识库接口返回的列表/分块内容较大，安装了 orjson 时统一用它序列化
+router = APIRouter(default_response_class=ORJSONResponse if orjson is not None else JSONResponse)
 
 
 @router.get("/debug/vectorstore-stats")
@@ -85,6 +100,14 @@ async def get_vectorstore_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 预编译名称清洗用的正则
+_RE_BAD = re.compile(r"[^A-Za-z0-9_-]")
+_RE_COLLAPSE = re.compile(r"[-_]{2,}")
+_RE_TRIM = re.compile(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$")
+# 已满足 Chroma 约束的名称（3-63位、首尾为字母数字、仅含字母数字/_/-）
+_RE_VALID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{1,61}[A-Za-z0-9]")
+
+
 def _sanitize_collection_name(name: str) -> str:
 	"""
 	Chroma constraints:
@@ -94,15 +117,20 @@ def _sanitize_collection_name(name: str) -> str:
 	- no consecutive periods; we avoid '.' entirely
 	- not an IPv4 address (we avoid by using letters)
 	"""
+	# 注意：短名称/纯中文名称的集合名完全由下方 md5 后缀决定，且每次访问都重新计算，
+	# 更换哈希算法会导致已有知识库找不到原集合，不要修改
+	# 快速路径：已合规且无连续 -/_ 的名称清洗后不变，直接返回
+	if name and _RE_VALID.fullmatch(name) and not _RE_COLLAPSE.search(name):
+		return name
 	original_name = name  # 保存原始名称用于生成确定性哈希
 	if not name:
 		name = "kb"
 	# Replace unsupported chars with '-'
-	name = re.sub(r"[^A-Za-z0-9_-]", "-", name)
+	name = _RE_BAD.sub("-", name)
 	# Collapse multiple '-' or '_' to single '-'
-	name = re.sub(r"[-_]{2,}", "-", name)
+	name = _RE_COLLAPSE.sub("-", name)
 	# Trim non-alnum from ends
-	name = re.sub(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$", "", name)
+	name = _RE_TRIM.sub("", name)
 	# Ensure minimum length by padding with deterministic suffix
 	if len(name) < 3:
 		# 使用原始名称的哈希值生成确定性的后缀
@@ -112,7 +140,7 @@ def _sanitize_collection_name(name: str) -> str:
 	if len(name) > 63:
 		name = name[:63]
 	# Final guard: if ends with non-alnum after slice, fix
-	name = re.sub(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$", "", name)
+	name = _RE_TRIM.sub("", name)
 	# If empty again, fallback with deterministic hash
 	if not name:
 		# 使用原始输入名称生成确定性的名称
@@ -124,12 +152,12 @@ def _sanitize_collection_name(name: str) -> str:
 
 
 # 允许 Unicode 的文件夹名清洗（仅去除文件系统不允许或危险字符）
-_def_fs_forbidden = r"[<>:\\/\|?*]"
+_FS_TRANS = str.maketrans({c: "-" for c in '<>:\\/|?*'})
 
 def _sanitize_folder_name(name: str) -> str:
 	name = name or "kb"
 	# 去除非法字符
-	name = re.sub(_def_fs_forbidden, "-", name)
+	name = name.translate(_FS_TRANS)
 	# 去掉首尾空白及点/空格（Windows 末尾点与空格不合法）
 	name = name.strip().strip(". ")
 	# 避免空字符串
@@ -141,15 +169,27 @@ def _sanitize_folder_name(name: str) -> str:
 	return name
 
 
-def _get_kb_components(kb_settings: dict):
+@functools.lru_cache(maxsize=128)
+def _get_splitter(chunk_size: int, chunk_overlap: int, separators: tuple):
 	"""
-	根据知识库配置获取组件（使用全局单例管理器）
+	按切分参数缓存 Splitter（无状态，可在请求间共享）
 	
-	Returns:
-		(splitter, vectorstore, embeddings)
+	Embedding/VectorStore 由各自的全局管理器缓存；VectorStore 在删除知识库时
+	会被管理器移除并关闭，因此这里只缓存 Splitter，不缓存整组组件
 	"""
-	# ⚡ 延迟导入重量级模块
 	from langchain_text_splitters import RecursiveCharacterTextSplitter
+	return RecursiveCharacterTextSplitter(
+		chunk_size=chunk_size,
+		chunk_overlap=chunk_overlap,
+		separators=list(separators),
+	)
+
+
+@functools.lru_cache(maxsize=None)
+def _kb_component_deps() -> SimpleNamespace:
+	"""
+	首次调用时导入 _get_kb_vectorstore 的依赖并缓存（仍保持启动时延迟加载）
+	"""
 	from ..utils.embedding.path_utils import (
 		build_chroma_persist_dir, get_chroma_collection_name,
 		build_faiss_persist_dir, get_faiss_collection_name
@@ -157,6 +197,48 @@ def _get_kb_components(kb_settings: dict):
 	from ..services.embedding_manager import get_embedding_manager
 	from ..services.vectorstore_manager import get_vectorstore_manager
 	
+	return SimpleNamespace(
+		# 向量数据库类型 -> (集合名称函数, 持久化目录函数)
+		vector_db_paths={
+			"chroma": (get_chroma_collection_name, build_chroma_persist_dir),
+			"faiss": (get_faiss_collection_name, build_faiss_persist_dir),
+		},
+		get_embedding_manager=get_embedding_manager,
+		get_vectorstore_manager=get_vectorstore_manager,
+	)
+
+
+def _get_kb_components(kb_settings: dict):
+	"""
+	根据知识库配置获取组件（使用全局单例管理器）
+	
+	只需检索的场景请使用 _get_kb_vectorstore，避免构建用不到的 Splitter
+	
+	Returns:
+		(splitter, vectorstore, embeddings)
+	"""
+	vectorstore, embeddings = _get_kb_vectorstore(kb_settings)
+	
+	# 获取 Splitter（按切分参数缓存）
+	sp = kb_settings.get("split_params") or {}
+	chunk_size = int(sp.get("chunk_size", 500))
+	chunk_overlap = int(sp.get("chunk_overlap", 100))
+	separators = sp.get("separators") or ["\n\n", "\n", "。", "！", "？", "，", " ", ""]
+	splitter = _get_splitter(chunk_size, chunk_overlap, tuple(separators))
+	
+	return splitter, vectorstore, embeddings
+
+
+def _get_kb_vectorstore(kb_settings: dict):
+	"""
+	根据知识库配置获取检索所需组件（使用全局单例管理器）
+	
+	Returns:
+		(vectorstore, embeddings)
+	"""
+	# ⚡ 延迟导入重量级模块（首次调用后缓存）
+	deps = _kb_component_deps()
+	
 	if not kb_settings or not kb_settings.get("enabled"):
 		raise HTTPException(status_code=400, detail="知识库未启用或配置为空")
 
@@ -169,7 +251,7 @@ def _get_kb_components(kb_settings: dict):
 	local_model_path = embeddings_config.get("local_model_path")
 
 	# 2. 获取 Embedding 实例（全局共享，不会重复加载）
-	embedding_manager = get_embedding_manager()
+	embedding_manager = deps.get_embedding_manager()
 	try:
 		embeddings = embedding_manager.get_or_create(
 			provider=provider,
@@ -184,39 +266,24 @@ def _get_kb_components(kb_settings: dict):
 	except (ValueError, FileNotFoundError, RuntimeError) as e:
 		raise HTTPException(status_code=400, detail=str(e))
 
-	# 3. 创建 Splitter（轻量级，每次创建）
-	sp = kb_settings.get("split_params") or {}
-	chunk_size = int(sp.get("chunk_size", 500))
-	chunk_overlap = int(sp.get("chunk_overlap", 100))
-	separators = sp.get("separators") or ["\n\n", "\n", "。", "！", "？", "，", " ", ""]
-	splitter = RecursiveCharacterTextSplitter(
-		chunk_size=chunk_size,
-		chunk_overlap=chunk_overlap,
-		separators=list(separators),
-	)
-
-	# 4. 解析搜索参数（包含距离度量）
+	# 3. 解析搜索参数（包含距离度量）
 	search_params = kb_settings.get("search_params") or {}
 	distance_metric = search_params.get("distance_metric", "cosine")  # 默认使用余弦距离
 	
-	# 5. 获取 VectorStore 实例（全局共享）
+	# 4. 获取 VectorStore 实例（全局共享）
 	vector_db = kb_settings.get("vector_db", "chroma")  # 默认使用chroma，支持faiss
-	if vector_db not in ["chroma", "faiss"]:
+	
+	# 根据向量数据库类型选择路径构建函数（一次查表同时完成类型校验）
+	try:
+		name_fn, dir_fn = deps.vector_db_paths[vector_db]
+	except (KeyError, TypeError):
 		raise HTTPException(status_code=400, detail=f"不支持的向量数据库类型: {vector_db}，仅支持: chroma, faiss")
 	
 	collection_name_raw = kb_settings.get("collection_name") or "default"
+	collection_name = name_fn(collection_name_raw)
+	persist_dir = dir_fn(collection_name_raw)
 	
-	# 根据向量数据库类型选择路径构建函数
-	if vector_db == "chroma":
-		collection_name = get_chroma_collection_name(collection_name_raw)
-		persist_dir = build_chroma_persist_dir(collection_name_raw)
-	elif vector_db == "faiss":
-		collection_name = get_faiss_collection_name(collection_name_raw)
-		persist_dir = build_faiss_persist_dir(collection_name_raw)
-	else:
-		raise HTTPException(status_code=400, detail=f"不支持的向量数据库类型: {vector_db}")
-	
-	vectorstore_manager = get_vectorstore_manager()
+	vectorstore_manager = deps.get_vectorstore_manager()
 	try:
 		vectorstore = vectorstore_manager.get_or_create(
 			collection_name=collection_name,
@@ -228,7 +295,7 @@ def _get_kb_components(kb_settings: dict):
 	except (ValueError, RuntimeError) as e:
 		raise HTTPException(status_code=400, detail=str(e))
 
-	return splitter, vectorstore, embeddings
+	return vectorstore, embeddings
 
 
 @router.post("/kb/upload_and_ingest")
@@ -237,6 +304,7 @@ async def upload_and_ingest(
 	kb_settings_json: str = Form(...),
 	session_id: Optional[str] = Form(default=None),
 	priority: Optional[str] = Form(default="NORMAL"),
+	batch_size: int = Form(default=200),
 	current_user: User = Depends(get_current_user),
 	db: AsyncIOMotorClient = Depends(get_database),
 ):
@@ -250,6 +318,7 @@ async def upload_and_ingest(
 		kb_settings_json: 知识库配置（JSON字符串）
 		session_id: 会话ID（可选）
 		priority: 任务优先级 LOW/NORMAL/HIGH（默认NORMAL）
+		batch_size: 每批写入向量库的文档块数（默认200，限制在 1-1000）
 		
 	Returns:
 		{
@@ -260,44 +329,49 @@ async def upload_and_ingest(
 			"metadata": {...}
 		}
 	"""
-	import json
-	
 	# 1. 解析知识库配置
 	try:
-		kb_settings = json.loads(kb_settings_json)
+		kb_settings = orjson.loads(kb_settings_json) if orjson is not None else json.loads(kb_settings_json)
 	except Exception:
 		raise HTTPException(status_code=400, detail="kb_settings_json 不是合法的 JSON")
 
 	if not file.filename:
 		raise HTTPException(status_code=422, detail="缺少文件名")
 	
+	user_id = str(current_user.id)
+	doc_service = get_document_upload_service()
+	
+	# 先校验文件格式，不支持的文件不必读入内存
+	is_valid, error_msg = doc_service.validate_file(file.filename)
+	if not is_valid:
+		raise HTTPException(status_code=500, detail=error_msg)
+	
 	# 2. 立即更新会话的 kb_settings（不等待文档处理完成）
 	if session_id:
-		doc_service = get_document_upload_service()
 		success, error = await doc_service.update_session_kb_config(
 			db=db,
 			session_id=session_id,
-			user_id=str(current_user.id),
+			user_id=user_id,
 			kb_settings=kb_settings,
 			kb_parsed=False
 		)
 		if not success:
 			raise HTTPException(status_code=404, detail=error)
 	
-	# 3. 读取文件内容
+	# 3. 读取文件内容（解析器需要完整字节；Starlette 已将大文件暂存到磁盘）
 	content_bytes = await file.read()
 	
 	# 4. 使用文档上传服务异步处理
-	doc_service = get_document_upload_service()
 	result = await doc_service.upload_and_process_async(
 		content=content_bytes,
 		filename=file.filename,
 		kb_settings=kb_settings,
 		session_id=session_id,
-		user_id=str(current_user.id),
+		user_id=user_id,
 		priority=priority,
 		timeout=600.0,
-		max_retries=3
+		max_retries=3,
+		batch_size=max(1, min(batch_size, 1000))
 	)
 	
 	if not result.success:
@@ -366,17 +440,17 @@ async def cancel_task(
 		from ..utils.embedding.task_queue import get_task_queue
 		
 		task_queue = await get_task_queue()
-		task_info = await task_queue.get_task_status(task_id)
-		
+		# 归属校验与取消在队列内一次完成
+		user_id = str(current_user.id)
+		task_info, success = await task_queue.cancel_task_for_user(task_id, user_id)
+
 		if not task_info:
 			raise HTTPException(status_code=404, detail="任务不存在")
-		
+
 		# 检查权限
-		if task_info.metadata.get("user_id") != str(current_user.id):
+		if task_info.metadata.get("user_id") != user_id:
 			raise HTTPException(status_code=403, detail="无权限操作此任务")
-		
-		success = await task_queue.cancel_task(task_id)
-		
+
 		return {
 			"ok": success,
 			"message": "任务已取消" if success else "任务无法取消（可能已完成或不存在）"
@@ -410,7 +484,11 @@ async def get_queue_stats(
 		raise HTTPException(status_code=500, detail=f"获取队列统计失败: {str(e)}")
 
 
-@router.post("/kb/retrieve", response_model=KnowledgeRetrievalResponse)
+@router.post(
+	"/kb/retrieve",
+	response_model=KnowledgeRetrievalResponse,
+	response_model_exclude_none=True,
+)
 async def retrieve_knowledge(
 	request: KnowledgeRetrievalRequest,
 	current_user: User = Depends(get_current_user),
@@ -420,21 +498,27 @@ async def retrieve_knowledge(
 	根据查询文本和会话的知识库配置进行向量检索，返回相关文档片段
 	"""
 	try:
+		kb_settings = request.kb_settings
+		
 		# 检查知识库是否启用
-		if not request.kb_settings or not request.kb_settings.get("enabled"):
+		if not kb_settings or not kb_settings.get("enabled"):
 			return KnowledgeRetrievalResponse(
 				success=True,
 				results=[],
 				error="知识库未启用"
 			)
 		
+		# 空查询或 top_k<=0 不可能有结果，直接返回，不必构建知识库组件
+		query = (request.query or "").strip()
+		if not query or (request.top_k is not None and request.top_k <= 0):
+			return KnowledgeRetrievalResponse(success=True, results=[])
+		
 		# 构建知识库组件（使用全局单例）
-		_, vectorstore, _ = _get_kb_components(request.kb_settings)
+		vectorstore, embeddings = _get_kb_vectorstore(kb_settings)
 		
-		# 从配置中获取相似度阈值和距离度量类型
-		similarity_threshold = request.kb_settings.get("similarity_threshold", 0.5) if isinstance(request.kb_settings, dict) else 0.5
-		search_params = request.kb_settings.get("search_params") or {}
-		distance_metric = search_params.get("distance_metric", "cosine")
+		# 从配置中获取相似度阈值和距离度量类型（kb_settings 已由请求模型校验为 dict）
+		similarity_threshold = kb_settings.get("similarity_threshold", 0.5)
+		distance_metric = (kb_settings.get("search_params") or {}).get("distance_metric", "cosine")
 		
 		# 创建检索器，应用相似度阈值和距离度量
 		retriever = Retriever(
@@ -445,16 +529,23 @@ async def retrieve_knowledge(
 		)
 		
 		# 执行检索 - ✅ 使用异步方法，避免阻塞事件循环
-		search_results = await retriever.search(request.query, top_k=request.top_k)
+		# 查询向量按 模型+查询文本 缓存，重复查询跳过向量化
+		if hasattr(vectorstore, "similarity_search_with_score_by_vector"):
+			from ..services.embedding_manager import get_embedding_manager
+			query_vector = await get_embedding_manager().embed_query_cached(embeddings, query)
+			search_results = await retriever.search_by_vector(query_vector, top_k=request.top_k)
+		else:
+			search_results = await retriever.search(query, top_k=request.top_k)
 		
 		# 格式化结果
-		formatted_results = []
-		for doc, score in search_results:
-			formatted_results.append({
+		formatted_results = [
+			{
 				"content": doc.page_content,
 				"score": float(score),
 				"metadata": doc.metadata
-			})
+			}
+			for doc, score in search_results
+		]
 		
 		return KnowledgeRetrievalResponse(
 			success=True,
@@ -485,15 +576,18 @@ async def resolve_references(
 			return {"success": True, "results": []}
 
 		# 构建向量库（必须与入库时一致，使用全局单例）
-		_, vectorstore, _ = _get_kb_components(kb_settings)
+		vectorstore, _ = _get_kb_vectorstore(kb_settings)
 		if not hasattr(vectorstore, "get_by_ids"):
 			raise HTTPException(status_code=400, detail="向量库未实现 get_by_ids，无法解析引用")
 
-		ids = [it.get("chunk_id") for it in items if it.get("chunk_id")]
+		# 去重（同一 chunk 常被多处引用），保持输入顺序
+		ids = list(dict.fromkeys(it.get("chunk_id") for it in items if it.get("chunk_id")))
 		if not ids:
 			return {"success": True, "results": []}
 
 		# ✅ 使用异步方法，避免阻塞事件循环
+		# 不分片并发：Chroma 为单次主键 IN 查询、FAISS 为内存 docstore 查找，
+		# 且向量库线程池仅 4 个线程（与检索共享），分片只会挤占检索线程
 		docs = await vectorstore.get_by_ids(ids)
 		results = []
 		# 将返回的文档与输入的 items 按 chunk_id 对齐
@@ -537,8 +631,6 @@ async def create_knowledge_base(
 	- 支持高并发
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		# 将前端格式转换为后端格式
 		kb_settings = {
 			"enabled": True,
@@ -573,10 +665,33 @@ async def create_knowledge_base(
 		raise HTTPException(status_code=500, detail=f"创建知识库失败: {str(e)}")
 
 
+def _pulled_kb_to_list_item(pulled_kb) -> dict:
+	"""将拉取的知识库（PulledKBResponse）转换为知识库列表项，并添加共享标记"""
+	return {
+		"id": pulled_kb.id,
+		"name": f"[共享] {pulled_kb.name}",  # 添加标记
+		"description": pulled_kb.description,
+		"document_count": pulled_kb.document_count,
+		"chunk_count": pulled_kb.chunk_count,
+		"created_at": pulled_kb.pulled_at,  # PulledKBResponse 中已是 ISO 字符串
+		"is_pulled": True,  # 标记为拉取的知识库
+		"owner_account": pulled_kb.owner_account,
+		"kb_settings": {
+			"collection_name": pulled_kb.collection_name,
+			"vector_db": pulled_kb.vector_db,
+			"embeddings": pulled_kb.embedding_config,
+			"split_params": pulled_kb.split_params,
+			"similarity_threshold": pulled_kb.similarity_threshold,
+			"top_k": pulled_kb.top_k
+		}
+	}
+
+
 @router.get("/kb/list")
 async def list_knowledge_bases(
-	skip: int = 0,
+	after: Optional[str] = None,
 	limit: int = 100,
+	skip: int = 0,  # 已废弃：仅为兼容旧客户端保留，请改用 after 游标
 	include_pulled: bool = False,  # 新增参数：是否包含拉取的知识库
 	current_user: User = Depends(get_current_user),
 	db: AsyncIOMotorClient = Depends(get_database)
@@ -585,61 +700,50 @@ async def list_knowledge_bases(
 	获取用户的知识库列表
 	
 	特性：
-	- 支持分页
+	- 游标分页：传入上一页返回的 next_cursor 作为 after 获取下一页
 	- 异步查询
 	- 按创建时间倒序
 	- 默认只返回用户自己创建的知识库，可通过 include_pulled=true 包含拉取的知识库
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
 		from ..services.kb_marketplace_service import KBMarketplaceService
 		
 		# 获取用户自己的知识库
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		own_kbs = await kb_service.get_knowledge_bases(
-			user_id=current_user.id,
-			skip=skip,
-			limit=limit
-		)
+		
+		async def _fetch_own_kbs():
+			if skip and not after:
+				logger.warning(f"⚠️ /kb/list 的 skip 参数已废弃，请改用 after 游标分页: skip={skip}")
+				kbs = await kb_service.get_knowledge_bases(
+					user_id=current_user.id,
+					skip=skip,
+					limit=limit
+				)
+				return kbs, None
+			return await kb_service.get_knowledge_bases_page(
+				user_id=current_user.id,
+				after=after,
+				limit=limit
+			)
 		
 		pulled_kbs = []
 		
-		# 如果需要包含拉取的知识库
+		# 如果需要包含拉取的知识库：与自己的知识库并发查询（两者互不依赖）
 		if include_pulled:
-			# 获取用户拉取的知识库
 			marketplace_service = KBMarketplaceService(db[settings.mongodb_db_name])
-			pulled_result = await marketplace_service.list_pulled_knowledge_bases(
-				user_id=current_user.id,
-				skip=0,
-				limit=1000  # 获取所有拉取的知识库
+			(own_kbs, next_cursor), pulled_result = await asyncio.gather(
+				_fetch_own_kbs(),
+				marketplace_service.list_pulled_knowledge_bases(
+					user_id=current_user.id,
+					skip=0,
+					limit=1000  # 获取所有拉取的知识库
+				)
 			)
 			
-			# 将拉取的知识库转换为标准格式，添加标记
-			for pulled_kb in pulled_result["items"]:
-				if pulled_kb.enabled:  # 只返回启用的
-					# 处理时间字段：确保是字符串格式
-					created_at = pulled_kb.pulled_at
-					if isinstance(created_at, datetime):
-						created_at = created_at.isoformat()
-					
-					pulled_kbs.append({
-						"id": pulled_kb.id,
-						"name": f"[共享] {pulled_kb.name}",  # 添加标记
-						"description": pulled_kb.description,
-						"document_count": pulled_kb.document_count,
-						"chunk_count": pulled_kb.chunk_count,
-						"created_at": created_at,
-						"is_pulled": True,  # 标记为拉取的知识库
-						"owner_account": pulled_kb.owner_account,
-						"kb_settings": {
-							"collection_name": pulled_kb.collection_name,
-							"vector_db": pulled_kb.vector_db,
-							"embeddings": pulled_kb.embedding_config,
-							"split_params": pulled_kb.split_params,
-							"similarity_threshold": pulled_kb.similarity_threshold,
-							"top_k": pulled_kb.top_k
-						}
-					})
+			# 将拉取的知识库转换为标准格式（只返回启用的）
+			pulled_kbs = [_pulled_kb_to_list_item(pulled_kb) for pulled_kb in pulled_result["items"] if pulled_kb.enabled]
+		else:
+			own_kbs, next_cursor = await _fetch_own_kbs()
 		
 		# 合并两个列表（如果需要）
 		all_kbs = own_kbs + pulled_kbs
@@ -648,16 +752,38 @@ async def list_knowledge_bases(
 			"success": True,
 			"knowledge_bases": all_kbs,
 			"own_count": len(own_kbs),
-			"pulled_count": len(pulled_kbs)
+			"pulled_count": len(pulled_kbs),
+			"next_cursor": next_cursor
 		}
 		
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
 	except Exception as e:
 		logger.error(f"获取知识库列表失败: {str(e)}", exc_info=True)
 		raise HTTPException(status_code=500, detail=f"获取知识库列表失败: {str(e)}")
 
 
+def _etag_json_response(request: Request, model: BaseModel) -> Response:
+	"""
+	按响应体内容生成 ETag，与 If-None-Match 一致时返回 304（前端定时轮询时省去响应体传输）
+	
+	使用 no-cache 而不是 max-age：浏览器每次仍会带 If-None-Match 回源校验，
+	避免修改知识库后前端在缓存期内读到旧数据
+	"""
+	body = model.model_dump_json().encode("utf-8")
+	etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+	headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+	
+	if_none_match = request.headers.get("if-none-match")
+	if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+		return Response(status_code=304, headers=headers)
+	
+	return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/kb/statistics", response_model=KBStatistics)
 async def get_statistics(
+	request: Request,
 	current_user: User = Depends(get_current_user),
 	db: AsyncIOMotorClient = Depends(get_database)
 ):
@@ -667,14 +793,13 @@ async def get_statistics(
 	特性：
 	- 聚合查询
 	- 异步计算
+	- 结果缓存30秒，支持 ETag/304
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		result = await kb_service.get_statistics(current_user.id)
+		result = await kb_service.get_statistics_cached(current_user.id)
 		
-		return result
+		return _etag_json_response(request, result)
 		
 	except Exception as e:
 		logger.error(f"获取统计信息失败: {str(e)}", exc_info=True)
@@ -713,6 +838,7 @@ async def get_system_stats(
 @router.get("/kb/{kb_id}", response_model=KnowledgeBaseResponse)
 async def get_knowledge_base(
 	kb_id: str,
+	request: Request,
 	current_user: User = Depends(get_current_user),
 	db: AsyncIOMotorClient = Depends(get_database)
 ):
@@ -722,10 +848,9 @@ async def get_knowledge_base(
 	特性：
 	- 自动权限验证
 	- 异步查询
+	- 支持 ETag/304
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		result = await kb_service.get_knowledge_base(
 			kb_id=kb_id,
@@ -735,7 +860,7 @@ async def get_knowledge_base(
 		if not result:
 			raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
 		
-		return result
+		return _etag_json_response(request, result)
 		
 	except HTTPException:
 		raise
@@ -760,8 +885,6 @@ async def update_knowledge_base(
 	- 异步更新
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		result = await kb_service.update_knowledge_base(
 			kb_id=kb_id,
@@ -796,8 +919,6 @@ async def delete_knowledge_base(
 	- 原子操作
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		success = await kb_service.delete_knowledge_base(
 			kb_id=kb_id,
@@ -833,21 +954,16 @@ async def list_documents(
 	- 按创建时间倒序
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		
-		# 获取文档列表
-		result = await kb_service.get_documents(
+		# 获取文档列表及总数（总数取自知识库上的 document_count 计数，不再单独 count）
+		result, total = await kb_service.get_documents_page(
 			kb_id=kb_id,
 			user_id=current_user.id,
 			skip=skip,
 			limit=limit
 		)
 		
-		# 获取文档总数（用于分页）
-		total = await kb_service.count_documents(kb_id, current_user.id)
-		
 		return {
 			"success": True,
 			"documents": result,
@@ -855,7 +971,8 @@ async def list_documents(
 				"page": (skip // limit) + 1,
 				"page_size": limit,
 				"total": total,
-				"total_pages": (total + limit - 1) // limit if limit > 0 else 0
+				"total_pages": (total + limit - 1) // limit if limit > 0 else 0,
+				"has_more": skip + len(result) < total
 			}
 		}
 		
@@ -883,14 +1000,11 @@ async def upload_document(
 	用户需要手动调用 /parse 接口进行解析
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
 		from ..services.document_upload_service import DocumentUploadService
-		from ..utils.minio_client import minio_client
-		import mimetypes
 		
 		# 验证知识库存在
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		if not kb:
 			raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
 		
@@ -905,9 +1019,10 @@ async def upload_document(
 		if not is_valid:
 			raise HTTPException(status_code=400, detail=error)
 		
-		# 读取文件内容
-		file_content = await file.read()
-		file_size = len(file_content)
+		# 获取文件大小（Starlette 已将上传内容暂存到 SpooledTemporaryFile，无需读入内存）
+		file.file.seek(0, 2)
+		file_size = file.file.tell()
+		file.file.seek(0)
 		file_type = Path(file.filename).suffix.lower()
 		
 		# 创建文档记录（status=uploaded）
@@ -921,9 +1036,11 @@ async def upload_document(
 		
 		# 上传文件到 MinIO（用户隔离）
 		# 使用 collection_name 作为路径前缀（而非 kb_id），因为用户可能修改知识库名称
-		content_type = mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
-		file_url = minio_client.upload_kb_document(
-			file_data=file_content,
+		content_type = _guess_content_type(file.filename)
+		# 流式分片上传，并在线程池中执行，避免阻塞事件循环
+		file_url = await minio_client.async_upload_kb_document_stream(
+			fileobj=file.file,
+			length=file_size,
 			user_id=current_user.id,
 			collection_name=collection_name,  # 使用 collection_name 代替 kb_id
 			doc_id=str(doc.id),
@@ -957,6 +1074,99 @@ async def upload_document(
 		raise HTTPException(status_code=500, detail=f"上传文档失败: {str(e)}")
 
 
+# 下载原始文档时每次从 MinIO 读取并转发的块大小
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _guess_content_type_by_suffix(suffix: str) -> str:
+	return mimetypes.guess_type(f"file{suffix}")[0] or "application/octet-stream"
+
+
+def _guess_content_type(filename: str) -> str:
+	"""按扩展名推断 MIME 类型（结果按小写扩展名缓存）"""
+	return _guess_content_type_by_suffix(Path(filename).suffix.lower())
+
+
+# 请求参数中的优先级字符串 -> 任务优先级
+_TASK_PRIORITY_MAP = {
+	"low": TaskPriority.LOW,
+	"normal": TaskPriority.NORMAL,
+	"high": TaskPriority.HIGH,
+	"urgent": TaskPriority.URGENT
+}
+
+
+def _parse_priority(priority: Optional[str]) -> TaskPriority:
+	"""解析请求中的优先级参数（大小写不敏感，未知值回退为 normal）"""
+	if not priority:
+		return TaskPriority.NORMAL
+	return _TASK_PRIORITY_MAP.get(priority.lower(), TaskPriority.NORMAL)
+
+
+async def _submit_parse_task(
+	processor,
+	kb: KnowledgeBaseResponse,
+	kb_id: str,
+	doc_id: str,
+	doc: Optional[Dict[str, Any]],
+	user_id: str,
+	task_priority: TaskPriority
+) -> dict:
+	"""批量解析时提交单个文档的解析任务，失败时返回错误信息而不是抛异常"""
+	try:
+		if not doc:
+			return {"success": False, "error": f"文档 {doc_id} 不存在"}
+		
+		if doc.get("kb_id") != kb_id:
+			return {"success": False, "error": f"文档 {doc_id} 不属于此知识库"}
+		
+		# 检查文档状态
+		if not doc.get("file_url"):
+			return {"success": False, "error": f"文档 {doc['filename']} 尚未上传到服务器"}
+		
+		# 提交到异步任务队列（内部会更新状态为 processing）
+		task_id = await processor.submit_document_processing(
+			kb_id=kb_id,
+			doc_id=doc_id,
+			user_id=user_id,
+			file_path=None,
+			file_url=doc["file_url"],  # 由后台任务从 MinIO 下载，提交方不落盘
+			filename=doc["filename"],
+			# 任务队列在进程内，同一批次的所有任务按引用共享这份配置，不会逐个序列化；处理流程只读不写
+			kb_settings=kb.kb_settings,
+			priority=task_priority
+		)
+		
+		# task_id 与 processing 状态已由 submit_document_processing 写入文档记录
+		
+		logger.info(f"✅ 文档解析任务已提交: {doc['filename']}, task_id={task_id}")
+		return {"success": True, "task_id": task_id, "filename": doc['filename']}
+	
+	except Exception as e:
+		error_msg = f"文档 {doc_id} 处理失败: {str(e)}"
+		# 在 except 块内记录堆栈，汇总阶段已拿不到异常上下文
+		logger.error(error_msg, exc_info=True)
+		return {"success": False, "error": error_msg}
+
+
+def _collect_parse_results(results: dict, processing_results: list) -> None:
+	"""把一批 _submit_parse_task 的返回值汇总到 results"""
+	for result in processing_results:
+		if isinstance(result, BaseException):
+			results["failed"] += 1
+			results["errors"].append(f"异常: {str(result)}")
+			logger.error(f"文档处理异常: {result}", exc_info=result)
+		elif result.get("success"):
+			results["submitted"] += 1
+			results["task_ids"].append(result["task_id"])
+		else:
+			results["failed"] += 1
+			error_msg = result.get("error", "未知错误")
+			results["errors"].append(error_msg)
+			logger.error(f"文档处理失败: {error_msg}")
+
+
 @router.post("/kb/{kb_id}/documents/{doc_id}/parse")
 async def parse_document(
 	kb_id: str,
@@ -970,21 +1180,13 @@ async def parse_document(
 	
 	流程：
 	1. 验证文档存在且状态为 uploaded
-	2. 从 MinIO 下载文档
-	3. 提交解析任务到后台队列
-	4. 返回任务ID
+	2. 提交解析任务到后台队列（后台任务从 MinIO 下载文档）
+	3. 返回任务ID
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..services.document_processor import get_document_processor
-		from ..services.async_task_processor import TaskPriority
-		from ..utils.minio_client import minio_client
-		import tempfile
-		import os
-		
 		# 验证知识库存在
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		if not kb:
 			raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
 		
@@ -1000,42 +1202,24 @@ async def parse_document(
 		if not doc.get("file_url"):
 			raise HTTPException(status_code=400, detail="文档尚未上传到服务器")
 		
-		# 从 MinIO 下载文档
-		file_content = minio_client.download_kb_document(doc["file_url"])
-		
-		# 保存到临时目录（供解析器使用）
-		temp_dir = tempfile.gettempdir()
-		file_hash = hashlib.md5(file_content).hexdigest()
-		file_path = os.path.join(temp_dir, f"{file_hash}_{doc['filename']}")
-		
-		with open(file_path, 'wb') as f:
-			f.write(file_content)
-		
 		# 提交到异步任务队列（内部会更新状态为 processing）
 		processor = await get_document_processor(db[settings.mongodb_db_name])
 		
 		# 转换优先级
-		priority_map = {
-			"low": TaskPriority.LOW,
-			"normal": TaskPriority.NORMAL,
-			"high": TaskPriority.HIGH,
-			"urgent": TaskPriority.URGENT
-		}
-		task_priority = priority_map.get(priority.lower(), TaskPriority.NORMAL)
+		task_priority = _parse_priority(priority)
 		
 		try:
 			task_id = await processor.submit_document_processing(
 				kb_id=kb_id,
 				doc_id=doc_id,
 				user_id=current_user.id,
-				file_path=file_path,
+				file_path=None,
+				file_url=doc["file_url"],  # 由后台任务从 MinIO 下载，提交方不落盘
 				filename=doc["filename"],
 				kb_settings=kb.kb_settings,
 				priority=task_priority
 			)
-			
-			# 更新任务ID
-			await kb_service.update_document_task_id(doc_id, task_id)
+			# task_id 与 processing 状态已由 submit_document_processing 写入文档记录
 		except Exception as e:
 			# 任务提交失败，确保文档状态不会卡在 processing
 			await kb_service.update_document_status(
@@ -1092,13 +1276,6 @@ async def batch_parse_documents(
 		}
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..services.document_processor import get_document_processor
-		from ..services.async_task_processor import TaskPriority
-		from ..utils.minio_client import minio_client
-		import tempfile
-		import os
-		
 		# 验证参数
 		if not doc_ids:
 			raise HTTPException(status_code=422, detail="文档ID列表不能为空")
@@ -1107,21 +1284,21 @@ async def batch_parse_documents(
 		
 		# 验证知识库存在
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		if not kb:
 			raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
 		
+		# 一次 $in 查询批量获取文档记录
+		docs_by_id = await kb_service.get_documents_by_ids(
+			doc_ids,
+			projection={"filename": 1, "file_url": 1, "kb_id": 1}
+		)
+		
 		# 获取文档处理器
 		processor = await get_document_processor(db[settings.mongodb_db_name])
 		
 		# 转换优先级
-		priority_map = {
-			"low": TaskPriority.LOW,
-			"normal": TaskPriority.NORMAL,
-			"high": TaskPriority.HIGH,
-			"urgent": TaskPriority.URGENT
-		}
-		task_priority = priority_map.get(priority.lower(), TaskPriority.NORMAL)
+		task_priority = _parse_priority(priority)
 		
 		# 批量处理文档（并发处理以提高效率）
 		results = {
@@ -1131,53 +1308,15 @@ async def batch_parse_documents(
 			"errors": []
 		}
 		
+		# 限制同时提交的文档数，避免上千文档同时打满数据库连接池
+		submit_semaphore = asyncio.Semaphore(max(1, settings.kb_batch_parse_concurrency))
+		
 		async def process_single_document(doc_id: str):
-			"""处理单个文档的异步函数"""
-			try:
-				# 获取文档记录
-				doc = await kb_service.get_document(doc_id)
-				if not doc:
-					return {"success": False, "error": f"文档 {doc_id} 不存在"}
-				
-				if doc.get("kb_id") != kb_id:
-					return {"success": False, "error": f"文档 {doc_id} 不属于此知识库"}
-				
-				# 检查文档状态
-				if not doc.get("file_url"):
-					return {"success": False, "error": f"文档 {doc['filename']} 尚未上传到服务器"}
-				
-				# 从 MinIO 下载文档
-				file_content = minio_client.download_kb_document(doc["file_url"])
-				
-				# 保存到临时目录（供解析器使用）
-				temp_dir = tempfile.gettempdir()
-				file_hash = hashlib.md5(file_content).hexdigest()
-				file_path = os.path.join(temp_dir, f"{file_hash}_{doc['filename']}")
-				
-				with open(file_path, 'wb') as f:
-					f.write(file_content)
-				
-				# 提交到异步任务队列（内部会更新状态为 processing）
-				task_id = await processor.submit_document_processing(
-					kb_id=kb_id,
-					doc_id=doc_id,
-					user_id=current_user.id,
-					file_path=file_path,
-					filename=doc["filename"],
-					kb_settings=kb.kb_settings,
-					priority=task_priority
+			"""处理单个文档的异步函数（文档记录已批量预取）"""
+			async with submit_semaphore:
+				return await _submit_parse_task(
+					processor, kb, kb_id, doc_id, docs_by_id.get(doc_id), current_user.id, task_priority
 				)
-				
-				# 更新任务ID
-				await kb_service.update_document_task_id(doc_id, task_id)
-				
-				logger.info(f"✅ 文档解析任务已提交: {doc['filename']}, task_id={task_id}")
-				return {"success": True, "task_id": task_id, "filename": doc['filename']}
-				
-			except Exception as e:
-				error_msg = f"文档 {doc_id} 处理失败: {str(e)}"
-				logger.error(error_msg)
-				return {"success": False, "error": error_msg}
 		
 		# 🚀 并发处理所有文档（使用 asyncio.gather）
 		logger.info(f"🚀 开始并发提交 {len(doc_ids)} 个文档解析任务")
@@ -1186,21 +1325,8 @@ async def batch_parse_documents(
 			return_exceptions=True
 		)
 		
-		# 统计结果
-		for result in processing_results:
-			if isinstance(result, Exception):
-				results["failed"] += 1
-				results["errors"].append(f"异常: {str(result)}")
-			elif result.get("success"):
-				results["submitted"] += 1
-				results["task_ids"].append(result["task_id"])
-			else:
-				results["failed"] += 1
-				error_msg = result.get("error", "未知错误")
-				results["errors"].append(error_msg)
-				logger.error(f"文档处理失败: {error_msg}", exc_info=True)
-				# 注意：单个文档处理失败时，错误处理已在process_single_document中完成
-				# 这里不需要再次回滚状态
+		# 统计结果（单个文档处理失败时，错误处理已在 _submit_parse_task 中完成，无需回滚状态）
+		_collect_parse_results(results, processing_results)
 		
 		logger.info(f"✅ 批量解析完成: 提交={results['submitted']}, 失败={results['failed']}")
 		
@@ -1221,6 +1347,10 @@ async def batch_parse_documents(
 		raise HTTPException(status_code=500, detail=f"批量解析文档失败: {str(e)}")
 
 
+# 批量解析全部文档时每批从游标读取并提交的文档数
+_BATCH_PARSE_ALL_BATCH_SIZE = 500
+
+
 @router.post("/kb/{kb_id}/documents/batch-parse-all")
 async def batch_parse_all_documents(
 	kb_id: str,
@@ -1249,55 +1379,19 @@ async def batch_parse_all_documents(
 		}
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..services.document_processor import get_document_processor
-		from ..services.async_task_processor import TaskPriority
-		from ..utils.minio_client import minio_client
-		import tempfile
-		import os
-		
 		logger.info(f"🔄 开始批量解析所有文档: kb_id={kb_id}")
 		
 		# 验证知识库存在
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		if not kb:
 			raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
 		
-		# 获取所有状态为 'uploaded' 的文档（不分页，查询全部）
-		collection = db[settings.mongodb_db_name].documents
-		cursor = collection.find({
-			"kb_id": kb_id,
-			"status": "uploaded"
-		})
-		
-		unparsed_docs = await cursor.to_list(length=None)  # length=None 表示获取全部
-		
-		if not unparsed_docs:
-			return {
-				"success": True,
-				"message": "没有需要解析的文档",
-				"total": 0,
-				"submitted": 0,
-				"failed": 0,
-				"task_ids": [],
-				"errors": []
-			}
-		
-		doc_ids = [str(doc["_id"]) for doc in unparsed_docs]
-		logger.info(f"📋 找到 {len(doc_ids)} 个未解析的文档")
-		
 		# 获取文档处理器
 		processor = await get_document_processor(db[settings.mongodb_db_name])
 		
 		# 转换优先级
-		priority_map = {
-			"low": TaskPriority.LOW,
-			"normal": TaskPriority.NORMAL,
-			"high": TaskPriority.HIGH,
-			"urgent": TaskPriority.URGENT
-		}
-		task_priority = priority_map.get(priority.lower(), TaskPriority.NORMAL)
+		task_priority = _parse_priority(priority)
 		
 		# 批量处理文档（并发处理以提高效率）
 		results = {
@@ -1307,81 +1401,61 @@ async def batch_parse_all_documents(
 			"errors": []
 		}
 		
-		async def process_single_document(doc_id: str):
-			"""处理单个文档的异步函数"""
-			try:
-				# 获取文档记录
-				doc = await kb_service.get_document(doc_id)
-				if not doc:
-					return {"success": False, "error": f"文档 {doc_id} 不存在"}
-				
-				if doc.get("kb_id") != kb_id:
-					return {"success": False, "error": f"文档 {doc_id} 不属于此知识库"}
-				
-				# 检查文档状态
-				if not doc.get("file_url"):
-					return {"success": False, "error": f"文档 {doc['filename']} 尚未上传到服务器"}
-				
-				# 从 MinIO 下载文档
-				file_content = minio_client.download_kb_document(doc["file_url"])
-				
-				# 保存到临时目录（供解析器使用）
-				temp_dir = tempfile.gettempdir()
-				file_hash = hashlib.md5(file_content).hexdigest()
-				file_path = os.path.join(temp_dir, f"{file_hash}_{doc['filename']}")
-				
-				with open(file_path, 'wb') as f:
-					f.write(file_content)
-				
-				# 提交到异步任务队列（内部会更新状态为 processing）
-				task_id = await processor.submit_document_processing(
-					kb_id=kb_id,
-					doc_id=doc_id,
-					user_id=current_user.id,
-					file_path=file_path,
-					filename=doc["filename"],
-					kb_settings=kb.kb_settings,
-					priority=task_priority
-				)
-				
-				# 更新任务ID
-				await kb_service.update_document_task_id(doc_id, task_id)
-				
-				logger.info(f"✅ 文档解析任务已提交: {doc['filename']}, task_id={task_id}")
-				return {"success": True, "task_id": task_id, "filename": doc['filename']}
-				
-			except Exception as e:
-				error_msg = f"文档 {doc_id} 处理失败: {str(e)}"
-				logger.error(error_msg)
-				return {"success": False, "error": error_msg}
-		
-		# 🚀 并发处理所有文档（使用 asyncio.gather）
-		logger.info(f"🚀 开始并发提交 {len(doc_ids)} 个文档解析任务")
-		processing_results = await asyncio.gather(
-			*[process_single_document(doc_id) for doc_id in doc_ids],
-			return_exceptions=True
-		)
+		# 限制同时提交的文档数，避免上千文档同时打满数据库连接池
+		submit_semaphore = asyncio.Semaphore(max(1, settings.kb_batch_parse_concurrency))
 		
-		# 统计结果
-		for result in processing_results:
-			if isinstance(result, Exception):
-				results["failed"] += 1
-				results["errors"].append(f"异常: {str(result)}")
-			elif result.get("success"):
-				results["submitted"] += 1
-				results["task_ids"].append(result["task_id"])
-			else:
-				results["failed"] += 1
-				error_msg = result.get("error", "未知错误")
-				results["errors"].append(error_msg)
-				logger.error(f"文档处理失败: {error_msg}", exc_info=True)
+		async def submit_batch(batch: List[dict]):
+			"""并发提交一批文档并汇总结果"""
+			async def process_single_document(doc: dict):
+				async with submit_semaphore:
+					return await _submit_parse_task(
+						processor, kb, kb_id, str(doc["_id"]), doc, current_user.id, task_priority
+					)
+			
+			processing_results = await asyncio.gather(
+				*[process_single_document(doc) for doc in batch],
+				return_exceptions=True
+			)
+			_collect_parse_results(results, processing_results)
+		
+		# 分批遍历所有状态为 'uploaded' 的文档（走 kb_id+status+_id 复合索引），
+		# 每攒满一批就提交，避免文档很多时一次性把全部记录加载到内存
+		cursor = kb_service.doc_collection.find(
+			{"kb_id": kb_id, "status": "uploaded"},
+			{"filename": 1, "file_url": 1, "kb_id": 1}
+		).sort("_id", 1).batch_size(_BATCH_PARSE_ALL_BATCH_SIZE)
+		
+		total = 0
+		batch: List[dict] = []
+		async for doc in cursor:
+			batch.append(doc)
+			if len(batch) >= _BATCH_PARSE_ALL_BATCH_SIZE:
+				total += len(batch)
+				logger.info(f"🚀 并发提交 {len(batch)} 个文档解析任务（累计 {total}）")
+				await submit_batch(batch)
+				batch = []
+		if batch:
+			total += len(batch)
+			logger.info(f"🚀 并发提交 {len(batch)} 个文档解析任务（累计 {total}）")
+			await submit_batch(batch)
+		
+		if total == 0:
+			return {
+				"success": True,
+				"message": "没有需要解析的文档",
+				"total": 0,
+				"submitted": 0,
+				"failed": 0,
+				"task_ids": [],
+				"errors": []
+			}
 		
 		logger.info(f"✅ 批量解析完成: 提交={results['submitted']}, 失败={results['failed']}")
 		
 		return {
 			"success": True,
 			"message": f"批量解析任务已提交: 成功 {results['submitted']} 个，失败 {results['failed']} 个",
-			"total": len(doc_ids),
+			"total": total,
 			"submitted": results["submitted"],
 			"failed": results["failed"],
 			"task_ids": results["task_ids"],
@@ -1408,12 +1482,10 @@ async def reset_document_status(
     用于清理卡住的文档，使其可以重新解析
     """
     try:
-        from ..services.knowledge_base_service import KnowledgeBaseService
-        
         kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
         
         # 验证知识库存在
-        kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+        kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
         if not kb:
             raise HTTPException(status_code=404, detail="知识库不存在或无权限访问")
         
@@ -1480,15 +1552,12 @@ async def download_document(
 	返回原始文件供用户下载
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..utils.minio_client import minio_client
 		from fastapi.responses import StreamingResponse
 		from bson import ObjectId
-		import io
 		
 		# 验证知识库存在（先尝试用户自己的知识库）
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		
 		# 如果找不到，检查是否是拉取的知识库（通过 original_kb_id 查找）
 		has_access = False
@@ -1518,19 +1587,34 @@ async def download_document(
 		if not doc.get("file_url"):
 			raise HTTPException(status_code=400, detail="文档原文件不存在")
 		
-		# 从 MinIO 下载文档
-		file_content = minio_client.download_kb_document(doc["file_url"])
+		# 打开 MinIO 读取流（不把整个文件读入内存）
+		minio_response = await asyncio.to_thread(minio_client.open_kb_document_stream, doc["file_url"])
+		
+		async def _iter_file():
+			"""按块转发 MinIO 内容（同步读取放到线程池，避免阻塞事件循环）"""
+			try:
+				while True:
+					chunk = await asyncio.to_thread(minio_response.read, _DOWNLOAD_CHUNK_SIZE)
+					if not chunk:
+						break
+					yield chunk
+			finally:
+				minio_response.close()
+				minio_response.release_conn()
 		
 		# 返回文件流
-		import mimetypes
-		content_type = mimetypes.guess_type(doc["filename"])[0] or "application/octet-stream"
+		content_type = _guess_content_type(doc["filename"])
+		headers = {
+			"Content-Disposition": f'attachment; filename="{doc["filename"]}"'
+		}
+		content_length = minio_response.headers.get("Content-Length")
+		if content_length:
+			headers["Content-Length"] = content_length
 		
 		return StreamingResponse(
-			io.BytesIO(file_content),
+			_iter_file(),
 			media_type=content_type,
-			headers={
-				"Content-Disposition": f'attachment; filename="{doc["filename"]}"'
-			}
+			headers=headers
 		)
 		
 	except HTTPException:
@@ -1554,14 +1638,13 @@ async def get_document_content(
 	与下载接口不同，此接口返回 JSON 格式，包含文档内容和元数据
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..utils.minio_client import minio_client
 		from app.utils.document_parsers import DocumentParserFactory
+		from ..services.kb_cache import get_cached_document_content, set_cached_document_content
 		from bson import ObjectId
 		
 		# 验证知识库存在（先尝试用户自己的知识库）
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
-		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
+		kb = await kb_service.get_knowledge_base_cached(kb_id, current_user.id)
 		
 		# 如果找不到，检查是否是拉取的知识库（通过 original_kb_id 查找）
 		has_access = False
@@ -1591,23 +1674,29 @@ async def get_document_content(
 		if not doc.get("file_url"):
 			raise HTTPException(status_code=400, detail="文档原文件不存在")
 		
-		# 从 MinIO 下载文档
-		file_content = minio_client.download_kb_document(doc["file_url"])
-		
-		# 解析文档内容（提取文本）
-		# 初始化解析器（如果尚未初始化）
-		if not hasattr(DocumentParserFactory, '_initialized'):
-			DocumentParserFactory.initialize_default_parsers()
-			DocumentParserFactory._initialized = True
-		
-		# 解析文档
-		parse_result = await DocumentParserFactory.parse_document(
-			file_content,
-			doc["filename"]
-		)
-		
-		if not parse_result.success:
-			raise HTTPException(status_code=500, detail=f"文档解析失败: {parse_result.error_message}")
+		# 先查解析结果缓存，命中时跳过下载和解析
+		cached = await get_cached_document_content(doc["file_url"])
+		if cached is not None:
+			content, metadata = cached
+		else:
+			# 从 MinIO 下载文档（线程池中执行，避免阻塞事件循环）
+			file_content = await asyncio.to_thread(minio_client.download_kb_document, doc["file_url"])
+			
+			# 解析文档内容（提取文本）
+			# 初始化解析器（如果尚未初始化）
+			DocumentParserFactory.ensure_initialized()
+			
+			# 解析文档（解析器内部在线程池中执行）
+			parse_result = await DocumentParserFactory.parse_document(
+				file_content,
+				doc["filename"]
+			)
+			
+			if not parse_result.success:
+				raise HTTPException(status_code=500, detail=f"文档解析失败: {parse_result.error_message}")
+			
+			content, metadata = parse_result.text, parse_result.metadata
+			await set_cached_document_content(doc["file_url"], content, metadata)
 		
 		# 返回文档内容和元数据
 		return {
@@ -1618,10 +1707,10 @@ async def get_document_content(
 				"filename": doc["filename"],
 				"file_type": doc.get("file_type"),
 				"file_size": doc.get("file_size"),
-				"content": parse_result.text,
+				"content": content,
 				"chunk_count": doc.get("chunk_count", 0),
 				"upload_time": doc.get("created_at"),
-				"metadata": parse_result.metadata
+				"metadata": metadata
 			}
 		}
 		
@@ -1651,7 +1740,6 @@ async def get_document_chunks(
 	- 包含分片内容和元数据
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
 		from bson import ObjectId
 		import asyncio
 		
@@ -1703,7 +1791,7 @@ async def get_document_chunks(
 				import time
 				
 				# 获取vectorstore组件
-				_, vectorstore, _ = _get_kb_components(kb_settings)
+				vectorstore, _ = _get_kb_vectorstore(kb_settings)
 				vector_db = kb_settings.get("vector_db", "chroma")
 				
 				# 根据不同的向量数据库类型采用不同的获取方式
@@ -1859,9 +1947,6 @@ async def delete_document(
 	- 更新统计信息
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		from ..utils.minio_client import minio_client
-		
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		
 		# 获取文档信息（用于删除 MinIO 文件）
@@ -1905,8 +1990,6 @@ async def search_knowledge_base(
 	- 支持混合搜索
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
-		
 		# 验证知识库存在
 		kb_service = KnowledgeBaseService(db[settings.mongodb_db_name])
 		kb = await kb_service.get_knowledge_base(kb_id, current_user.id)
@@ -1920,7 +2003,7 @@ async def search_knowledge_base(
 		from ..services.vectorstore_manager import get_vectorstore_manager
 		
 		# 构建知识库组件（使用全局单例）
-		_, vectorstore, _ = _get_kb_components(kb.kb_settings)
+		vectorstore, _ = _get_kb_vectorstore(kb.kb_settings)
 		
 		# 获取距离度量和阈值（优先使用请求参数，其次使用知识库配置）
 		distance_metric = search_request.distance_metric
@@ -2048,7 +2131,6 @@ async def search_multiple_knowledge_bases(
 		MultiKBSearchResponse: 合并后的检索结果
 	"""
 	try:
-		from ..services.knowledge_base_service import KnowledgeBaseService
 		from ..services.multi_kb_retriever import get_multi_kb_retriever
 		
 		logger.info(f"🔍 多知识库检索请求: user={current_user.id}, kb_count={len(search_request.kb_ids)}, "
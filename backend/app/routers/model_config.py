@@ -409,7 +409,7 @@ async def save_user_provider_config(
             {
                 "$set": {
                     f"model_configs.{provider_id}": config.dict(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
@@ -591,7 +591,7 @@ async def set_default_model(
             {
                 "$set": {
                     "default_model_provider": provider_id,
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
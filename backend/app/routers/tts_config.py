@@ -95,7 +95,7 @@ async def save_user_tts_config(
             {
                 "$set": {
                     f"tts_configs.{provider_id}": config.dict(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
@@ -203,7 +203,7 @@ async def set_default_tts_provider(
             {
                 "$set": {
                     "default_tts_provider": provider_id,
-                    "updated_at": datetime.utcnow().isoformat()
+                    "updated_at": datetime.utcnow()
                 }
             }
         )
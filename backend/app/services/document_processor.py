@@ -10,8 +10,8 @@
 """
 import logging
 import asyncio
+import random
 from typing import Optional, Dict, Any
-from pathlib import Path
 from datetime import datetime
 from bson import ObjectId
 
@@ -22,6 +22,19 @@ from .async_task_processor import get_task_processor, TaskPriority
 
 logger = logging.getLogger(__name__)
 
+# MinIO 暂时性错误码（限流/服务端错误），可重试
+_TRANSIENT_S3_CODES = {"SlowDown", "ServiceUnavailable", "InternalError", "RequestTimeout"}
+
+
+def _is_transient_minio_error(error: Exception) -> bool:
+    """判断 MinIO 下载错误是否值得重试（对象不存在、无权限等错误直接失败）"""
+    from minio.error import S3Error
+    from urllib3.exceptions import HTTPError as Urllib3HTTPError
+    
+    if isinstance(error, S3Error):
+        return error.code in _TRANSIENT_S3_CODES
+    return isinstance(error, Urllib3HTTPError)
+
 
 class DocumentProcessor:
     """
@@ -43,16 +56,21 @@ class DocumentProcessor:
         # 限流器（防止单个用户提交过多任务）
         self.user_rate_limits: Dict[str, asyncio.Semaphore] = {}
         self.max_user_concurrent_tasks = 5  # 每个用户最多同时处理5个文档
+        
+        # MinIO 下载重试（仅针对限流/5xx/网络等暂时性错误）
+        self.download_max_retries = 2
+        self.download_retry_delay = 0.2  # 初始退避（秒）
     
     async def submit_document_processing(
         self,
         kb_id: str,
         doc_id: str,
         user_id: str,
-        file_path: str,
+        file_path: Optional[str],
         filename: str,
         kb_settings: Dict[str, Any],
-        priority: TaskPriority = TaskPriority.NORMAL
+        priority: TaskPriority = TaskPriority.NORMAL,
+        file_url: Optional[str] = None
     ) -> str:
         """
         提交文档处理任务（异步、非阻塞）
@@ -61,10 +79,11 @@ class DocumentProcessor:
             kb_id: 知识库ID
             doc_id: 文档ID
             user_id: 用户ID
-            file_path: 文件路径
+            file_path: 本地文件路径（与 file_url 二选一）
             filename: 文件名
             kb_settings: 知识库配置
             priority: 任务优先级
+            file_url: MinIO 文件地址（与 file_path 二选一，由后台任务自行下载，提交方无需落盘）
             
         Returns:
             任务ID
@@ -72,6 +91,9 @@ class DocumentProcessor:
         Raises:
             RuntimeError: 提交失败
         """
+        if not file_path and not file_url:
+            raise ValueError("file_path 和 file_url 必须提供其一")
+        
         try:
             # 用户级别的限流（不在这里做限制检查，而是在实际处理时通过 semaphore 排队）
             if user_id not in self.user_rate_limits:
@@ -88,7 +110,8 @@ class DocumentProcessor:
                     user_id=kwargs['task_user_id'],  # 使用重命名后的参数
                     file_path=kwargs['file_path'],
                     filename=kwargs['filename'],
-                    kb_settings=kwargs['kb_settings']
+                    kb_settings=kwargs['kb_settings'],
+                    file_url=kwargs['file_url']
                 )
             
             task_id = await self.task_processor.submit_task(
@@ -99,6 +122,7 @@ class DocumentProcessor:
                 doc_id=doc_id,
                 task_user_id=user_id,  # 重命名以避免与 submit_task 的 user_id 冲突
                 file_path=file_path,
+                file_url=file_url,
                 filename=filename,
                 kb_settings=kb_settings,
                 priority=priority
@@ -132,9 +156,10 @@ class DocumentProcessor:
         kb_id: str,
         doc_id: str,
         user_id: str,
-        file_path: str,
+        file_path: Optional[str],
         filename: str,
-        kb_settings: Dict[str, Any]
+        kb_settings: Dict[str, Any],
+        file_url: Optional[str] = None
     ):
         """
         异步处理文档（在后台任务中执行）
@@ -145,9 +170,10 @@ class DocumentProcessor:
             kb_id: 知识库ID
             doc_id: 文档ID
             user_id: 用户ID
-            file_path: 文件路径
+            file_path: 本地文件路径（与 file_url 二选一）
             filename: 文件名
             kb_settings: 知识库配置
+            file_url: MinIO 文件地址（优先使用，直接下载到内存）
         """
         # 获取用户的限流器
         semaphore = self.user_rate_limits.get(user_id)
@@ -175,8 +201,11 @@ class DocumentProcessor:
                 logger.info(f"开始处理文档: {filename} (doc_id: {doc_id})")
                 await update_progress(0.1, "开始处理文档...")
                 
-                # 步骤1: 读取文件
-                file_content = await self._read_file_async(file_path)
+                # 步骤1: 读取文件（MinIO 文档直接下载到内存，不经过临时文件）
+                if file_url:
+                    file_content = await self._download_file_async(file_url)
+                else:
+                    file_content = await self._read_file_async(file_path)
                 await update_progress(0.2, "读取文件完成")
                 
                 # 步骤2: 解析文档
@@ -245,6 +274,30 @@ class DocumentProcessor:
         
         return await loop.run_in_executor(None, _read)
     
+    async def _download_file_async(self, file_url: str) -> bytes:
+        """
+        从 MinIO 下载文件（在线程池中执行同步 SDK 调用）
+        
+        Args:
+            file_url: MinIO URL
+            
+        Returns:
+            文件内容（字节）
+        """
+        from ..utils.minio_client import minio_client
+        
+        delay = self.download_retry_delay
+        for attempt in range(self.download_max_retries + 1):
+            try:
+                return await asyncio.to_thread(minio_client.download_kb_document, file_url)
+            except Exception as e:
+                if attempt >= self.download_max_retries or not _is_transient_minio_error(e):
+                    raise
+                wait_time = delay * (1 + random.random())  # 指数退避 + 抖动
+                logger.warning(f"MinIO 下载失败，{wait_time:.1f}s 后重试 ({attempt + 1}/{self.download_max_retries}): {e}")
+                await asyncio.sleep(wait_time)
+                delay = min(delay * 2, 3.0)
+    
     async def _parse_document_async(
         self, content: bytes, filename: str
     ) -> str:
@@ -265,30 +318,13 @@ class DocumentProcessor:
             from ..services.document_upload_service import DocumentUploadService
             service = DocumentUploadService()
             
-            # 临时写入文件供解析器使用
-            import tempfile
-            with tempfile.NamedTemporaryFile(
-                delete=False, 
-                suffix=Path(filename).suffix
-            ) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            
-            try:
-                # 同步解析
-                success, text, error = asyncio.run(
-                    service.parse_document(content, filename)
-                )
-                if not success:
-                    raise RuntimeError(error or "文档解析失败")
-                return text
-            finally:
-                # 清理临时文件
-                import os
-                try:
-                    os.unlink(tmp_path)
-                except:
-                    pass
+            # 同步解析（解析器直接处理内存中的字节，无需写临时文件）
+            success, text, error = asyncio.run(
+                service.parse_document(content, filename)
+            )
+            if not success:
+                raise RuntimeError(error or "文档解析失败")
+            return text
         
         return await loop.run_in_executor(None, _parse)
     
@@ -101,9 +101,7 @@ class DocumentUploadService:
             from app.utils.document_parsers import DocumentParserFactory
             
             # 初始化解析器（如果尚未初始化）
-            if not hasattr(DocumentParserFactory, '_initialized'):
-                DocumentParserFactory.initialize_default_parsers()
-                DocumentParserFactory._initialized = True
+            DocumentParserFactory.ensure_initialized()
             
             # 使用文档解析器解析文件
             parse_result = await DocumentParserFactory.parse_document(
@@ -135,7 +133,8 @@ class DocumentUploadService:
         user_id: str,
         priority: str = "NORMAL",
         timeout: float = 600.0,
-        max_retries: int = 3
+        max_retries: int = 3,
+        batch_size: int = 200
     ) -> DocumentUploadResult:
         """
         上传并异步处理文档
@@ -149,6 +148,7 @@ class DocumentUploadService:
             priority: 任务优先级 (LOW/NORMAL/HIGH)
             timeout: 超时时间（秒）
             max_retries: 最大重试次数
+            batch_size: 每批写入向量库的文档块数
             
         Returns:
             DocumentUploadResult 对象
@@ -234,7 +234,8 @@ class DocumentUploadService:
                 filename=filename,
                 kb_settings=kb_settings,
                 session_id=session_id,
-                user_id=user_id
+                user_id=user_id,
+                batch_size=batch_size
             )
             
             # 映射优先级
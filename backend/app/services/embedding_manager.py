@@ -2,9 +2,11 @@
 全局 Embedding 模型实例管理器
 确保同一个模型配置只加载一次到内存，所有用户共享同一个实例
 """
+import asyncio
 import logging
 import threading
-from typing import Dict, Tuple, Any, Optional
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Optional
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -35,6 +37,9 @@ class EmbeddingManager:
     _instance = None
     _lock = threading.Lock()
     
+    # 查询向量 LRU 缓存上限（每条约几 KB，1024 条约数 MB）
+    QUERY_CACHE_MAX_ENTRIES = 1024
+    
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
@@ -45,6 +50,8 @@ class EmbeddingManager:
     def __init__(self):
         if not hasattr(self, '_initialized'):
             self._instances: Dict[EmbeddingKey, Any] = {}
+            self._instance_keys: Dict[int, EmbeddingKey] = {}  # id(实例) -> key，实例由 _instances 持有
+            self._query_cache: "OrderedDict[Tuple[EmbeddingKey, str], List[float]]" = OrderedDict()
             self._instance_lock = threading.Lock()
             self._initialized = True
             logger.info("✅ EmbeddingManager 初始化完成")
@@ -107,9 +114,11 @@ class EmbeddingManager:
             raise ValueError(f"未知的 provider: {provider}")
         
         # 2. 检查是否已存在（双重检查锁定）
-        if cache_key in self._instances:
-            logger.info(f"♻️ 复用已加载的 Embedding 实例: {cache_key}")
-            return self._instances[cache_key]
+        # 命中缓存是每次检索/历史展开的热路径，只记录 DEBUG 日志
+        instance = self._instances.get(cache_key)
+        if instance is not None:
+            logger.debug("♻️ 复用已加载的 Embedding 实例: %s", cache_key)
+            return instance
         
         # 3. 加载新实例（线程安全）
         with self._instance_lock:
@@ -132,6 +141,7 @@ class EmbeddingManager:
                 )
                 
                 self._instances[cache_key] = instance
+                self._instance_keys[id(instance)] = cache_key
                 logger.info(f"✅ Embedding 模型加载成功: {cache_key}")
                 logger.info(f"📊 当前已加载模型数量: {len(self._instances)}")
                 
@@ -198,10 +208,34 @@ class EmbeddingManager:
         else:
             raise ValueError(f"未知的 provider: {provider}")
     
+    async def embed_query_cached(self, embeddings: Any, query: str) -> List[float]:
+        """
+        向量化查询文本（按 模型+查询文本 做 LRU 缓存）
+        
+        重复的查询（追问、重试等）直接复用向量，跳过模型前向计算。
+        只缓存由本管理器创建的实例；缓存仅在事件循环中访问，无需加锁。
+        """
+        model_key = self._instance_keys.get(id(embeddings))
+        if model_key is None:
+            return await asyncio.to_thread(embeddings.embed_query, query)
+        
+        cache_key = (model_key, query)
+        vector = self._query_cache.get(cache_key)
+        if vector is not None:
+            self._query_cache.move_to_end(cache_key)
+            return vector
+        
+        vector = await asyncio.to_thread(embeddings.embed_query, query)
+        self._query_cache[cache_key] = vector
+        if len(self._query_cache) > self.QUERY_CACHE_MAX_ENTRIES:
+            self._query_cache.popitem(last=False)
+        return vector
+    
     def get_stats(self) -> Dict[str, Any]:
         """获取管理器统计信息"""
         return {
             "loaded_models": len(self._instances),
+            "cached_query_vectors": len(self._query_cache),
             "models": [
                 {
                     "provider": key.provider,
@@ -217,6 +251,8 @@ class EmbeddingManager:
         with self._instance_lock:
             count = len(self._instances)
             self._instances.clear()
+            self._instance_keys.clear()
+            self._query_cache.clear()
             logger.warning(f"⚠️ 已清空所有 Embedding 实例 (共 {count} 个)")
 
 
@@ -3,7 +3,7 @@
 
 提供AI群聊的所有功能
 """
-from .group_chat_service import GroupChatService
+from .group_chat_service import GroupChatService, get_group_chat_service
 from .group_manager import GroupManager
 from .message_dispatcher import MessageDispatcher
 from .ai_scheduler import get_ai_scheduler, get_reply_controller
@@ -11,6 +11,7 @@ from .filters import create_default_filter_chain
 
 __all__ = [
     "GroupChatService",
+    "get_group_chat_service",
     "GroupManager",
     "MessageDispatcher",
     "get_ai_scheduler",
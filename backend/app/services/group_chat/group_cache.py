@@ -0,0 +1,90 @@
+"""
+群聊读缓存（Redis）
+
+群组元数据的读取远多于写入，HTTP/WebSocket 热路径上的 get_group_info
+与 AI 成员查询通过 Redis 做短 TTL 缓存；所有写 group_chats 的地方调用
+invalidate_group_cache 失效。Redis 不可用时静默回退到直接查库。
+
+注意：message_count / last_message_time 随每条消息更新，不触发失效，
+缓存中的这两个统计字段最多滞后 GROUP_INFO_CACHE_TTL 秒。
+"""
+import json
+import logging
+from typing import List, Optional
+
+from ...models.group_chat import GroupChat
+from ...redis_client import get_redis_if_available
+
+logger = logging.getLogger(__name__)
+
+GROUP_INFO_CACHE_TTL = 60  # 群组信息缓存60秒
+AI_MEMBERS_CACHE_TTL = 30  # AI成员会话列表缓存30秒
+
+
+def _group_info_key(group_id: str) -> str:
+    return f"group_chat:info:{group_id}"
+
+
+def _ai_sessions_key(group_id: str) -> str:
+    return f"group_chat:ai_sessions:{group_id}"
+
+
+async def get_cached_group(group_id: str) -> Optional[GroupChat]:
+    """读取缓存的群组信息，未命中或 Redis 不可用时返回 None"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_group_info_key(group_id))
+        if raw:
+            return GroupChat.model_validate_json(raw)
+    except Exception as e:
+        logger.debug(f"读取群组缓存失败: group_id={group_id}, 错误={e}")
+    return None
+
+
+async def set_cached_group(group: GroupChat) -> None:
+    """写入群组信息缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.set(_group_info_key(group.group_id), group.model_dump_json(), ex=GROUP_INFO_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"写入群组缓存失败: group_id={group.group_id}, 错误={e}")
+
+
+async def get_cached_ai_session_ids(group_id: str) -> Optional[List[str]]:
+    """读取缓存的AI成员会话ID列表（按成员顺序）"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_ai_sessions_key(group_id))
+        if raw is not None:
+            return json.loads(raw)
+    except Exception as e:
+        logger.debug(f"读取AI成员缓存失败: group_id={group_id}, 错误={e}")
+    return None
+
+
+async def set_cached_ai_session_ids(group_id: str, session_ids: List[str]) -> None:
+    """写入AI成员会话ID列表缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.set(_ai_sessions_key(group_id), json.dumps(session_ids), ex=AI_MEMBERS_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"写入AI成员缓存失败: group_id={group_id}, 错误={e}")
+
+
+async def invalidate_group_cache(group_id: str) -> None:
+    """群组信息或成员变更后失效缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.delete(_group_info_key(group_id), _ai_sessions_key(group_id))
+    except Exception as e:
+        logger.warning(f"失效群组缓存失败: group_id={group_id}, 错误={e}")
@@ -8,7 +8,7 @@ import json
 import logging
 import time
 import traceback
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from ...config import settings
@@ -45,6 +45,7 @@ class GroupChatService:
         self._user_cache = {}  # 用户信息缓存
         self._session_cache = {}  # 会话信息缓存
         self._cache_ttl = 30  # 缓存30秒
+        self._cache_max_entries = 2048  # 服务为进程级单例，限制缓存条目数防止无限增长
         
         # 🔥 群聊策略配置缓存（避免每次消息都查库）
         self._strategy_config_cache: Dict[str, tuple[float, GroupStrategyConfig]] = {}
@@ -55,6 +56,9 @@ class GroupChatService:
         self._llm_semaphores: Dict[str, asyncio.Semaphore] = {}
         self._max_concurrent_llm_per_group = 2  # 每个群最多2个AI同时生成
         
+        # 批量设置AI状态时，副作用的最大并发数（避免占满连接池）
+        self._max_concurrent_status_side_effects = 16
+        
         # 🔥 AI-to-AI延迟任务管理器（真人发言时取消）
         # group_id -> asyncio.Task
         self._ai_to_ai_tasks: Dict[str, asyncio.Task] = {}
@@ -87,8 +91,20 @@ class GroupChatService:
     
     def _set_cache_data(self, cache_key: str, cache_dict: dict, data):
         """设置缓存数据"""
+        if len(cache_dict) >= self._cache_max_entries and cache_key not in cache_dict:
+            # 先清理过期条目，仍然超限则整体清空
+            now = time.time()
+            expired = [k for k, (t, _) in cache_dict.items() if now - t >= self._cache_ttl]
+            for k in expired:
+                del cache_dict[k]
+            if len(cache_dict) >= self._cache_max_entries:
+                cache_dict.clear()
         cache_dict[cache_key] = (time.time(), data)
     
+    def invalidate_strategy_config_cache(self, group_id: str):
+        """群聊策略配置变更后失效本地缓存"""
+        self._strategy_config_cache.pop(group_id, None)
+    
     async def _get_group_strategy_config(self, group_id: str) -> GroupStrategyConfig:
         """
         获取群聊的策略配置（带缓存）
@@ -203,14 +219,7 @@ class GroupChatService:
             MemberStatus.ONLINE
         )
         
-        # 广播状态更新到所有在线成员
-        await self.message_dispatcher.broadcast_member_status(
-            group_id,
-            ai_member_id,
-            "online"
-        )
-        
-        logger.info(f"✅ AI上线: 群组={group_id} | AI={ai_member_id}")
+        await self._on_ai_online(group_id, ai_member_id)
     
     async def ai_go_offline(self, group_id: str, ai_member_id: str):
         """AI下线（由MCP工具调用）"""
@@ -220,6 +229,21 @@ class GroupChatService:
             MemberStatus.OFFLINE
         )
         
+        await self._on_ai_offline(group_id, ai_member_id)
+    
+    async def _on_ai_online(self, group_id: str, ai_member_id: str):
+        """AI上线后的副作用（状态已写入数据库）"""
+        # 广播状态更新到所有在线成员
+        await self.message_dispatcher.broadcast_member_status(
+            group_id,
+            ai_member_id,
+            "online"
+        )
+        
+        logger.info(f"✅ AI上线: 群组={group_id} | AI={ai_member_id}")
+    
+    async def _on_ai_offline(self, group_id: str, ai_member_id: str):
+        """AI下线后的副作用（状态已写入数据库）"""
         # 广播状态更新到所有在线成员
         await self.message_dispatcher.broadcast_member_status(
             group_id,
@@ -241,6 +265,48 @@ class GroupChatService:
         else:
             raise ValueError(f"无效的状态: {status}")
     
+    async def set_ai_status_bulk(self, group_id: str, ai_member_ids: List[str], status: str) -> int:
+        """
+        批量设置AI状态（HTTP API 使用）
+        
+        数据库状态通过一次批量写入完成，之后再逐个执行广播等副作用。
+        
+        Returns:
+            成功处理的AI数量
+        """
+        if status == "online":
+            member_status, on_changed = MemberStatus.ONLINE, self._on_ai_online
+        elif status == "offline":
+            member_status, on_changed = MemberStatus.OFFLINE, self._on_ai_offline
+        else:
+            raise ValueError(f"无效的状态: {status}")
+        
+        if not ai_member_ids:
+            return 0
+        
+        await self.group_manager.update_members_status(group_id, ai_member_ids, member_status)
+        
+        # 副作用（广播、取消待处理回复）互不依赖，限制并发后并行执行
+        semaphore = asyncio.Semaphore(self._max_concurrent_status_side_effects)
+        
+        async def run(ai_member_id: str):
+            async with semaphore:
+                await on_changed(group_id, ai_member_id)
+        
+        results = await asyncio.gather(
+            *(run(ai_member_id) for ai_member_id in ai_member_ids),
+            return_exceptions=True
+        )
+        
+        success_count = 0
+        for ai_member_id, result in zip(ai_member_ids, results):
+            if isinstance(result, Exception):
+                logger.warning(f"AI {ai_member_id} 状态变更通知失败: {result}")
+            else:
+                success_count += 1
+        
+        return success_count
+    
     async def human_connect(
         self,
         group_id: str,
@@ -320,6 +386,21 @@ class GroupChatService:
         
         触发AI决策流程
         """
+        message, _ = await self.send_human_message_with_data(group_id, user_id, request)
+        return message
+    
+    async def send_human_message_with_data(
+        self,
+        group_id: str,
+        user_id: str,
+        request: SendMessageRequest
+    ) -> Tuple[GroupMessage, Dict[str, Any]]:
+        """
+        真人发送消息，同时返回消息的 JSON 字典
+        
+        消息只 model_dump(mode='json') 一次，广播给其他成员和
+        WebSocket 发送确认都复用同一份数据
+        """
         # 检查用户是否在群组中
         member = await self.group_manager.get_member(group_id, user_id)
         if not member:
@@ -344,7 +425,10 @@ class GroupChatService:
         self.conversation_controller.track_message(message, estimated_tokens=len(request.content) // 4)
         
         # 广播消息到所有真人（排除发送者）
-        await self.message_dispatcher.broadcast_message(message, exclude_sender=True)
+        message_data = message.model_dump(mode='json')
+        await self.message_dispatcher.broadcast_message(
+            message, exclude_sender=True, message_data=message_data
+        )
         
         # 重置其他成员的连续回复计数
         await self.group_manager.reset_consecutive_replies(group_id, user_id)
@@ -360,7 +444,7 @@ class GroupChatService:
         # 触发AI决策流程（异步）
         asyncio.create_task(self._trigger_ai_decision(message))
         
-        return message
+        return message, message_data
     
     async def _on_cooldown_recovery(self, group_id: str):
         """
@@ -939,6 +1023,15 @@ class GroupChatService:
         
         return members
     
+    async def get_members_for_groups(self, groups: List[GroupChat]) -> Dict[str, List[GroupMember]]:
+        """批量获取多个群组的成员（成员与用户/会话信息均为单次批量查询）"""
+        members_by_group = await self.group_manager.get_members_for_groups(groups)
+        
+        all_members = [m for members in members_by_group.values() for m in members]
+        await self._batch_update_member_info(all_members)
+        
+        return members_by_group
+    
     async def _batch_update_member_info(self, members: List[GroupMember]) -> None:
         """批量更新成员信息，避免逐个查询造成阻塞"""
         if not members:
@@ -1177,7 +1270,26 @@ class GroupChatService:
         """获取最近消息"""
         return await self.message_dispatcher.get_recent_messages(group_id, limit)
     
+    async def broadcast_group_event(self, group_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        """广播群组事件到所有在线真人成员，返回发送成功的连接数"""
+        return await self.message_dispatcher.broadcast_event(
+            group_id,
+            {"type": event_type, "data": data}
+        )
+    
     async def get_scheduler_stats(self) -> Dict[str, Any]:
         """获取调度器统计信息"""
         return self.ai_scheduler.get_stats()
 
+
+# 全局单例（每个数据库客户端一个服务实例）
+_group_chat_services: Dict[int, GroupChatService] = {}
+
+
+def get_group_chat_service(db: AsyncIOMotorClient) -> GroupChatService:
+    """获取群聊服务单例，避免每个请求重复构造子模块并让实例内缓存跨请求生效"""
+    service = _group_chat_services.get(id(db))
+    if service is None:
+        service = GroupChatService(db)
+        _group_chat_services[id(db)] = service
+    return service
@@ -13,6 +13,7 @@ from ...models.group_chat import (
     AIBehaviorConfig, CreateGroupRequest, AddMemberRequest
 )
 from ...config import settings
+from .group_cache import get_cached_group, set_cached_group, invalidate_group_cache
 
 logger = logging.getLogger(__name__)
 
@@ -148,6 +149,9 @@ class GroupManager:
             }
         )
         
+        # 清除群组缓存
+        await invalidate_group_cache(group_id)
+        
         logger.info(f"✅ 添加AI成员: 群组={group_id} | 会话={session_id} | 名称={display_name}")
         
         return member
@@ -225,6 +229,9 @@ class GroupManager:
             }
         )
         
+        # 清除群组缓存
+        await invalidate_group_cache(group_id)
+        
         logger.info(f"✅ 添加真人成员: 群组={group_id} | 用户={actual_user_id} | 名称={display_name} | 邀请者={inviter_id}")
         
         return member
@@ -270,6 +277,42 @@ class GroupManager:
         
         return member
     
+    async def update_members_status(
+        self,
+        group_id: str,
+        member_ids: List[str],
+        status: MemberStatus
+    ) -> int:
+        """
+        批量更新成员状态（单次 update_many）
+        
+        Args:
+            group_id: 群组ID
+            member_ids: 成员ID列表
+            status: 新状态
+        
+        Returns:
+            匹配到的成员数量
+        """
+        if not member_ids:
+            return 0
+        
+        result = await self.collection_members.update_many(
+            {"group_id": group_id, "member_id": {"$in": member_ids}},
+            {"$set": {"status": status.value, "last_active_time": datetime.now()}}
+        )
+        
+        # 清除缓存
+        if group_id in self._online_members_cache:
+            del self._online_members_cache[group_id]
+        
+        logger.info(
+            f"🔄 批量更新成员状态: 群组={group_id} | 成员数={len(member_ids)} | 状态={status} | "
+            f"匹配={result.matched_count} | 修改={result.modified_count}"
+        )
+        
+        return result.matched_count
+    
     async def update_member_status(
         self,
         group_id: str,
@@ -360,25 +403,52 @@ class GroupManager:
         
         members = []
         async for doc in cursor:
-            doc.pop("_id", None)
-            doc.pop("group_id", None)
-            
-            # 🔧 兼容旧数据：如果文档中没有 role 字段，根据 owner_id 设置角色
-            if "role" not in doc and owner_id:
-                if doc.get("member_id") == owner_id:
-                    doc["role"] = "owner"
-                    logger.info(f"🔧 修复群主角色: group_id={group_id}, member_id={doc.get('member_id')}")
-                else:
-                    doc["role"] = "member"
-            
-            if doc.get("behavior_config"):
-                doc["behavior_config"] = AIBehaviorConfig(**doc["behavior_config"])
-            
-            member = GroupMember(**doc)
-            members.append(member)
+            members.append(self._doc_to_member(doc, group_id, owner_id))
         
         return members
     
+    async def get_members_for_groups(self, groups: List[GroupChat]) -> Dict[str, List[GroupMember]]:
+        """
+        批量获取多个群组的成员（单次 $in 查询）
+        
+        Args:
+            groups: 已查询到的群聊列表（用于判断群主，避免重复查询群组信息）
+        
+        Returns:
+            group_id -> 成员列表
+        """
+        owner_by_group = {g.group_id: g.owner_id for g in groups}
+        members_by_group: Dict[str, List[GroupMember]] = {gid: [] for gid in owner_by_group}
+        if not owner_by_group:
+            return members_by_group
+        
+        cursor = self.collection_members.find({"group_id": {"$in": list(owner_by_group)}})
+        async for doc in cursor:
+            group_id = doc.get("group_id")
+            members_by_group[group_id].append(
+                self._doc_to_member(doc, group_id, owner_by_group.get(group_id))
+            )
+        
+        return members_by_group
+    
+    def _doc_to_member(self, doc: Dict[str, Any], group_id: str, owner_id: Optional[str]) -> GroupMember:
+        """将 group_members 文档转换为 GroupMember"""
+        doc.pop("_id", None)
+        doc.pop("group_id", None)
+        
+        # 🔧 兼容旧数据：如果文档中没有 role 字段，根据 owner_id 设置角色
+        if "role" not in doc and owner_id:
+            if doc.get("member_id") == owner_id:
+                doc["role"] = "owner"
+                logger.info(f"🔧 修复群主角色: group_id={group_id}, member_id={doc.get('member_id')}")
+            else:
+                doc["role"] = "member"
+        
+        if doc.get("behavior_config"):
+            doc["behavior_config"] = AIBehaviorConfig(**doc["behavior_config"])
+        
+        return GroupMember(**doc)
+    
     async def get_member(self, group_id: str, member_id: str) -> Optional[GroupMember]:
         """获取单个成员"""
         doc = await self.collection_members.find_one({
@@ -464,14 +534,20 @@ class GroupManager:
             del self._online_members_cache[group_id]
     
     async def get_group(self, group_id: str) -> Optional[GroupChat]:
-        """获取群聊信息"""
+        """获取群聊信息（优先读取 Redis 缓存）"""
+        cached = await get_cached_group(group_id)
+        if cached is not None:
+            return cached
+        
         doc = await self.collection_groups.find_one({"group_id": group_id})
         
         if not doc:
             return None
         
         doc.pop("_id", None)
-        return GroupChat(**doc)
+        group = GroupChat(**doc)
+        await set_cached_group(group)
+        return group
     
     async def update_behavior_config(
         self,
@@ -514,6 +590,7 @@ class GroupManager:
         # 清除缓存
         if group_id in self._online_members_cache:
             del self._online_members_cache[group_id]
+        await invalidate_group_cache(group_id)
         
         logger.info(f"❌ 移除成员: 群组={group_id} | 成员={member_id}")
     
@@ -4,6 +4,7 @@
 负责消息存储、广播、上下文构建
 """
 import asyncio
+import json
 import logging
 import uuid
 from datetime import datetime
@@ -17,10 +18,28 @@ from ...models.group_chat import (
 from ...config import settings
 from .group_manager import GroupManager
 
+# 可选依赖：orjson（更快的 JSON 编码，未安装时回退到标准库 json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # 启用 DEBUG 日志
 
 
+def _prepare_ws_payload(ws_message: Dict[str, Any]) -> str:
+    """
+    预先序列化广播消息（与 WebSocket.send_json 的编码方式一致）
+    
+    同一消息发给多个连接时只编码一次，各连接直接 send_text；
+    安装了 orjson 时用它编码（输出同样是紧凑、不转义非 ASCII 的 JSON）
+    """
+    if orjson is not None:
+        return orjson.dumps(ws_message).decode("utf-8")
+    return json.dumps(ws_message, separators=(",", ":"), ensure_ascii=False)
+
+
 class MessageDispatcher:
     """
     消息分发器
@@ -124,7 +143,8 @@ class MessageDispatcher:
     async def broadcast_message(
         self,
         message: GroupMessage,
-        exclude_sender: bool = False
+        exclude_sender: bool = False,
+        message_data: Optional[Dict[str, Any]] = None
     ):
         """
         广播消息到所有在线真人成员
@@ -132,6 +152,7 @@ class MessageDispatcher:
         Args:
             message: 消息对象
             exclude_sender: 是否排除发送者
+            message_data: 调用方已序列化好的消息字典（避免重复 model_dump）
         """
         logger.info(f"\n{'='*80}\n📤 开始广播消息 | 群组={message.group_id} | 发送者={message.sender_id}\n{'='*80}")
         
@@ -166,20 +187,22 @@ class MessageDispatcher:
             logger.info(f"🚫 排除发送者: 排除前={before_exclude} | 排除后={len(online_humans)} | 发送者ID={message.sender_id}")
         
         # 构建WebSocket消息
-        message_data = message.model_dump(mode='json')
+        if message_data is None:
+            message_data = message.model_dump(mode='json')
         ws_message = {
             "type": "message",
             "data": message_data
         }
         
-        # 广播到所有在线真人
+        # 广播到所有在线真人（只序列化一次）
+        payload = _prepare_ws_payload(ws_message)
         success_count = 0
         fail_count = 0
         for member in online_humans:
             websocket = self._websocket_pool.get(member.websocket_id)
             if websocket:
                 try:
-                    await websocket.send_json(ws_message)
+                    await websocket.send_text(payload)
                     success_count += 1
                     logger.info(f"✅ 广播成功: 成员={member.member_id} | WS_ID={member.websocket_id}")
                 except Exception as e:
@@ -198,6 +221,62 @@ class MessageDispatcher:
             f"{'='*80}\n"
         )
     
+    async def broadcast_event(
+        self,
+        group_id: str,
+        ws_message: Dict[str, Any],
+        send_timeout: float = 5.0
+    ) -> int:
+        """
+        并发广播事件到群组所有在线真人成员
+        
+        每个连接单独超时，慢连接不会阻塞其他成员；已断开的连接从池中移除
+        
+        Args:
+            group_id: 群组ID
+            ws_message: 要发送的消息
+            send_timeout: 单个连接发送超时（秒）
+        
+        Returns:
+            发送成功的连接数
+        """
+        members = await self.group_manager.get_all_members(group_id)
+        targets = []
+        for m in members:
+            if m.member_type != MemberType.HUMAN or not m.websocket_id:
+                continue
+            websocket = self._websocket_pool.get(m.websocket_id)
+            if websocket:
+                targets.append((m, websocket))
+        
+        if not targets:
+            return 0
+        
+        payload = _prepare_ws_payload(ws_message)
+        
+        async def send(member: GroupMember, websocket) -> bool:
+            try:
+                await asyncio.wait_for(websocket.send_text(payload), timeout=send_timeout)
+                return True
+            except asyncio.TimeoutError:
+                logger.warning(f"⏰ 广播超时: 成员={member.member_id} | WS_ID={member.websocket_id}")
+            except Exception as e:
+                # 连接已断开，移出连接池
+                logger.warning(f"❌ 广播失败，移除连接: 成员={member.member_id} | 错误={e}")
+                if self._member_ws_mapping.get(member.member_id) == member.websocket_id:
+                    self.unregister_websocket(member.member_id)
+                else:
+                    self._websocket_pool.pop(member.websocket_id, None)
+            return False
+        
+        results = await asyncio.gather(*(send(m, ws) for m, ws in targets))
+        success_count = sum(results)
+        logger.info(
+            f"📢 广播事件: 群组={group_id} | 类型={ws_message.get('type')} | "
+            f"发送成功={success_count}/{len(targets)}"
+        )
+        return success_count
+    
     async def broadcast_member_status(
         self,
         group_id: str,
@@ -228,13 +307,14 @@ class MessageDispatcher:
             }
         }
         
-        # 广播到所有在线真人
+        # 广播到所有在线真人（只序列化一次）
+        payload = _prepare_ws_payload(ws_message)
         success_count = 0
         for member in online_humans:
             websocket = self._websocket_pool.get(member.websocket_id)
             if websocket:
                 try:
-                    await websocket.send_json(ws_message)
+                    await websocket.send_text(payload)
                     success_count += 1
                 except Exception as e:
                     logger.error(f"❌ 广播状态失败: 成员={member.member_id} | 错误={e}")
@@ -0,0 +1,142 @@
+"""
+知识库读缓存（Redis）
+
+上传/解析/下载等文档接口都先调用 get_knowledge_base 做权限校验并读取 kb_settings，
+知识库元数据很少变化，因此按 (kb_id, user_id) 做短 TTL 缓存；
+更新/删除知识库、修改/删除拉取记录时调用 invalidate_kb_cache 失效。
+/kb/statistics 的聚合结果按 user_id 缓存，创建/删除知识库时失效。
+文档预览的解析结果按 file_url 缓存（原文件上传后不会被覆盖，无需失效，仅靠 TTL 回收内存）。
+Redis 不可用时静默回退到直接查库/重新解析。
+
+注意：
+- document_count / chunk_count 等统计字段随文档变化更新，不触发失效，缓存中最多滞后 KB_INFO_CACHE_TTL 秒；
+  仅用于只读的权限校验场景，需要实时统计的接口请直接调用 get_knowledge_base。
+- 原知识库被修改/删除时无法逐个失效其他用户的拉取记录，依赖 TTL 过期。
+- 统计缓存中的文档数/分块数/总大小同样不随文档变化失效，最多滞后 KB_STATS_CACHE_TTL 秒。
+"""
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from ..models.knowledge_base import KnowledgeBaseResponse, KBStatistics
+from ..redis_client import get_redis_if_available
+
+logger = logging.getLogger(__name__)
+
+KB_INFO_CACHE_TTL = 60  # 知识库信息缓存60秒
+KB_STATS_CACHE_TTL = 30  # 用户知识库统计缓存30秒
+DOC_CONTENT_CACHE_TTL = 600  # 文档预览解析结果缓存10分钟
+DOC_CONTENT_CACHE_MAX_CHARS = 2_000_000  # 超过该长度的文本不缓存，避免占用过多 Redis 内存
+
+
+def _kb_info_key(kb_id: str, user_id: str) -> str:
+    return f"kb:info:{user_id}:{kb_id}"
+
+
+def _kb_stats_key(user_id: str) -> str:
+    return f"kb:stats:{user_id}"
+
+
+def _doc_content_key(file_url: str) -> str:
+    return f"kb:doc_content:{file_url}"
+
+
+async def get_cached_kb(kb_id: str, user_id: str) -> Optional[KnowledgeBaseResponse]:
+    """读取缓存的知识库信息，未命中或 Redis 不可用时返回 None"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_kb_info_key(kb_id, user_id))
+        if raw:
+            return KnowledgeBaseResponse.model_validate_json(raw)
+    except Exception as e:
+        logger.debug(f"读取知识库缓存失败: kb_id={kb_id}, 错误={e}")
+    return None
+
+
+async def set_cached_kb(kb_id: str, user_id: str, kb: KnowledgeBaseResponse) -> None:
+    """写入知识库信息缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.set(_kb_info_key(kb_id, user_id), kb.model_dump_json(), ex=KB_INFO_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"写入知识库缓存失败: kb_id={kb_id}, 错误={e}")
+
+
+async def invalidate_kb_cache(kb_id: str, user_id: str) -> None:
+    """知识库或拉取记录变更后失效缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.delete(_kb_info_key(kb_id, user_id))
+    except Exception as e:
+        logger.warning(f"失效知识库缓存失败: kb_id={kb_id}, 错误={e}")
+
+
+async def get_cached_statistics(user_id: str) -> Optional[KBStatistics]:
+    """读取缓存的用户知识库统计，未命中或 Redis 不可用时返回 None"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_kb_stats_key(user_id))
+        if raw:
+            return KBStatistics.model_validate_json(raw)
+    except Exception as e:
+        logger.debug(f"读取知识库统计缓存失败: user_id={user_id}, 错误={e}")
+    return None
+
+
+async def set_cached_statistics(user_id: str, stats: KBStatistics) -> None:
+    """写入用户知识库统计缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.set(_kb_stats_key(user_id), stats.model_dump_json(), ex=KB_STATS_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"写入知识库统计缓存失败: user_id={user_id}, 错误={e}")
+
+
+async def invalidate_statistics_cache(user_id: str) -> None:
+    """创建/删除知识库后失效统计缓存"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        await redis.delete(_kb_stats_key(user_id))
+    except Exception as e:
+        logger.warning(f"失效知识库统计缓存失败: user_id={user_id}, 错误={e}")
+
+
+async def get_cached_document_content(file_url: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """读取缓存的文档解析结果 (text, metadata)，未命中或 Redis 不可用时返回 None"""
+    redis = get_redis_if_available()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_doc_content_key(file_url))
+        if raw:
+            data = json.loads(raw)
+            return data["text"], data["metadata"]
+    except Exception as e:
+        logger.debug(f"读取文档内容缓存失败: file_url={file_url}, 错误={e}")
+    return None
+
+
+async def set_cached_document_content(file_url: str, text: str, metadata: Dict[str, Any]) -> None:
+    """写入文档解析结果缓存（文本过长时跳过）"""
+    if len(text) > DOC_CONTENT_CACHE_MAX_CHARS:
+        return
+    redis = get_redis_if_available()
+    if redis is None:
+        return
+    try:
+        payload = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False, default=str)
+        await redis.set(_doc_content_key(file_url), payload, ex=DOC_CONTENT_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"写入文档内容缓存失败: file_url={file_url}, 错误={e}")
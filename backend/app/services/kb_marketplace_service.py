@@ -24,6 +24,7 @@ from ..database import (
     kb_documents_collection,
     users_collection
 )
+from .kb_cache import invalidate_kb_cache
 
 logger = logging.getLogger(__name__)
 
@@ -456,6 +457,7 @@ class KBMarketplaceService:
             {"_id": ObjectId(pulled_kb_id)},
             {"$set": update_fields}
         )
+        await invalidate_kb_cache(pulled_kb_id, user_id)
         
         # 4. 获取更新后的数据并返回响应
         updated_kb = await self.pulled_kb_collection.find_one({
@@ -480,6 +482,7 @@ class KBMarketplaceService:
         if result.deleted_count == 0:
             raise ValueError("拉取的知识库不存在或无权限")
         
+        await invalidate_kb_cache(pulled_kb_id, user_id)
         return True
     
     async def get_shared_kb_by_original_id(
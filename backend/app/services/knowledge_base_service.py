@@ -8,7 +8,8 @@
 """
 import logging
 import asyncio
-from typing import Optional, List, Dict, Any
+import base64
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
@@ -21,6 +22,14 @@ from ..models.knowledge_base import (
     DocumentResponse,
     KBStatistics
 )
+from .kb_cache import (
+    get_cached_kb,
+    set_cached_kb,
+    invalidate_kb_cache,
+    get_cached_statistics,
+    set_cached_statistics,
+    invalidate_statistics_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +107,7 @@ class KnowledgeBaseService:
                 
                 result = await self.kb_collection.insert_one(kb_dict)
                 kb_dict["_id"] = result.inserted_id
+                await invalidate_statistics_cache(user_id)
                 
                 logger.info(f"用户 {user_id} 创建知识库: {kb_dict['name']} (ID: {result.inserted_id})")
                 return self._kb_dict_to_response(kb_dict)
@@ -142,6 +152,74 @@ class KnowledgeBaseService:
                 logger.error(f"获取知识库列表失败: {str(e)}")
                 raise RuntimeError(f"获取知识库列表失败: {str(e)}")
     
+    @staticmethod
+    def _encode_kb_cursor(created_at: str, kb_id: str) -> str:
+        """将最后一条记录的 (created_at, _id) 编码为不透明游标"""
+        return base64.urlsafe_b64encode(f"{created_at}|{kb_id}".encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def _decode_kb_cursor(cursor: str) -> Tuple[str, ObjectId]:
+        """解析游标，格式非法时抛出 ValueError"""
+        try:
+            created_at, kb_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+            return created_at, ObjectId(kb_id)
+        except Exception:
+            raise ValueError("无效的分页游标")
+    
+    async def get_knowledge_bases_page(
+        self,
+        user_id: str,
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[KnowledgeBaseResponse], Optional[str]]:
+        """
+        获取用户的知识库列表（游标分页）
+        
+        按 (created_at, _id) 倒序做范围查询，命中 user_id+created_at+_id 复合索引，
+        翻页深度不影响查询耗时（skip 分页需要扫描并丢弃前面的记录）。
+        
+        Args:
+            user_id: 用户ID
+            after: 上一页返回的 next_cursor（为空表示第一页）
+            limit: 返回的最大记录数
+            
+        Returns:
+            (知识库列表, 下一页游标)，没有更多数据时游标为 None
+            
+        Raises:
+            ValueError: 游标无效
+            RuntimeError: 数据库操作失败
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after:
+            created_at, last_id = self._decode_kb_cursor(after)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}}
+            ]
+        
+        async with self._semaphore:
+            try:
+                # 限制 limit 最大值，防止查询过大
+                limit = max(1, min(limit, 1000))
+                
+                # 多取一条用于判断是否还有下一页
+                cursor = self.kb_collection.find(query) \
+                    .sort([("created_at", -1), ("_id", -1)]) \
+                    .limit(limit + 1)
+                
+                kbs = await cursor.to_list(length=limit + 1)
+            except Exception as e:
+                logger.error(f"获取知识库列表失败: {str(e)}")
+                raise RuntimeError(f"获取知识库列表失败: {str(e)}")
+        
+        next_cursor = None
+        if len(kbs) > limit:
+            kbs = kbs[:limit]
+            last = kbs[-1]
+            next_cursor = self._encode_kb_cursor(last["created_at"], str(last["_id"]))
+        return [self._kb_dict_to_response(kb) for kb in kbs], next_cursor
+    
     async def get_knowledge_base(
         self,
         kb_id: str,
@@ -210,6 +288,24 @@ class KnowledgeBaseService:
                 logger.error(f"获取知识库失败: {str(e)}")
                 raise RuntimeError(f"获取知识库失败: {str(e)}")
     
+    async def get_knowledge_base_cached(
+        self,
+        kb_id: str,
+        user_id: str
+    ) -> Optional[KnowledgeBaseResponse]:
+        """
+        获取单个知识库（带短 TTL 缓存，用于只读的权限校验）
+        
+        统计字段可能滞后，详见 kb_cache 模块说明
+        """
+        kb = await get_cached_kb(kb_id, user_id)
+        if kb is not None:
+            return kb
+        kb = await self.get_knowledge_base(kb_id, user_id)
+        if kb is not None:
+            await set_cached_kb(kb_id, user_id, kb)
+        return kb
+    
     async def update_knowledge_base(
         self,
         kb_id: str,
@@ -271,6 +367,7 @@ class KnowledgeBaseService:
                 if not result:
                     return None
                 
+                await invalidate_kb_cache(kb_id, user_id)
                 logger.info(f"用户 {user_id} 更新知识库: {kb_id}")
                 return self._kb_dict_to_response(result)
                 
@@ -323,6 +420,8 @@ class KnowledgeBaseService:
                 })
                 
                 if result.deleted_count > 0:
+                    await invalidate_kb_cache(kb_id, user_id)
+                    await invalidate_statistics_cache(user_id)
                     logger.info(f"✅ 用户 {user_id} 删除知识库: {kb_id}, collection: {collection_name}")
                     
                     # 🆕 删除MinIO中的所有文档
@@ -460,10 +559,10 @@ class KnowledgeBaseService:
         """
         try:
             # 延迟导入，避免启动时加载
-            from ..routers.kb import _get_kb_components
+            from ..routers.kb import _get_kb_vectorstore
             
             # 构建vectorstore
-            _, vectorstore, _ = _get_kb_components(kb_settings)
+            vectorstore, _ = _get_kb_vectorstore(kb_settings)
             
             # 获取ChromaDB collection
             # ChromaVectorStore 将 Chroma 实例存储在 _store 属性中
@@ -584,13 +683,38 @@ class KnowledgeBaseService:
         Returns:
             文档列表
         """
+        documents, _ = await self.get_documents_page(kb_id, user_id, skip, limit)
+        return documents
+    
+    async def get_documents_page(
+        self,
+        kb_id: str,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[DocumentResponse], int]:
+        """
+        获取知识库的文档列表及文档总数（用于分页）
+        
+        总数直接读取知识库记录上的 document_count 计数（创建/删除文档时 $inc 维护），
+        不再对 kb_documents 执行 count_documents。
+        
+        Args:
+            kb_id: 知识库ID（可以是用户自己的知识库ID或原始知识库ID）
+            user_id: 用户ID
+            skip: 跳过的记录数
+            limit: 返回的最大记录数
+            
+        Returns:
+            (文档列表, 文档总数)，无权限时返回 ([], 0)
+        """
         async with self._semaphore:
             try:
                 # 验证知识库存在且属于用户（先检查用户自己的知识库）
-                kb = await self.kb_collection.find_one({
-                    "_id": ObjectId(kb_id),
-                    "user_id": user_id
-                })
+                kb = await self.kb_collection.find_one(
+                    {"_id": ObjectId(kb_id), "user_id": user_id},
+                    {"document_count": 1}
+                )
                 
                 # 如果找不到，检查是否是拉取的知识库
                 if not kb:
@@ -600,7 +724,14 @@ class KnowledgeBaseService:
                         "enabled": True
                     })
                     if not pulled_kb:
-                        return []
+                        return [], 0
+                    # 拉取的知识库使用原知识库的文档计数
+                    kb = await self.kb_collection.find_one(
+                        {"_id": ObjectId(kb_id)},
+                        {"document_count": 1}
+                    ) or {}
+                
+                total = kb.get("document_count", 0)
                 
                 # 限制 limit 最大值
                 limit = min(limit, 1000)
@@ -628,7 +759,8 @@ class KnowledgeBaseService:
                         logger.debug(f"获取任务状态失败 {task_id}: {e}")
                 
                 # 转换为响应格式，并附加进度信息
-                return [self._doc_dict_to_response(doc, task_statuses.get(doc.get("task_id"))) for doc in docs]
+                documents = [self._doc_dict_to_response(doc, task_statuses.get(doc.get("task_id"))) for doc in docs]
+                return documents, total
                 
             except Exception as e:
                 logger.error(f"获取文档列表失败: {str(e)}")
@@ -787,6 +919,32 @@ class KnowledgeBaseService:
                 logger.error(f"更新文档task_id失败: {str(e)}")
                 raise RuntimeError(f"更新文档task_id失败: {str(e)}")
     
+    async def get_documents_by_ids(
+        self,
+        doc_ids: List[str],
+        projection: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取文档原始数据（不含权限检查，一次 $in 查询）
+        
+        Args:
+            doc_ids: 文档ID列表
+            projection: 返回字段（可选，默认全部字段）
+            
+        Returns:
+            {文档ID: 文档字典}，无效ID或不存在的文档不在结果中
+        """
+        oids = [ObjectId(doc_id) for doc_id in dict.fromkeys(doc_ids) if ObjectId.is_valid(doc_id)]
+        if not oids:
+            return {}
+        async with self._semaphore:
+            try:
+                docs = await self.doc_collection.find({"_id": {"$in": oids}}, projection).to_list(length=None)
+            except Exception as e:
+                logger.error(f"批量获取文档失败: {str(e)}")
+                raise RuntimeError(f"批量获取文档失败: {str(e)}")
+        return {str(doc["_id"]): doc for doc in docs}
+    
     async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """
         获取文档原始数据（不含权限检查）
@@ -939,6 +1097,19 @@ class KnowledgeBaseService:
                 logger.error(f"获取统计信息失败: {str(e)}")
                 raise RuntimeError(f"获取统计信息失败: {str(e)}")
     
+    async def get_statistics_cached(self, user_id: str) -> KBStatistics:
+        """
+        获取用户的知识库统计信息（带短 TTL 缓存，供前端轮询）
+        
+        文档/分块统计可能滞后，详见 kb_cache 模块说明
+        """
+        stats = await get_cached_statistics(user_id)
+        if stats is not None:
+            return stats
+        stats = await self.get_statistics(user_id)
+        await set_cached_statistics(user_id, stats)
+        return stats
+    
     async def get_document_by_id(
         self,
         doc_id: str,
@@ -26,7 +26,10 @@ async def get_user_image_generation_providers(db, user_id: str) -> Dict[str, Dic
     """获取用户已配置并启用的图片生成服务商"""
     try:
         user_object_id = ObjectId(user_id)
-        user_doc = await db[settings.mongodb_db_name].users.find_one({"_id": user_object_id})
+        user_doc = await db[settings.mongodb_db_name].users.find_one(
+            {"_id": user_object_id},
+            {"image_generation_configs": 1}
+        )
         if not user_doc or not user_doc.get("image_generation_configs"):
             return {}
         configs = user_doc.get("image_generation_configs", {})
@@ -188,7 +191,10 @@ class MomentPublisher:
             return None
 
         # 使用默认或第一个可用的服务商
-        user_doc = await self._db[settings.mongodb_db_name].users.find_one({"_id": ObjectId(user_id)})
+        user_doc = await self._db[settings.mongodb_db_name].users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"default_image_generation_provider": 1}
+        )
         provider_id = user_doc.get("default_image_generation_provider") if user_doc else None
         if not provider_id or provider_id not in user_providers:
             provider_id = list(user_providers.keys())[0]
@@ -88,13 +88,16 @@ class MultiKBRetriever:
                    f"top_k_per_kb={top_k_per_kb}, merge_strategy={merge_strategy}")
         
         # 并行检索所有知识库
+        # 使用同一 embedding 模型的知识库共享查询向量，查询只向量化一次
+        query_vectors: Dict[int, asyncio.Future] = {}
         tasks = []
         for kb_config in kb_configs:
             task = self._retrieve_single_kb_with_semaphore(
                 query=query,
                 kb_config=kb_config,
                 top_k=top_k_per_kb,
-                similarity_threshold=similarity_threshold
+                similarity_threshold=similarity_threshold,
+                query_vectors=query_vectors
             )
             tasks.append(task)
         
@@ -129,7 +132,8 @@ class MultiKBRetriever:
         query: str,
         kb_config: Dict[str, Any],
         top_k: int,
-        similarity_threshold: Optional[float]
+        similarity_threshold: Optional[float],
+        query_vectors: Optional[Dict[int, asyncio.Future]] = None
     ) -> List[RetrievalResult]:
         """
         使用信号量控制的单知识库检索 (防止并发过高)
@@ -139,6 +143,7 @@ class MultiKBRetriever:
             kb_config: 知识库配置 {kb_id, kb_name, kb_settings}
             top_k: 返回结果数
             similarity_threshold: 相似度阈值
+            query_vectors: 本次检索共享的查询向量（按 embedding 实例区分）
             
         Returns:
             检索结果列表
@@ -148,15 +153,40 @@ class MultiKBRetriever:
                 query=query,
                 kb_config=kb_config,
                 top_k=top_k,
-                similarity_threshold=similarity_threshold
+                similarity_threshold=similarity_threshold,
+                query_vectors=query_vectors
             )
     
+    @staticmethod
+    async def _embed_query_shared(
+        embeddings: Any,
+        query: str,
+        query_vectors: Dict[int, asyncio.Future]
+    ) -> List[float]:
+        """
+        获取查询向量，同一 embedding 实例只计算一次
+        
+        EmbeddingManager 按配置返回全局单例，同一实例即同一模型，
+        因此可按 id(embeddings) 共享；并发的知识库等待同一个 Future
+        """
+        from .embedding_manager import get_embedding_manager
+        
+        key = id(embeddings)
+        future = query_vectors.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                get_embedding_manager().embed_query_cached(embeddings, query)
+            )
+            query_vectors[key] = future
+        return await future
+    
     async def _retrieve_single_kb(
         self,
         query: str,
         kb_config: Dict[str, Any],
         top_k: int,
-        similarity_threshold: Optional[float]
+        similarity_threshold: Optional[float],
+        query_vectors: Optional[Dict[int, asyncio.Future]] = None
     ) -> List[RetrievalResult]:
         """
         单个知识库的异步检索
@@ -166,6 +196,7 @@ class MultiKBRetriever:
             kb_config: 知识库配置
             top_k: 返回结果数
             similarity_threshold: 相似度阈值
+            query_vectors: 本次检索共享的查询向量（为 None 时由向量库自行向量化）
             
         Returns:
             检索结果列表
@@ -178,10 +209,10 @@ class MultiKBRetriever:
             logger.debug(f"📚 开始检索知识库: {kb_name} (ID: {kb_id})")
             
             # 构建向量存储和检索器
-            from ..routers.kb import _get_kb_components
+            from ..routers.kb import _get_kb_vectorstore
             from ..utils.embedding.pipeline import Retriever
             
-            _, vectorstore, _ = _get_kb_components(kb_settings)
+            vectorstore, embeddings = _get_kb_vectorstore(kb_settings)
             
             # ✅ 优先使用知识库自己的相似度阈值配置
             # 如果会话级别传入了阈值（similarity_threshold参数），则作为兜底默认值
@@ -211,7 +242,11 @@ class MultiKBRetriever:
             )
             
             # 异步检索
-            search_results = await retriever.search(query, top_k=top_k)
+            if query_vectors is not None and hasattr(vectorstore, "similarity_search_with_score_by_vector"):
+                query_vector = await self._embed_query_shared(embeddings, query, query_vectors)
+                search_results = await retriever.search_by_vector(query_vector, top_k=top_k)
+            else:
+                search_results = await retriever.search(query, top_k=top_k)
             
             # 🔧 批量查询文档名称
             from motor.motor_asyncio import AsyncIOMotorClient
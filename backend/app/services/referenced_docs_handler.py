@@ -104,9 +104,7 @@ class ReferencedDocsHandler:
             file_content = minio_client.download_kb_document(file_url)
             
             # 解析文档内容（提取文本）
-            if not hasattr(DocumentParserFactory, '_initialized'):
-                DocumentParserFactory.initialize_default_parsers()
-                DocumentParserFactory._initialized = True
+            DocumentParserFactory.ensure_initialized()
             
             filename = doc.get("filename", "unknown.txt")
             parse_result = await DocumentParserFactory.parse_document(
@@ -248,10 +248,11 @@ class VectorStoreManager:
             distance_metric=distance_metric
         )
         
-        # 双重检查锁定
-        if cache_key in self._instances:
-            logger.info(f"♻️ 复用已加载的 VectorStore ({vector_db_type}): {cache_key.collection_name}")
-            return self._instances[cache_key]
+        # 双重检查锁定（命中缓存是热路径，只记录 DEBUG 日志）
+        instance = self._instances.get(cache_key)
+        if instance is not None:
+            logger.debug("♻️ 复用已加载的 VectorStore (%s): %s", vector_db_type, cache_key.collection_name)
+            return instance
         
         # 🔒 获取文件锁路径（用于跨进程保护collection创建）
         lock_file_path = self._get_lock_file_path(f"{vector_db_type}_{collection_name}")
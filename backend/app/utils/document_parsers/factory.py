@@ -3,6 +3,7 @@
 """
 
 import logging
+import threading
 from typing import Dict, List, Optional, Type
 from .base import DocumentParser, ParseResult
 
@@ -14,6 +15,8 @@ class DocumentParserFactory:
     
     _parsers: Dict[str, DocumentParser] = {}
     _extension_map: Dict[str, str] = {}  # 扩展名 -> 解析器名称映射
+    _initialized: bool = False
+    _init_lock = threading.Lock()
     
     @classmethod
     def register_parser(cls, parser: DocumentParser) -> None:
@@ -101,6 +104,16 @@ class DocumentParserFactory:
                 metadata={"filename": filename, "parser_name": parser.parser_name}
             )
     
+    @classmethod
+    def ensure_initialized(cls) -> None:
+        """确保默认解析器已初始化（幂等，加锁避免并发重复注册）"""
+        if cls._initialized:
+            return
+        with cls._init_lock:
+            if not cls._initialized:
+                cls.initialize_default_parsers()
+                cls._initialized = True
+    
     @classmethod
     def initialize_default_parsers(cls) -> None:
         """初始化默认解析器"""
@@ -14,11 +14,8 @@ async def initialize_document_parsers():
     try:
         logger.info("开始初始化文档解析器系统...")
         
-        # 初始化默认解析器
-        DocumentParserFactory.initialize_default_parsers()
-        
-        # 标记为已初始化
-        DocumentParserFactory._initialized = True
+        # 初始化默认解析器（已初始化时直接跳过）
+        DocumentParserFactory.ensure_initialized()
         
         # 记录支持的格式
         supported_extensions = DocumentParserFactory.get_supported_extensions()
@@ -40,9 +37,7 @@ async def initialize_document_parsers():
 def get_supported_formats_info():
     """获取支持的格式信息"""
     try:
-        if not hasattr(DocumentParserFactory, '_initialized') or not DocumentParserFactory._initialized:
-            DocumentParserFactory.initialize_default_parsers()
-            DocumentParserFactory._initialized = True
+        DocumentParserFactory.ensure_initialized()
         
         parsers_info = DocumentParserFactory.list_parsers()
         supported_extensions = DocumentParserFactory.get_supported_extensions()
@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 class ProcessingConfig:
     """处理配置"""
     # 批处理配置
-    chunk_batch_size: int = 50  # 文档块批处理大小
+    chunk_batch_size: int = 200  # 文档块批处理大小（每批一次 add_documents_async，摊薄写入事务与索引开销）
     embedding_batch_size: int = 32  # 嵌入批处理大小
     
     # 并发配置
@@ -66,19 +66,18 @@ class AsyncTextIngestionPipeline:
         if not documents:
             return 0
         
-        # 2. 获取嵌入模型和向量存储
+        # 2. 获取向量存储（向量化由向量库在写入时使用其 embedding_function 完成）
         await self._update_progress(progress_callback, 0.2, "初始化嵌入模型...")
-        embedding_model = await self._get_embedding_model(kb_settings)
         vector_store = await self._get_vector_store(kb_settings)
         
         # 3. 流式处理文档
         if self.config.enable_streaming:
             total_processed = await self._process_documents_streaming(
-                documents, embedding_model, vector_store, progress_callback
+                documents, vector_store, progress_callback
             )
         else:
             total_processed = await self._process_documents_batch(
-                documents, embedding_model, vector_store, progress_callback
+                documents, vector_store, progress_callback
             )
         
         await self._update_progress(progress_callback, 1.0, f"处理完成，共 {total_processed} 个文档块")
@@ -140,31 +139,6 @@ class AsyncTextIngestionPipeline:
         logger.info(f"_split_text_async 返回: {len(result)} 个文档，类型检查: {type(result[0]) if result else 'N/A'}")
         return result
     
-    async def _get_embedding_model(self, kb_settings: Dict[str, Any]):
-        """获取嵌入模型"""
-        embeddings_config = kb_settings.get("embeddings", {})
-        provider = embeddings_config.get("provider", "local")
-        
-        if provider == "local":
-            model_path = embeddings_config.get("local_model_path", "checkpoints/embeddings/all-MiniLM-L6-v2")
-            return await self.embedding_manager.get_embedding(
-                provider="local",
-                model_name_or_path=model_path,
-                max_length=512,
-                batch_size=8,
-                normalize=True
-            )
-        elif provider == "ark":
-            api_key = embeddings_config.get("api_key")
-            model = embeddings_config.get("model", "doubao-embedding-large-text-250515")
-            return await self.embedding_manager.get_embedding(
-                provider="ark",
-                api_key=api_key,
-                model=model
-            )
-        else:
-            raise ValueError(f"不支持的嵌入提供商: {provider}")
-    
     async def _get_vector_store(self, kb_settings: Dict[str, Any]):
         """获取向量存储（使用全局单例管理器）"""
         from .path_utils import (
@@ -231,14 +205,13 @@ class AsyncTextIngestionPipeline:
     async def _process_documents_streaming(
         self,
         documents: List[Document],
-        embedding_model,
         vector_store,
         progress_callback: Optional[Callable[[float], None]] = None
     ) -> int:
         """流式处理文档"""
         total_docs = len(documents)
         processed_docs = 0
-        batch_size = self.config.chunk_batch_size
+        batch_size = max(1, self.config.chunk_batch_size)
         
         # 创建信号量控制并发
         semaphore = asyncio.Semaphore(self.config.max_concurrent_batches)
@@ -256,24 +229,14 @@ class AsyncTextIngestionPipeline:
                             logger.error(f"批次 {batch_idx}, 文档 {idx} 不是 Document 对象: {type(doc)}, 值: {doc!r}")
                             raise TypeError(f"批次中的文档必须是 Document 对象，但收到 {type(doc).__name__}")
                     
-                    # 提取文本进行嵌入
-                    texts = [doc.page_content for doc in batch_docs]
-                    
-                    # 异步嵌入
-                    embeddings = await embedding_model.embed_documents_async(texts)
-                    
-                    # 注意：不要将 embedding 向量添加到 metadata 中，ChromaDB 不支持复杂数据类型
-                    # ChromaDB 会自动处理向量存储，我们只需要传递文档即可
-                    
                     # 提取 chunk_id 作为文档ID
                     chunk_ids = [doc.metadata.get("chunk_id") for doc in batch_docs]
                     
-                    # 异步添加到向量存储
+                    # 异步添加到向量存储（向量库在写入时批量向量化整批文档）
                     logger.debug(f"批次 {batch_idx}: 准备添加 {len(batch_docs)} 个文档到向量存储")
                     await vector_store.add_documents_async(
                         batch_docs,
-                        ids=chunk_ids,  # 传递 chunk_id 作为文档ID
-                        progress_callback=lambda p: None  # 批次内部进度暂不处理
+                        ids=chunk_ids  # 传递 chunk_id 作为文档ID
                     )
                     
                     processed_docs += len(batch_docs)
@@ -308,34 +271,20 @@ class AsyncTextIngestionPipeline:
     async def _process_documents_batch(
         self,
         documents: List[Document],
-        embedding_model,
         vector_store,
         progress_callback: Optional[Callable[[float], None]] = None
     ) -> int:
         """批量处理文档（非流式）"""
         total_docs = len(documents)
         
-        # 提取所有文本
-        texts = [doc.page_content for doc in documents]
-        
-        # 批量嵌入
-        await self._update_progress(progress_callback, 0.5, "正在生成嵌入向量...")
-        embeddings = await embedding_model.embed_documents_async(texts)
-        
-        # 注意：不要将 embedding 向量添加到 metadata 中，ChromaDB 不支持复杂数据类型
-        # ChromaDB 会自动处理向量存储，我们只需要传递文档即可
-        
         # 提取 chunk_id 作为文档ID
         chunk_ids = [doc.metadata.get("chunk_id") for doc in documents]
         
-        # 批量添加到向量存储
-        await self._update_progress(progress_callback, 0.8, "正在保存到向量数据库...")
+        # 一次性添加到向量存储（向量库在写入时完成向量化）
+        await self._update_progress(progress_callback, 0.5, "正在生成嵌入向量并保存到向量数据库...")
         await vector_store.add_documents_async(
             documents,
-            ids=chunk_ids,  # 传递 chunk_id 作为文档ID
-            progress_callback=lambda p: asyncio.create_task(
-                self._update_progress(progress_callback, 0.8 + p * 0.2, "保存中...")
-            )
+            ids=chunk_ids  # 传递 chunk_id 作为文档ID
         )
         
         return total_docs
@@ -399,7 +348,7 @@ async def process_embedding_task(
     progress_callback: Optional[Callable[[float], None]] = None
 ) -> Dict[str, Any]:
     """处理嵌入任务"""
-    config = ProcessingConfig()
+    config = ProcessingConfig(chunk_batch_size=task_data.batch_size)
     
     async with AsyncTextIngestionPipeline(config) as pipeline:
         num_docs = await pipeline.process_document_async(
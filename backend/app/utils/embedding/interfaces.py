@@ -27,6 +27,10 @@ class VectorStoreLike:
 		"""
 		raise NotImplementedError
 
+	async def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:  # pragma: no cover - interface
+		"""异步按向量相似度搜索（查询向量已由调用方计算，可在多个向量库间复用）"""
+		raise NotImplementedError
+
 	async def get_by_ids(self, ids: List[str]) -> List[Document]:  # pragma: no cover - interface
 		"""异步获取文档（根据主键ID列表）"""
 		raise NotImplementedError
@@ -9,6 +9,16 @@ import hashlib
 from pathlib import Path
 from typing import Optional
 
+# 预编译名称清洗用的正则（每次知识库请求都会调用清洗函数）
+# 均为单字符类/锚点匹配，线性时间、不会回溯，可直接在事件循环中调用
+_RE_BAD = re.compile(r"[^A-Za-z0-9_-]")
+_RE_COLLAPSE = re.compile(r"[-_]{2,}")
+_RE_TRIM = re.compile(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$")
+# 已满足 Chroma 约束的名称（3-63位、首尾为字母数字、仅含字母数字/_/-）
+_RE_VALID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{1,61}[A-Za-z0-9]")
+# 允许 Unicode 的文件夹名清洗（仅去除文件系统不允许或危险字符）
+_FS_TRANS = str.maketrans({c: "-" for c in '<>:\\/|?*'})
+
 
 def _sanitize_collection_name(name: str) -> str:
     """
@@ -19,15 +29,20 @@ def _sanitize_collection_name(name: str) -> str:
     - no consecutive periods; we avoid '.' entirely
     - not an IPv4 address (we avoid by using letters)
     """
+    # 注意：短名称/纯中文名称的集合名完全由下方 md5 后缀决定，且每次访问都重新计算，
+    # 更换哈希算法会导致已有知识库找不到原集合，不要修改
+    # 快速路径：已合规且无连续 -/_ 的名称清洗后不变，直接返回
+    if name and _RE_VALID.fullmatch(name) and not _RE_COLLAPSE.search(name):
+        return name
     original_name = name  # 保存原始名称用于生成确定性哈希
     if not name:
         name = "kb"
     # Replace unsupported chars with '-'
-    name = re.sub(r"[^A-Za-z0-9_-]", "-", name)
+    name = _RE_BAD.sub("-", name)
     # Collapse multiple '-' or '_' to single '-'
-    name = re.sub(r"[-_]{2,}", "-", name)
+    name = _RE_COLLAPSE.sub("-", name)
     # Trim non-alnum from ends
-    name = re.sub(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$", "", name)
+    name = _RE_TRIM.sub("", name)
     # Ensure minimum length by padding with deterministic suffix
     if len(name) < 3:
         # 使用原始名称的哈希值生成确定性的后缀
@@ -37,7 +52,7 @@ def _sanitize_collection_name(name: str) -> str:
     if len(name) > 63:
         name = name[:63]
     # Final guard: if ends with non-alnum after slice, fix
-    name = re.sub(r"^[^A-Za-z0-9]+|[^A-Za-z0-9]+$", "", name)
+    name = _RE_TRIM.sub("", name)
     # If empty again, fallback with deterministic hash
     if not name:
         # 使用原始输入名称生成确定性的名称
@@ -50,8 +65,7 @@ def _sanitize_folder_name(name: str) -> str:
     """允许 Unicode 的文件夹名清洗（仅去除文件系统不允许或危险字符）"""
     name = name or "kb"
     # 去除非法字符
-    _def_fs_forbidden = r"[<>:\\/\|?*]"
-    name = re.sub(_def_fs_forbidden, "-", name)
+    name = name.translate(_FS_TRANS)
     # 去掉首尾空白及点/空格（Windows 末尾点与空格不合法）
     name = name.strip().strip(". ")
     # 避免空字符串
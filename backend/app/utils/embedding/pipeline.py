@@ -101,19 +101,33 @@ class Retriever:
 		
 		# 调用 VectorStore 的异步方法
 		results = await self.vector_store.similarity_search_with_score(query, k=k)
+		return self._filter_by_threshold(results, threshold)
+
+	async def search_by_vector(self, embedding: List[float], top_k: Optional[int] = None, similarity_threshold: Optional[float] = None):
+		"""
+		异步检索（使用已计算好的查询向量），过滤规则与 search 相同。
 		
-		# 如果设置了阈值，将距离转换为相似度分数后过滤
-		if threshold is not None:
-			filtered_results = []
-			for doc, distance in results:
-				# 将距离转换为相似度分数（0-1）
-				score = calculate_score_from_distance(float(distance), self.distance_metric)
-				# 保留相似度分数 >= 阈值的结果
-				if score >= threshold:
-					filtered_results.append((doc, distance))
-			return filtered_results
+		多个知识库共用同一 embedding 模型时，查询只需向量化一次。
+		"""
+		k = top_k if top_k is not None else self.top_k
+		threshold = similarity_threshold if similarity_threshold is not None else self.similarity_threshold
+		
+		results = await self.vector_store.similarity_search_with_score_by_vector(embedding, k=k)
+		return self._filter_by_threshold(results, threshold)
+
+	def _filter_by_threshold(self, results, threshold: Optional[float]):
+		"""将距离转换为相似度分数后按阈值过滤（threshold 为 None 时不过滤）"""
+		if threshold is None:
+			return results
 		
-		return results
+		filtered_results = []
+		for doc, distance in results:
+			# 将距离转换为相似度分数（0-1）
+			score = calculate_score_from_distance(float(distance), self.distance_metric)
+			# 保留相似度分数 >= 阈值的结果
+			if score >= threshold:
+				filtered_results.append((doc, distance))
+		return filtered_results
 
 
 __all__ = ["TextIngestionPipeline", "Retriever"] 
\ No newline at end of file
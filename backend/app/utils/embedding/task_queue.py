@@ -67,6 +67,7 @@ class EmbeddingTask:
     kb_settings: Dict[str, Any]
     session_id: Optional[str] = None
     user_id: Optional[str] = None
+    batch_size: int = 200  # 每批写入向量库的文档块数
 
 
 class TaskPersistence:
@@ -302,7 +303,23 @@ class TaskQueue:
                 self.persistence.save_task(self.tasks[task_id])
             return True
         return False
-    
+
+    async def cancel_task_for_user(self, task_id: str, user_id: str) -> Tuple[Optional[TaskInfo], bool]:
+        """
+        校验归属并取消任务（一次调用完成）
+
+        查询、归属校验与取消之间没有 await 让出点，
+        不会出现"校验通过后任务状态已变化"的竞态。
+
+        Returns:
+            (task_info, cancelled)：任务不存在时 task_info 为 None；
+            不属于该用户时 cancelled 为 False 且不执行取消
+        """
+        task_info = self.tasks.get(task_id)
+        if task_info is None or task_info.metadata.get("user_id") != user_id:
+            return task_info, False
+        return task_info, await self.cancel_task(task_id)
+
     async def _worker(self, worker_name: str):
         """工作协程"""
         logger.info(f"工作线程 {worker_name} 已启动")
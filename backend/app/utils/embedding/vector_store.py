@@ -291,32 +291,45 @@ class ChromaVectorStore(VectorStoreLike):
 		)
 		return result
 
+	async def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+		"""异步按向量相似度检索（跳过 embedding，返回值与 similarity_search_with_score 一致，为距离）"""
+		loop = asyncio.get_event_loop()
+		executor = self._get_executor()
+		
+		result = await loop.run_in_executor(
+			executor,
+			self._store.similarity_search_by_vector_with_relevance_scores,
+			embedding,
+			k
+		)
+		return result
+
 	def _get_by_ids_sync(self, ids: List[str]) -> List[Document]:
 		"""内部同步方法：用于线程池执行"""
 		if not ids:
 			return []
 		
+		debug_enabled = logger.isEnabledFor(logging.DEBUG)
+		
 		# 调试信息
-		logger.info(f"🔍 ChromaVectorStore.get_by_ids: 查询 {len(ids)} 个 chunk_id")
-		logger.info(f"🔍 ChromaVectorStore.get_by_ids: collection_name={self._store._collection.name}")
-		logger.info(f"🔍 ChromaVectorStore.get_by_ids: 查询的 ids={ids[:3]}..." if len(ids) > 3 else f"🔍 ChromaVectorStore.get_by_ids: 查询的 ids={ids}")
+		if debug_enabled:
+			logger.debug("🔍 ChromaVectorStore.get_by_ids: collection_name=%s, 查询 %s 个 chunk_id, ids=%s", self._store._collection.name, len(ids), ids[:3])
 		
-		# langchain Chroma 的 get 支持 ids 参数，返回 dict
+		# langchain Chroma 的 get 支持 ids 参数，返回 dict（单次主键查询）
 		raw = self._store._collection.get(ids=ids, include=["metadatas", "documents"])  # type: ignore
 		
-		logger.info(f"🔍 ChromaVectorStore.get_by_ids: 返回的 documents 数量={len(raw.get('documents', []) or [])}")
-		logger.info(f"🔍 ChromaVectorStore.get_by_ids: 返回的 metadatas 数量={len(raw.get('metadatas', []) or [])}")
+		docs: List[Document] = [
+			Document(page_content=text, metadata=meta)
+			for text, meta in zip(raw.get("documents", []) or [], raw.get("metadatas", []) or [])
+		]
 		
-		# 调试：显示collection中实际有多少文档
-		try:
-			count = self._store._collection.count()
-			logger.info(f"🔍 ChromaVectorStore.get_by_ids: collection总文档数={count}")
-		except Exception as e:
-			logger.warning(f"🔍 ChromaVectorStore.get_by_ids: 无法获取collection总数: {e}")
-		
-		docs: List[Document] = []
-		for text, meta in zip(raw.get("documents", []) or [], raw.get("metadatas", []) or []):
-			docs.append(Document(page_content=text, metadata=meta))
+		if debug_enabled:
+			# 仅调试时额外统计collection总数（会多一次存储查询）
+			try:
+				count = self._store._collection.count()
+			except Exception as e:
+				count = f"未知({e})"
+			logger.debug("🔍 ChromaVectorStore.get_by_ids: 返回 %s 个文档, collection总文档数=%s", len(docs), count)
 		return docs
 
 	async def get_by_ids(self, ids: List[str]) -> List[Document]:
@@ -585,6 +598,23 @@ class FAISSVectorStore(VectorStoreLike):
 		)
 		return result
 
+	async def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+		"""异步按向量相似度检索（跳过 embedding，返回值与 similarity_search_with_score 一致，为距离）"""
+		if self._store is None:
+			logger.warning("⚠️ FAISS 索引未初始化，返回空结果")
+			return []
+		
+		loop = asyncio.get_event_loop()
+		executor = self._get_executor()
+		
+		result = await loop.run_in_executor(
+			executor,
+			self._store.similarity_search_with_score_by_vector,
+			embedding,
+			k
+		)
+		return result
+
 	def _get_by_ids_sync(self, ids: List[str]) -> List[Document]:
 		"""内部同步方法：用于线程池执行"""
 		if not ids:
@@ -0,0 +1,33 @@
+"""
+全局共享的 httpx 异步客户端
+
+复用连接池与 TLS 会话，避免每次请求（尤其是轮询）都重新建立连接。
+"""
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取全局 httpx.AsyncClient 单例（首次调用时创建）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """关闭全局 httpx.AsyncClient（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        logger.info("全局 HTTP 客户端已关闭")
+    _http_client = None
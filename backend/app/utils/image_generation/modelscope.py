@@ -3,6 +3,7 @@ import asyncio
 from typing import Optional, Dict, Any
 
 from .base import AsyncImageGenerationService
+from ..http_client import get_http_client
 
 class ModelScopeImageGenerationService(AsyncImageGenerationService):
     """ModelScope 异步图片生成服务"""
@@ -42,35 +43,35 @@ class ModelScopeImageGenerationService(AsyncImageGenerationService):
             "parameters": parameters
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/images/generations",
-                    headers={**self.headers, "X-ModelScope-Async-Mode": "true"},
-                    json=payload,
-                    timeout=60
-                )
-                response.raise_for_status()
-                data = response.json()
-                task_id = data.get("task_id")
-                if not task_id:
-                    print(f"提交失败，未获取到task_id: {data}")
-                    return None
-                return task_id
-            except httpx.RequestError as e:
-                print(f"提交任务时发生网络错误: {e}")
+        client = get_http_client()
+        try:
+            response = await client.post(
+                f"{self.base_url}/images/generations",
+                headers={**self.headers, "X-ModelScope-Async-Mode": "true"},
+                json=payload,
+                timeout=60
+            )
+            response.raise_for_status()
+            data = response.json()
+            task_id = data.get("task_id")
+            if not task_id:
+                print(f"提交失败，未获取到task_id: {data}")
                 return None
+            return task_id
+        except httpx.RequestError as e:
+            print(f"提交任务时发生网络错误: {e}")
+            return None
 
     async def get_task_result(self, task_id: str) -> Dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/tasks/{task_id}",
-                    headers={**self.headers, "X-ModelScope-Task-Type": "image_generation"},
-                    timeout=60
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.RequestError as e:
-                print(f"查询结果时发生网络错误: {e}")
-                return {"task_status": "FAILED", "output": {"message": str(e)}}
+        client = get_http_client()
+        try:
+            response = await client.get(
+                f"{self.base_url}/tasks/{task_id}",
+                headers={**self.headers, "X-ModelScope-Task-Type": "image_generation"},
+                timeout=60
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.RequestError as e:
+            print(f"查询结果时发生网络错误: {e}")
+            return {"task_status": "FAILED", "output": {"message": str(e)}}
@@ -1,14 +1,25 @@
 import io
 import base64
 import uuid
-from typing import List, Optional
+import asyncio
+from typing import BinaryIO, List, Optional
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from ..config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 可选依赖：aioboto3（S3 兼容的原生异步客户端，可直接访问 MinIO）
+try:
+    import aioboto3
+except ImportError:
+    aioboto3 = None
+
+# 知识库文档流式上传的分片大小（内存占用约为一个分片）
+KB_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
 class MinioClient:
     def __init__(self):
         endpoint_raw = (settings.minio_endpoint or "").strip()
@@ -16,6 +27,7 @@ class MinioClient:
             logger.warning("未检测到 MINIO_ENDPOINT，MinIO 客户端未启用。")
             self.client = None
             self.bucket_name = (settings.minio_bucket_name or "").strip() or "fish-eternal"
+            self._aio_session = None
             return
         secure = endpoint_raw.startswith("https://")
         endpoint_clean = endpoint_raw.replace("http://", "").replace("https://", "")
@@ -26,6 +38,17 @@ class MinioClient:
             secure=secure
         )
         self.bucket_name = settings.minio_bucket_name
+        self._endpoint_url = endpoint_raw if "://" in endpoint_raw else f"http://{endpoint_raw}"
+        self._aio_session = None
+        if settings.minio_use_aioboto3:
+            if aioboto3 is not None:
+                self._aio_session = aioboto3.Session(
+                    aws_access_key_id=settings.minio_access_key,
+                    aws_secret_access_key=settings.minio_secret_key
+                )
+                logger.info("MinIO 异步操作使用 aioboto3 客户端")
+            else:
+                logger.warning("MINIO_USE_AIOBOTO3 已开启但未安装 aioboto3，回退到线程池执行同步 SDK")
         self._ensure_bucket_exists()
     
     def _is_configured(self) -> bool:
@@ -108,6 +131,56 @@ class MinioClient:
             logger.error(f"详细错误信息: {traceback.format_exc()}")
             return None
     
+    async def async_put_object(self, object_name: str, data: bytes, content_type: str = "application/octet-stream") -> str:
+        """
+        异步上传对象
+
+        配置了 aioboto3 时直接走原生异步客户端，否则在线程池中调用同步 SDK，避免阻塞事件循环。
+
+        Returns:
+            MinIO URL (格式: minio://{bucket}/{object_name})
+        """
+        if not self._is_configured():
+            raise RuntimeError("MinIO 未配置")
+        if self._aio_session is not None:
+            async with self._aio_session.client("s3", endpoint_url=self._endpoint_url) as s3:
+                await s3.put_object(
+                    Bucket=self.bucket_name,
+                    Key=object_name,
+                    Body=data,
+                    ContentType=content_type
+                )
+        else:
+            await asyncio.to_thread(
+                self.client.put_object,
+                self.bucket_name,
+                object_name,
+                io.BytesIO(data),
+                len(data),
+                content_type=content_type
+            )
+        return f"minio://{self.bucket_name}/{object_name}"
+    
+    async def async_delete_image(self, minio_url: str) -> bool:
+        """异步删除MinIO中的图片（与 delete_image 语义一致）"""
+        if not self._is_configured():
+            return False
+        if self._aio_session is None:
+            return await asyncio.to_thread(self.delete_image, minio_url)
+        try:
+            if minio_url.startswith("minio://"):
+                path_parts = minio_url.replace("minio://", "").split("/", 1)
+                if len(path_parts) == 2:
+                    bucket, object_name = path_parts
+                    async with self._aio_session.client("s3", endpoint_url=self._endpoint_url) as s3:
+                        await s3.delete_object(Bucket=bucket, Key=object_name)
+                    logger.info(f"图片删除成功: {object_name}")
+                    return True
+            return False
+        except Exception as e:
+            logger.error(f"删除图片失败: {e}")
+            return False
+    
     def get_image_base64(self, minio_url: str) -> Optional[str]:
         """从MinIO获取图片并转换为Base64"""
         if not self._is_configured():
@@ -154,6 +227,32 @@ class MinioClient:
             logger.error(f"删除图片失败: {e}")
             return False
     
+    def _remove_objects_by_prefix(self, prefix: str) -> int:
+        """
+        批量删除指定前缀下的所有对象
+        
+        使用 remove_objects（S3 DeleteObjects），SDK 每批最多提交1000个对象，
+        代替逐个 remove_object 的请求
+        
+        Returns:
+            删除成功的对象数量
+        """
+        listed_count = 0
+        
+        def _iter_delete_objects():
+            nonlocal listed_count
+            for obj in self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True):
+                listed_count += 1
+                logger.debug(f"删除对象: {obj.object_name}")
+                yield DeleteObject(obj.object_name)
+        
+        # remove_objects 是惰性的，必须遍历返回的错误迭代器才会真正执行删除
+        failed_count = 0
+        for error in self.client.remove_objects(self.bucket_name, _iter_delete_objects()):
+            failed_count += 1
+            logger.error(f"删除对象失败 {error.name}: {error.message}")
+        return listed_count - failed_count
+    
     def delete_session_folder(self, session_id: str) -> bool:
         """删除会话文件夹及其所有内容"""
         if not self._is_configured():
@@ -161,21 +260,8 @@ class MinioClient:
         try:
             logger.info(f"开始删除会话文件夹: {session_id}")
             
-            # 列出会话文件夹下的所有对象
-            objects = self.client.list_objects(
-                self.bucket_name,
-                prefix=f"{session_id}/",
-                recursive=True
-            )
-            
-            deleted_count = 0
-            for obj in objects:
-                try:
-                    self.client.remove_object(self.bucket_name, obj.object_name)
-                    logger.info(f"删除对象: {obj.object_name}")
-                    deleted_count += 1
-                except Exception as e:
-                    logger.error(f"删除对象失败 {obj.object_name}: {e}")
+            # 批量删除会话文件夹下的所有对象
+            deleted_count = self._remove_objects_by_prefix(f"{session_id}/")
             
             logger.info(f"✅ 会话文件夹删除完成，共删除 {deleted_count} 个对象")
             return True
@@ -193,19 +279,7 @@ class MinioClient:
         try:
             logger.info(f"开始删除前缀: {prefix}")
             normalized_prefix = prefix if prefix.endswith('/') else f"{prefix}/"
-            objects = self.client.list_objects(
-                self.bucket_name,
-                prefix=normalized_prefix,
-                recursive=True
-            )
-            deleted_count = 0
-            for obj in objects:
-                try:
-                    self.client.remove_object(self.bucket_name, obj.object_name)
-                    logger.info(f"删除对象: {obj.object_name}")
-                    deleted_count += 1
-                except Exception as e:
-                    logger.error(f"删除对象失败 {obj.object_name}: {e}")
+            deleted_count = self._remove_objects_by_prefix(normalized_prefix)
             logger.info(f"✅ 前缀删除完成，共删除 {deleted_count} 个对象")
             return True
         except Exception as e:
@@ -325,21 +399,8 @@ class MinioClient:
             # 确保前缀以 / 结尾
             normalized_prefix = folder_prefix if folder_prefix.endswith('/') else f"{folder_prefix}/"
             
-            # 列出文件夹下的所有对象
-            objects = self.client.list_objects(
-                self.bucket_name,
-                prefix=normalized_prefix,
-                recursive=True
-            )
-            
-            deleted_count = 0
-            for obj in objects:
-                try:
-                    self.client.remove_object(self.bucket_name, obj.object_name)
-                    logger.info(f"删除对象: {obj.object_name}")
-                    deleted_count += 1
-                except Exception as e:
-                    logger.error(f"删除对象失败 {obj.object_name}: {e}")
+            # 批量删除文件夹下的所有对象
+            deleted_count = self._remove_objects_by_prefix(normalized_prefix)
             
             logger.info(f"✅ 文件夹删除完成，共删除 {deleted_count} 个对象")
             return deleted_count
@@ -350,6 +411,12 @@ class MinioClient:
             logger.error(f"详细错误信息: {traceback.format_exc()}")
             return 0
     
+    async def async_delete_folder(self, folder_prefix: str) -> int:
+        """异步删除文件夹（在线程池中执行，避免阻塞事件循环）"""
+        if not self._is_configured():
+            return 0
+        return await asyncio.to_thread(self.delete_folder, folder_prefix)
+    
     # ==================== 知识库文档存储方法 ====================
     
     def upload_kb_document(
@@ -405,6 +472,89 @@ class MinioClient:
             logger.error(f"详细错误信息: {traceback.format_exc()}")
             raise
     
+    def upload_kb_document_stream(
+        self,
+        fileobj: BinaryIO,
+        length: int,
+        user_id: str,
+        collection_name: str,
+        doc_id: str,
+        filename: str,
+        content_type: str = "application/octet-stream"
+    ) -> str:
+        """
+        以流的方式上传知识库文档到 MinIO（分片上传，不把整个文件读入内存）
+        
+        路径规则与 upload_kb_document 相同；同步调用，异步场景请使用 async_upload_kb_document_stream。
+        
+        Args:
+            fileobj: 可读的二进制文件对象（需位于文件开头）
+            length: 文件大小（字节）
+            其余参数同 upload_kb_document
+        
+        Returns:
+            MinIO URL (格式: minio://{bucket}/kb-documents/{user_id}/{collection_name}/{doc_id}_{filename})
+        """
+        if not self._is_configured():
+            raise Exception("MinIO未配置")
+        
+        try:
+            object_name = f"kb-documents/{user_id}/{collection_name}/{doc_id}_{filename}"
+            
+            logger.info(f"流式上传知识库文档到MinIO: {object_name}, 大小: {length} 字节")
+            
+            self.client.put_object(
+                self.bucket_name,
+                object_name,
+                fileobj,
+                length,
+                content_type=content_type,
+                part_size=KB_UPLOAD_PART_SIZE
+            )
+            
+            minio_url = f"minio://{self.bucket_name}/{object_name}"
+            logger.info(f"✅ 知识库文档上传成功: {minio_url}")
+            return minio_url
+            
+        except Exception as e:
+            logger.error(f"❌ 知识库文档上传失败: {e}")
+            import traceback
+            logger.error(f"详细错误信息: {traceback.format_exc()}")
+            raise
+    
+    async def async_upload_kb_document_stream(self, *args, **kwargs) -> str:
+        """异步流式上传知识库文档（在线程池中执行，避免阻塞事件循环）"""
+        return await asyncio.to_thread(self.upload_kb_document_stream, *args, **kwargs)
+    
+    @staticmethod
+    def _kb_object_name(minio_url: str) -> str:
+        """解析 minio:// URL 或直接使用对象路径，返回对象名"""
+        if minio_url.startswith("minio://"):
+            path_parts = minio_url.replace("minio://", "").split("/", 1)
+            if len(path_parts) == 2:
+                bucket, object_name = path_parts
+                return object_name
+            raise ValueError(f"无效的MinIO URL格式: {minio_url}")
+        # 兼容旧的直接路径格式
+        return minio_url
+    
+    def open_kb_document_stream(self, minio_url: str):
+        """
+        打开知识库文档的读取流（不读取内容）
+        
+        Args:
+            minio_url: MinIO URL (格式: minio://{bucket}/{object_name}) 或对象路径
+        
+        Returns:
+            urllib3 响应对象，调用方按块 read()，用完后必须 close() 并 release_conn()
+        """
+        if not self._is_configured():
+            raise Exception("MinIO未配置")
+        
+        object_name = self._kb_object_name(minio_url)
+        logger.info(f"从MinIO流式读取文档: {object_name}")
+        return self.client.get_object(self.bucket_name, object_name)
+    
     def download_kb_document(self, minio_url: str) -> bytes:
         """
         从 MinIO 下载知识库文档
@@ -419,16 +569,7 @@ class MinioClient:
             raise Exception("MinIO未配置")
         
         try:
-            # 解析 minio:// URL 或直接使用对象路径
-            if minio_url.startswith("minio://"):
-                path_parts = minio_url.replace("minio://", "").split("/", 1)
-                if len(path_parts) == 2:
-                    bucket, object_name = path_parts
-                else:
-                    raise ValueError(f"无效的MinIO URL格式: {minio_url}")
-            else:
-                # 兼容旧的直接路径格式
-                object_name = minio_url
+            object_name = self._kb_object_name(minio_url)
             
             logger.info(f"从MinIO下载文档: {object_name}")
             